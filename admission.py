@@ -0,0 +1,163 @@
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from config import TICKET_MAX_CONCURRENT_CREATIONS, TICKET_QUEUE_UPDATE_INTERVAL
+
+
+class GuildAdmission:
+    """Admission control for ticket creation in one guild, shared by every ticket view
+
+    Each user gets a single-flight guard (one creation in progress at a time,
+    regardless of which panel they clicked) and a single active ticket.
+    A cap limits concurrent creations; overflow waits in a FIFO queue.
+    """
+
+    def __init__(self, max_concurrent=TICKET_MAX_CONCURRENT_CREATIONS):
+        self.max_concurrent = max_concurrent
+        self.in_flight = set()  # user ids with a creation in progress
+        self.active_tickets = {}  # user id -> ticket language
+        self.running = 0
+        self.waiters = deque()  # futures waiting for a creation slot
+        self.total_queued = 0
+
+    # Single-flight guard
+
+    def begin(self, user_id):
+        """Mark a creation as in progress; returns False if one is already running"""
+        if user_id in self.in_flight:
+            return False
+        self.in_flight.add(user_id)
+        return True
+
+    def end(self, user_id):
+        """Clear the in-progress marker for a user"""
+        self.in_flight.discard(user_id)
+
+    # Active tickets
+
+    def has_active_ticket(self, user_id):
+        """Check if user has an active ticket in any language"""
+        return user_id in self.active_tickets
+
+    def add_active_ticket(self, user_id, language):
+        """Register an active ticket for user"""
+        self.active_tickets[user_id] = language
+
+    def remove_active_ticket(self, user_id):
+        """Forget the active ticket for user; returns True if one was registered"""
+        return self.active_tickets.pop(user_id, None) is not None
+
+    def tickets_for(self, language):
+        """Return the set of user ids with an active ticket in a language"""
+        return {user_id for user_id, ticket_language in self.active_tickets.items() if ticket_language == language}
+
+    def clear_active_tickets(self):
+        """Forget all active tickets; returns how many were cleared"""
+        count = len(self.active_tickets)
+        self.active_tickets.clear()
+        return count
+
+    # Concurrency cap
+
+    def queue_position(self, waiter):
+        """1-based position of a waiter in the queue, or 0 if no longer queued"""
+        try:
+            return self.waiters.index(waiter) + 1
+        except ValueError:
+            return 0
+
+    async def _acquire(self, on_position):
+        if self.running < self.max_concurrent and not self.waiters:
+            self.running += 1
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        self.total_queued += 1
+        last_position = None
+        try:
+            while True:
+                position = self.queue_position(waiter)
+                if position and position != last_position and on_position:
+                    last_position = position
+                    await on_position(position)
+                try:
+                    # The slot is handed over by _release, so running is not incremented here
+                    await asyncio.wait_for(asyncio.shield(waiter), timeout=TICKET_QUEUE_UPDATE_INTERVAL)
+                    return
+                except asyncio.TimeoutError:
+                    continue
+        except BaseException:
+            if waiter.done() and not waiter.cancelled():
+                # We were handed a slot but are bailing out; pass it on
+                self._release()
+            else:
+                waiter.cancel()
+                try:
+                    self.waiters.remove(waiter)
+                except ValueError:
+                    pass
+            raise
+
+    def _release(self):
+        while self.waiters:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.running -= 1
+
+    @asynccontextmanager
+    async def slot(self, on_position=None):
+        """Hold one of the guild's creation slots, queueing if all are taken
+
+        ``on_position`` is awaited with the 1-based queue position whenever it changes.
+        """
+        await self._acquire(on_position)
+        try:
+            yield
+        finally:
+            self._release()
+
+    def snapshot(self):
+        """Current admission state for logging and status output"""
+        return {
+            'running': self.running,
+            'queued': len(self.waiters),
+            'in_flight': len(self.in_flight),
+            'active_tickets': len(self.active_tickets),
+            'max_concurrent': self.max_concurrent,
+            'total_queued': self.total_queued
+        }
+
+
+class TicketAdmission:
+    """Per-guild ticket admission partitions, created on first use
+
+    Guilds never share state: a ticket rush in one guild queues only that
+    guild's creations, and active tickets/in-flight guards are scoped per guild.
+    """
+
+    def __init__(self, max_concurrent=TICKET_MAX_CONCURRENT_CREATIONS):
+        self.max_concurrent = max_concurrent
+        self.guilds = {}  # guild id -> GuildAdmission
+
+    def guild(self, guild_id):
+        """The admission partition for a guild"""
+        partition = self.guilds.get(guild_id)
+        if partition is None:
+            partition = self.guilds[guild_id] = GuildAdmission(self.max_concurrent)
+        return partition
+
+    def snapshot(self):
+        """Admission state summed over all guilds"""
+        totals = {'running': 0, 'queued': 0, 'in_flight': 0, 'active_tickets': 0, 'total_queued': 0}
+        for partition in self.guilds.values():
+            for key, value in partition.snapshot().items():
+                if key in totals:
+                    totals[key] += value
+        return {**totals, 'max_concurrent_per_guild': self.max_concurrent, 'guilds': len(self.guilds)}
+
+
+# Shared controller used by every ticket view
+admission = TicketAdmission()
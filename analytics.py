@@ -0,0 +1,304 @@
+import json
+import math
+import os
+import time
+from utils import logger
+from config import DATA_DIR
+
+LANGUAGES = ('english', 'russian')
+
+
+def format_duration(seconds):
+    """Human readable duration like 45s, 12m 5s, 3h 20m or 2d 4h"""
+    if seconds is None:
+        return 'n/a'
+    seconds = int(seconds)
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60}m {seconds % 60}s"
+    if seconds < 86400:
+        return f"{seconds // 3600}h {seconds % 3600 // 60}m"
+    return f"{seconds // 86400}d {seconds % 86400 // 3600}h"
+
+
+def metric_key(metric, guild_id, label):
+    """Counter/histogram key like ``response:<guild id>:english`` or ``resolution:<guild id>:staff:123``"""
+    return f"{metric}:{guild_id or 0}:{label}"
+
+
+def split_key(key):
+    """(metric, guild id, label) of a key; keys saved before guilds were tracked belong to guild 0"""
+    metric, _, rest = key.partition(':')
+    guild_id, _, label = rest.partition(':')
+    if not guild_id.isdigit():
+        return metric, 0, rest
+    return metric, int(guild_id), label
+
+
+class LatencyHistogram:
+    """HDR-style histogram with log-spaced buckets
+
+    Every recorded value lands in a bucket whose width is a fixed fraction of its
+    magnitude, so percentiles have bounded relative error (``precision``) and
+    memory stays at a few hundred buckets no matter how many samples are added.
+    """
+
+    def __init__(self, precision=0.02):
+        self.precision = precision
+        self.log_base = math.log1p(2 * precision)
+        self.counts = {}  # bucket index -> count
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def _bucket(self, value):
+        return 0 if value < 1 else int(math.log(value) / self.log_base) + 1
+
+    def _bucket_value(self, index):
+        # Midpoint of the bucket in log space
+        return 0.5 if index == 0 else math.exp((index - 0.5) * self.log_base)
+
+    def record(self, value):
+        """Add a sample (seconds)"""
+        value = max(value, 0.0)
+        index = self._bucket(value)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def percentile(self, pct):
+        """Approximate value at a percentile (0-100), None when empty"""
+        if not self.count:
+            return None
+        target = max(1, math.ceil(pct / 100 * self.count))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= target:
+                return min(max(self._bucket_value(index), self.min), self.max)
+        return self.max
+
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def to_dict(self):
+        return {
+            'precision': self.precision,
+            'counts': {str(index): count for index, count in self.counts.items()},
+            'count': self.count,
+            'total': self.total,
+            'min': self.min,
+            'max': self.max
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls(data.get('precision', 0.02))
+        histogram.counts = {int(index): count for index, count in data['counts'].items()}
+        histogram.count = data['count']
+        histogram.total = data['total']
+        histogram.min = data['min']
+        histogram.max = data['max']
+        return histogram
+
+
+class TicketAnalytics:
+    """Streaming ticket metrics fed by ticket open/close and thread message events
+
+    Response time is ticket open to first staff reply; resolution time is ticket
+    open to close. Both are kept per guild, per language and per staff member
+    (the first staff member to reply owns the ticket for attribution).
+    """
+
+    def __init__(self, path, save_interval=30):
+        self.path = path
+        self.save_interval = save_interval
+        self.open_tickets = {}  # thread id -> {'guild_id', 'owner_id', 'language', 'opened_at', 'first_response_at', 'responder_id'}
+        self.counters = {}  # metric_key -> count
+        self.histograms = {}  # 'response:<guild id>:english', 'resolution:<guild id>:staff:123', ... -> LatencyHistogram
+        self.dirty = False
+        self.last_save = 0.0
+        self.load()
+
+    def _histogram(self, metric, ticket, label):
+        key = metric_key(metric, ticket.get('guild_id'), label)
+        if key not in self.histograms:
+            self.histograms[key] = LatencyHistogram()
+        return self.histograms[key]
+
+    def _count(self, event, ticket, label, amount=1):
+        name = metric_key(event, ticket.get('guild_id'), label)
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def is_ticket(self, thread_id):
+        return thread_id in self.open_tickets
+
+    # Events
+
+    def ticket_opened(self, thread_id, owner_id, language, opened_at=None, guild_id=None):
+        """Start tracking a ticket"""
+        self.open_tickets[thread_id] = {
+            'guild_id': guild_id,
+            'owner_id': owner_id,
+            'language': language,
+            'opened_at': time.time() if opened_at is None else opened_at,
+            'first_response_at': None,
+            'responder_id': None
+        }
+        self._count('opened', self.open_tickets[thread_id], language)
+        self._changed()
+
+    def ticket_message(self, thread_id, author_id, is_staff, sent_at=None):
+        """Account for a message posted in a ticket thread (O(1), safe to call for every message)"""
+        ticket = self.open_tickets.get(thread_id)
+        if not ticket:
+            return
+        if not is_staff or author_id == ticket['owner_id']:
+            self._count('user_messages', ticket, ticket['language'])
+            return
+
+        self._count('staff_messages', ticket, ticket['language'])
+        self._count('staff_messages', ticket, f"staff:{author_id}")
+        if ticket['first_response_at'] is None:
+            sent_at = time.time() if sent_at is None else sent_at
+            response_time = sent_at - ticket['opened_at']
+            ticket['first_response_at'] = sent_at
+            ticket['responder_id'] = author_id
+            self._histogram('response', ticket, ticket['language']).record(response_time)
+            self._histogram('response', ticket, f"staff:{author_id}").record(response_time)
+        self._changed()
+
+    def ticket_closed(self, thread_id, closed_at=None):
+        """Stop tracking a ticket and record its resolution time"""
+        ticket = self.open_tickets.pop(thread_id, None)
+        if not ticket:
+            return
+        resolution_time = (time.time() if closed_at is None else closed_at) - ticket['opened_at']
+        self._histogram('resolution', ticket, ticket['language']).record(resolution_time)
+        if ticket['responder_id']:
+            self._histogram('resolution', ticket, f"staff:{ticket['responder_id']}").record(resolution_time)
+        else:
+            self._count('closed_unanswered', ticket, ticket['language'])
+        self._count('closed', ticket, ticket['language'])
+        self._changed()
+
+    # Queries
+
+    def backlog(self, language, guild_id=None):
+        """Open tickets and open tickets still waiting for a first staff reply (optionally in one guild)"""
+        tickets = [
+            ticket for ticket in self.open_tickets.values()
+            if ticket['language'] == language and (guild_id is None or ticket.get('guild_id') == guild_id)
+        ]
+        waiting = [ticket for ticket in tickets if ticket['first_response_at'] is None]
+        oldest_wait = min((ticket['opened_at'] for ticket in waiting), default=None)
+        return {
+            'open': len(tickets),
+            'waiting': len(waiting),
+            'oldest_wait': time.time() - oldest_wait if oldest_wait else None
+        }
+
+    def summary(self, metric, guild_id, label):
+        """Count and p50/p90/p99 of one guild's histogram (label is a language or ``staff:<id>``)"""
+        histogram = self.histograms.get(metric_key(metric, guild_id, label))
+        if not histogram or not histogram.count:
+            return {'count': 0, 'p50': None, 'p90': None, 'p99': None, 'mean': None}
+        return {
+            'count': histogram.count,
+            'p50': histogram.percentile(50),
+            'p90': histogram.percentile(90),
+            'p99': histogram.percentile(99),
+            'mean': histogram.mean()
+        }
+
+    def staff_ids(self, guild_id):
+        """Staff members that have responded to at least one ticket in a guild"""
+        staff = []
+        for key in self.histograms:
+            metric, key_guild_id, label = split_key(key)
+            if metric == 'response' and key_guild_id == guild_id and label.startswith('staff:'):
+                staff.append(int(label[6:]))
+        return sorted(staff)
+
+    def metrics_text(self, guild_id=None):
+        """Prometheus text exposition of all counters and percentiles (optionally of one guild)"""
+        def labels(key):
+            _, key_guild_id, label = split_key(key)
+            label = f'staff="{label[6:]}"' if label.startswith('staff:') else f'language="{label}"'
+            return f'guild="{key_guild_id}",{label}'
+
+        def wanted(key):
+            return guild_id is None or split_key(key)[1] == guild_id
+
+        lines = [
+            '# TYPE csmc_ticket_events_total counter',
+        ]
+        for name, value in sorted(self.counters.items()):
+            if wanted(name):
+                lines.append(f'csmc_ticket_events_total{{event="{split_key(name)[0]}",{labels(name)}}} {value}')
+        lines.append('# TYPE csmc_ticket_backlog gauge')
+        for language in LANGUAGES:
+            backlog = self.backlog(language, guild_id)
+            lines.append(f'csmc_ticket_backlog{{language="{language}",state="open"}} {backlog["open"]}')
+            lines.append(f'csmc_ticket_backlog{{language="{language}",state="waiting"}} {backlog["waiting"]}')
+        lines.append('# TYPE csmc_ticket_seconds summary')
+        for key in sorted(self.histograms):
+            if not wanted(key):
+                continue
+            metric = split_key(key)[0]
+            label = labels(key)
+            histogram = self.histograms[key]
+            for quantile in (0.5, 0.9, 0.99):
+                value = histogram.percentile(quantile * 100)
+                lines.append(f'csmc_ticket_seconds{{metric="{metric}",{label},quantile="{quantile}"}} {value:.1f}')
+            lines.append(f'csmc_ticket_seconds_sum{{metric="{metric}",{label}}} {histogram.total:.1f}')
+            lines.append(f'csmc_ticket_seconds_count{{metric="{metric}",{label}}} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+    # Persistence
+
+    def _changed(self):
+        self.dirty = True
+        if time.time() - self.last_save >= self.save_interval:
+            self.save()
+
+    def load(self):
+        """Load persisted aggregates"""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"Could not load ticket analytics from {self.path}: {e}")
+            return
+        self.open_tickets = {int(thread_id): ticket for thread_id, ticket in data.get('open_tickets', {}).items()}
+        self.counters = data.get('counters', {})
+        self.histograms = {
+            key: LatencyHistogram.from_dict(histogram) for key, histogram in data.get('histograms', {}).items()
+        }
+
+    def save(self):
+        """Atomically persist aggregates to disk"""
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'open_tickets': self.open_tickets,
+                    'counters': self.counters,
+                    'histograms': {key: histogram.to_dict() for key, histogram in self.histograms.items()}
+                }, f)
+            os.replace(tmp_path, self.path)
+            self.dirty = False
+            self.last_save = time.time()
+        except OSError as e:
+            logger.error(f"Could not persist ticket analytics: {e}")
+
+
+# Shared analytics fed by ticket views and thread messages
+analytics = TicketAnalytics(os.path.join(DATA_DIR, 'ticket_analytics.json'))
@@ -0,0 +1,207 @@
+"""Compare the default and performance runtime profiles
+
+    python benchmark_runtime.py [--members 5000] [--events 20000] [--requests 2000]
+
+Gateway decode: synthetic gateway events are zlib-stream compressed the way
+Discord sends them, then inflated and decoded with the stdlib json module
+(default) and with orjson (performance). The event mix includes the typing,
+reaction and voice events the performance profile does not subscribe to, so
+the "per mix" figure shows the cost of the whole stream under each profile.
+
+Interaction latency: a local HTTP server stands in for Discord's interaction
+callback endpoint and every simulated interaction is decoded, then
+acknowledged with a POST while background tasks keep the loop busy; the
+ack latency percentiles are measured on the asyncio loop and on uvloop.
+
+Missing optional packages (orjson, uvloop) are reported and skipped.
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+import zlib
+from aiohttp import web, ClientSession
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+# Events the performance profile does not subscribe to
+UNSUBSCRIBED = {'TYPING_START', 'MESSAGE_REACTION_ADD', 'VOICE_STATE_UPDATE'}
+
+# Share of each event type in a busy community's gateway stream
+EVENT_MIX = {
+    'PRESENCE_UPDATE': 0.45,
+    'TYPING_START': 0.20,
+    'MESSAGE_CREATE': 0.15,
+    'MESSAGE_REACTION_ADD': 0.08,
+    'VOICE_STATE_UPDATE': 0.04,
+    'GUILD_MEMBER_UPDATE': 0.05,
+    'INTERACTION_CREATE': 0.03
+}
+
+
+def snowflake():
+    return str(random.randint(10 ** 17, 10 ** 19))
+
+
+def user():
+    return {'id': snowflake(), 'username': f"trader{random.randint(1, 99999)}", 'global_name': None,
+            'avatar': '%032x' % random.getrandbits(128), 'discriminator': '0', 'public_flags': 0}
+
+
+def member():
+    return {'user': user(), 'roles': [snowflake() for _ in range(random.randint(1, 3))], 'nick': None,
+            'joined_at': '2024-03-01T12:00:00.000000+00:00', 'deaf': False, 'mute': False, 'flags': 0}
+
+
+def presence(guild_id):
+    return {'user': {'id': snowflake()}, 'guild_id': guild_id, 'status': random.choice(['online', 'idle', 'dnd']),
+            'activities': [{'name': 'Counter-Strike 2', 'type': 0, 'created_at': 1700000000000}],
+            'client_status': {'desktop': 'online'}}
+
+
+def event(name, guild_id):
+    channel_id = snowflake()
+    data = {
+        'PRESENCE_UPDATE': lambda: presence(guild_id),
+        'TYPING_START': lambda: {'channel_id': channel_id, 'guild_id': guild_id, 'user_id': snowflake(),
+                                 'timestamp': 1700000000, 'member': member()},
+        'MESSAGE_CREATE': lambda: {'id': snowflake(), 'channel_id': channel_id, 'guild_id': guild_id, 'author': user(),
+                                   'member': member(), 'content': 'WTB AK-47 | Redline FT, paying 20% over market ' * 2,
+                                   'timestamp': '2024-03-01T12:00:00.000000+00:00', 'embeds': [], 'attachments': [],
+                                   'mentions': [], 'mention_roles': [], 'pinned': False, 'type': 0, 'tts': False},
+        'MESSAGE_REACTION_ADD': lambda: {'user_id': snowflake(), 'channel_id': channel_id, 'message_id': snowflake(),
+                                         'guild_id': guild_id, 'member': member(), 'emoji': {'id': None, 'name': '🔥'}},
+        'VOICE_STATE_UPDATE': lambda: {'guild_id': guild_id, 'channel_id': channel_id, 'user_id': snowflake(),
+                                       'member': member(), 'session_id': '%032x' % random.getrandbits(128),
+                                       'deaf': False, 'mute': False, 'self_deaf': False, 'self_mute': True,
+                                       'self_video': False, 'suppress': False},
+        'GUILD_MEMBER_UPDATE': lambda: {'guild_id': guild_id, **member()},
+        'INTERACTION_CREATE': lambda: {'id': snowflake(), 'application_id': snowflake(), 'type': 3, 'guild_id': guild_id,
+                                       'channel_id': channel_id, 'member': member(), 'token': 'x' * 180, 'version': 1,
+                                       'data': {'custom_id': 'create_ticket_english', 'component_type': 2},
+                                       'locale': 'en-US', 'guild_locale': 'en-US'}
+    }[name]()
+    return {'op': 0, 's': random.randint(1, 10 ** 6), 't': name, 'd': data}
+
+
+def compress_stream(payloads):
+    """Frames as Discord sends them on a zlib-stream connection"""
+    compressor = zlib.compressobj()
+    return [compressor.compress(payload) + compressor.flush(zlib.Z_SYNC_FLUSH) for payload in payloads]
+
+
+def decode_rate(frames, loads):
+    """Seconds to inflate and decode every frame, like DiscordWebSocket.received_message"""
+    inflator = zlib.decompressobj()
+    started = time.perf_counter()
+    for frame in frames:
+        loads(inflator.decompress(frame))
+    return time.perf_counter() - started
+
+
+def bench_gateway(members, events):
+    guild_id = snowflake()
+    guild_create = {'op': 0, 's': 1, 't': 'GUILD_CREATE', 'd': {
+        'id': guild_id, 'name': 'CS2 Trading', 'members': [member() for _ in range(members)],
+        'presences': [presence(guild_id) for _ in range(members // 2)], 'channels': [], 'roles': [], 'threads': []
+    }}
+    names = random.choices(list(EVENT_MIX), weights=list(EVENT_MIX.values()), k=events)
+    stream = [json.dumps(event(name, guild_id)).encode() for name in names]
+    subscribed = [payload for payload, name in zip(stream, names) if name not in UNSUBSCRIBED]
+    big = compress_stream([json.dumps(guild_create).encode()])
+
+    decoders = [('default', json.loads)]
+    if orjson:
+        decoders.append(('performance', orjson.loads))
+    else:
+        print("orjson is not installed - skipping the performance decoder")
+
+    print(f"\nGateway decode ({members} member GUILD_CREATE, {events} event mix)")
+    print(f"{'profile':<12} {'GUILD_CREATE':>14} {'per event':>12} {'per mix':>10} {'events':>8}")
+    for profile, loads in decoders:
+        frames = compress_stream(stream if profile == 'default' else subscribed)
+        guild_ms = min(decode_rate(big, loads) for _ in range(5)) * 1000
+        mix = min(decode_rate(frames, loads) for _ in range(3))
+        print(f"{profile:<12} {guild_ms:>12.1f}ms {mix / len(frames) * 1e6:>10.1f}us {mix * 1000:>8.1f}ms {len(frames):>8}")
+
+
+async def ack_latencies(requests, concurrency=20, background=200):
+    """Ack latency of simulated interactions against a local callback endpoint"""
+    async def callback(request):
+        await request.read()
+        return web.Response(status=204)
+
+    app = web.Application()
+    app.router.add_post('/interactions/{id}/{token}/callback', callback)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    async def noise():
+        while True:
+            await asyncio.sleep(0)
+
+    background_tasks = [asyncio.create_task(noise()) for _ in range(background)]
+    payload = json.dumps(event('INTERACTION_CREATE', snowflake())).encode()
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async with ClientSession() as session:
+        async def interaction():
+            async with semaphore:
+                received = time.perf_counter()
+                data = json.loads(payload)['d']
+                url = f"http://127.0.0.1:{port}/interactions/{data['id']}/{data['token'][:8]}/callback"
+                async with session.post(url, json={'type': 6}) as response:
+                    await response.read()
+                latencies.append(time.perf_counter() - received)
+
+        await asyncio.gather(*(interaction() for _ in range(requests)))
+
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    await runner.cleanup()
+    return latencies
+
+
+def bench_interactions(requests):
+    loops = [('default', asyncio.new_event_loop)]
+    if uvloop:
+        loops.append(('performance', uvloop.new_event_loop))
+    else:
+        print("uvloop is not installed - skipping the performance event loop")
+
+    print(f"\nInteraction ack latency ({requests} interactions, 20 in flight, 200 busy tasks)")
+    print(f"{'profile':<12} {'p50':>9} {'p95':>9} {'p99':>9} {'throughput':>12}")
+    for profile, factory in loops:
+        with asyncio.Runner(loop_factory=factory) as runner:
+            started = time.perf_counter()
+            latencies = runner.run(ack_latencies(requests))
+            elapsed = time.perf_counter() - started
+        cuts = statistics.quantiles(latencies, n=100)
+        print(f"{profile:<12} {cuts[49] * 1000:>7.2f}ms {cuts[94] * 1000:>7.2f}ms {cuts[98] * 1000:>7.2f}ms "
+              f"{requests / elapsed:>9.0f}/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the default and performance runtime profiles")
+    parser.add_argument('--members', type=int, default=5000, help="members in the simulated GUILD_CREATE")
+    parser.add_argument('--events', type=int, default=20000, help="gateway events in the decode mix")
+    parser.add_argument('--requests', type=int, default=2000, help="simulated interactions")
+    args = parser.parse_args()
+    random.seed(0)
+    bench_gateway(args.members, args.events)
+    bench_interactions(args.requests)
@@ -1,23 +1,85 @@
 import discord
-from discord.ext import commands, tasks
+from discord.ext import commands
 import asyncio
+import math
+import os
+import time
 from datetime import datetime, timezone
 import traceback
 
 # Import our modules
 from config import *
 from utils import *
-from views import LanguageSelectionView, SimpleTicketView
+from views import LanguageSelectionView, SimpleTicketView, ConfirmView, cancel_ticket_timers
+from interactions import pipeline
+from admission import admission
+from scheduler import scheduler
+from transcripts import exporter
+from search_index import search_index
+from analytics import analytics, format_duration, LANGUAGES
+from dm_outbox import outbox
+from raid_guard import raid_guard
+from stats_history import stats_history, RESOLUTIONS
+from member_counts import member_counts
+from status_api import status_api
+from guild_config import guild_configs, SECTIONS
+from content import content, panels
+from guild_snapshot import snapshots
+from jobs import jobs, JobBusy
+from permission_audit import PermissionAudit
+from command_sync import command_sync
+from periodic import periodic
+from memory_profile import memory
+from cpu_profile import cpu_profiler
+from runtime import runtime
+from ticket_placement import placement, overflow_index
+from setup_plan import (
+    Plan, CREATE_ROLE, DELETE_ROLE, CREATE_CHANNEL, DELETE_CHANNEL, EDIT_OVERWRITE, SEND_MESSAGE
+)
+from language_roles import (
+    locales, role_jobs, onboarding_roles, LanguageRoleJob, LANGUAGE_KEYS, detect_member_language
+)
 
-# Bot setup with all intents
-intents = discord.Intents.all()
-bot = commands.Bot(command_prefix=BOT_PREFIX, intents=intents, help_command=None)
+# Bot setup; intents and caches depend on RUNTIME_PROFILE
+bot = commands.Bot(command_prefix=BOT_PREFIX, help_command=None, **runtime.client_options())
 
 # Global instances for persistent views (will be created in on_ready)
 language_view = None
 english_ticket_view = None
 russian_ticket_view = None
 
+# Cache sizes reported by !memory
+@memory.counter('cached_members')
+def count_cached_members():
+    return sum(len(guild.members) for guild in bot.guilds)
+
+@memory.counter('cached_messages')
+def count_cached_messages():
+    return len(bot.cached_messages)
+
+@memory.counter('cached_threads')
+def count_cached_threads():
+    return sum(len(guild.threads) for guild in bot.guilds)
+
+@memory.counter('persistent_views')
+def count_persistent_views():
+    return len(bot.persistent_views)
+
+@memory.counter('view_cooldowns')
+def count_view_cooldowns():
+    views = (language_view, english_ticket_view, russian_ticket_view)
+    return sum(len(view.cooldowns) for view in views if view is not None)
+
+memory.count_type('live_views', discord.ui.View)
+memory.count_type('live_members', discord.Member)
+memory.count_type('live_messages', discord.Message)
+
+# Index every exported transcript for !search_tickets
+exporter.add_listener(search_index.ingest_transcript)
+
+# Apply the content file before anything looks up names (then watched by a periodic task)
+content.load()
+
 @bot.event
 async def on_ready():
     """Bot startup event"""
@@ -26,6 +88,7 @@ async def on_ready():
     logger.info(f'{bot.user} has connected to Discord!')
     logger.info(f'Bot ID: {bot.user.id}')
     logger.info(f'Servers: {len(bot.guilds)}')
+    logger.info('Runtime: ' + ', '.join(f'{key}={value}' for key, value in runtime.describe(bot).items()))
     
     # Create persistent views
     language_view = LanguageSelectionView()
@@ -37,9 +100,25 @@ async def on_ready():
     bot.add_view(english_ticket_view)
     bot.add_view(russian_ticket_view)
     
-    # Start background tasks
-    if not update_stats.is_running():
-        update_stats.start()
+    if MEMORY_TRACE_AT_STARTUP:
+        memory.start()
+    
+    # Start periodic tasks (stats, state flushes)
+    periodic.start(bot)
+    
+    # Re-arm persisted ticket timers
+    register_scheduled_actions()
+    scheduler.start()
+    
+    # Transcript export worker
+    exporter.start()
+    
+    # DM delivery workers
+    outbox.start()
+    
+    # Read-only HTTP status API
+    if STATUS_API_ENABLED:
+        await status_api.start()
     
     # Set bot status
     await bot.change_presence(
@@ -58,8 +137,25 @@ async def on_member_join(member):
     try:
         guild = member.guild
         
+        # Raid detection - O(1) per join
+        trip_reason = raid_guard.check_join(member)
+        if trip_reason:
+            await send_raid_alert(guild, trip_reason)
+        if raid_guard.is_locked(guild.id):
+            raid_guard.note_suppressed(guild.id)
+            return
+        
         # Find language selection channel
-        language_channel = discord.utils.get(guild.text_channels, name=CHANNELS['choose_language'])
+        language_channel = discord.utils.get(guild.text_channels, name=guild_configs.get(guild.id).channels['choose_language'])
+        
+        # Auto onboarding: assign the language role from the detected locale (batched)
+        if ONBOARDING_MODE == 'auto':
+            language, source = detect_member_language(member, locales)
+            if language:
+                onboarding_roles.add(member, language)
+                logger.info(f"Auto-assigning {language} to {member.name} (from {source})")
+                outbox.send(member, create_auto_welcome_embed(member, language, language_channel), 'welcome')
+                return
         
         if language_channel:
             # Create welcome embed
@@ -75,16 +171,113 @@ async def on_member_join(member):
                 color=COLORS['primary']
             )
             
-            # Send DM to new member
-            try:
-                await member.send(embed=embed)
-                logger.info(f"Sent welcome DM to {member.name}")
-            except discord.Forbidden:
-                logger.warning(f"Could not send DM to {member.name} - DMs disabled")
+            # Queue DM to new member
+            outbox.send(member, embed, 'welcome')
         
     except Exception as e:
         logger.error(f"Error handling member join: {e}")
 
+def create_auto_welcome_embed(member, language, language_channel):
+    """Welcome DM for members whose language role was assigned automatically"""
+    switch_hint = f"\n\n{language_channel.mention}" if language_channel else ""
+    if language == 'russian':
+        return create_embed(
+            "🌐 Добро пожаловать в CSMarketCap!",
+            f"Привет, {member.mention}! Добро пожаловать в наше сообщество трейдеров скинов CS2.\n\n"
+            f"Мы открыли вам русскоязычные каналы. Если вы предпочитаете английский, "
+            f"смените язык в канале выбора языка.{switch_hint}\n\n"
+            "Удачной торговли! 🎮",
+            color=COLORS['primary']
+        )
+    return create_embed(
+        "🌐 Welcome to CSMarketCap!",
+        f"Hello {member.mention}! Welcome to our CS2 skin trading community.\n\n"
+        f"We've opened the English channels for you. If you'd prefer Russian, "
+        f"switch languages in the language selection channel.{switch_hint}\n\n"
+        "Happy trading! 🎮",
+        color=COLORS['primary']
+    )
+
+async def send_raid_alert(guild, reason):
+    """Alert staff that the guild entered raid lockdown"""
+    names = guild_configs.get(guild.id)
+    channel = discord.utils.get(guild.text_channels, name=RAID_ALERT_CHANNEL) or guild.system_channel
+    if not channel:
+        logger.warning(f"No channel to post raid alert in {guild.name}")
+        return
+    
+    admin_role = discord.utils.get(guild.roles, name=names.roles['admin'])
+    moderator_role = discord.utils.get(guild.roles, name=names.roles['moderator'])
+    mentions = ' '.join(role.mention for role in (admin_role, moderator_role) if role)
+    
+    embed = create_embed(
+        "🚨 Raid Detected - Lockdown Enabled",
+        f"**Trigger:** {reason}\n\n"
+        "While lockdown is active:\n"
+        "• Welcome DMs are suppressed\n"
+        "• Language role assignment is paused\n\n"
+        f"Lockdown lifts automatically after {RAID_LOCKDOWN_MINUTES:g} minutes without suspicious joins.\n"
+        "Use `!lockdown off` to lift it now.",
+        color=COLORS['error']
+    )
+    try:
+        await channel.send(content=mentions or None, embed=embed)
+    except discord.HTTPException as e:
+        logger.error(f"Could not send raid alert: {e}")
+
+@bot.listen('on_connect')
+async def gateway_connected():
+    status_api.set_gateway(True)
+
+@bot.listen('on_resumed')
+async def gateway_resumed():
+    status_api.set_gateway(True)
+
+@bot.listen('on_disconnect')
+async def gateway_disconnected():
+    status_api.set_gateway(False)
+
+@bot.listen('on_member_join')
+async def count_joined_member(member):
+    member_counts.member_joined(member)
+
+@bot.event
+async def on_member_remove(member):
+    """Keep cached role counts current when members leave"""
+    member_counts.member_left(member)
+
+@bot.event
+async def on_member_update(before, after):
+    """Keep cached role counts current when roles change"""
+    member_counts.member_updated(before, after)
+
+@bot.event
+async def on_guild_role_delete(role):
+    member_counts.role_deleted(role)
+
+@bot.listen('on_interaction')
+async def record_interaction_locale(interaction):
+    """Remember each user's client locale for locale-based language roles"""
+    locales.observe(interaction.user.id, interaction.locale)
+
+@bot.event
+async def on_message(message):
+    """Parse prefix commands only when enabled and the message starts with the prefix"""
+    # Slash commands arrive as interactions; everything else skips command parsing entirely
+    if PREFIX_COMMANDS_ENABLED and message.content.startswith(BOT_PREFIX):
+        await bot.process_commands(message)
+
+@bot.listen('on_message')
+async def track_ticket_messages(message):
+    """Feed ticket analytics from messages posted in ticket threads"""
+    if message.author.bot or not analytics.is_ticket(message.channel.id):
+        return
+    
+    roles = guild_configs.get(message.guild.id).roles
+    staff_roles = (roles['admin'], roles['moderator'])
+    is_staff = any(role.name in staff_roles for role in getattr(message.author, 'roles', []))
+    analytics.ticket_message(message.channel.id, message.author.id, is_staff, message.created_at.timestamp())
+
 @bot.event
 async def on_command_error(ctx, error):
     """Handle command errors"""
@@ -109,50 +302,78 @@ async def on_command_error(ctx, error):
         )
         await ctx.send(embed=embed)
 
-@tasks.loop(seconds=10)
-async def update_stats():
-    """Update server statistics every 10 seconds"""
-    try:
-        for guild in bot.guilds:
-            total_members, online_members = get_member_count_stats(guild)
-            
-            # Find stat channels by checking each voice channel
-            total_channel = None
-            online_channel = None
-            
-            for channel in guild.voice_channels:
-                if channel.name.startswith("📊 Total Members:"):
-                    total_channel = channel
-                elif channel.name.startswith("🟢 Online Members:"):
-                    online_channel = channel
-            
-            # Update channel names
-            if total_channel:
-                new_name = CHANNELS['total_members'].format(total_members)
-                if total_channel.name != new_name:
-                    await total_channel.edit(name=new_name)
-                    logger.info(f"Updated total members channel: {new_name}")
-            
-            if online_channel:
-                new_name = CHANNELS['online_members'].format(online_members)
-                if online_channel.name != new_name:
-                    await online_channel.edit(name=new_name)
-                    logger.info(f"Updated online members channel: {new_name}")
-                    
-    except Exception as e:
-        logger.error(f"Error updating stats: {e}")
+@periodic.register('flush_state', 10)
+async def flush_state():
+    """Save ticket analytics and member locales that changed since the last save"""
+    if analytics.dirty:
+        analytics.save()
+    if locales.dirty:
+        locales.save()
+
+@periodic.register('content_reload', CONTENT_WATCH_INTERVAL)
+async def watch_content():
+    """Apply the content file when it changed"""
+    await content.reload()
+
+@periodic.register('archive_idle_tickets', TICKET_ARCHIVE_SWEEP_SECONDS, per_guild=True)
+async def archive_idle_tickets(guild):
+    """Archive idle open tickets, and the least recently used ones near the active thread cap"""
+    idle_seconds = TICKET_ARCHIVE_IDLE_HOURS * 3600 if TICKET_ARCHIVE_IDLE_HOURS > 0 else float('inf')
+    for thread in placement.idle_tickets(guild, analytics.open_tickets, idle_seconds):
+        try:
+            await thread.edit(archived=True, reason="Idle ticket archived (reopens on the next message)")
+            logger.info(f"Archived idle ticket {thread.name}")
+        except discord.HTTPException as e:
+            logger.warning(f"Could not archive idle ticket {thread.name}: {e}")
 
-@update_stats.before_loop
-async def before_update_stats():
-    """Wait for bot to be ready before starting stats loop"""
-    await bot.wait_until_ready()
+@periodic.register('update_stats', STATS_UPDATE_INTERVAL, per_guild=True)
+async def update_guild_stats(guild):
+    """Sample member counts and refresh the stat channels of one guild"""
+    names = guild_configs.get(guild.id)
+    total_members, online_members = get_member_count_stats(guild)
+    member_counts.sample(guild.id, total_members, online_members)
+    await stats_history.record(guild.id, total_members, online_members)
+    # Health tracks sampling; the renames below can wait on rate limits for minutes
+    status_api.beat('update_stats')
+    
+    # Recount roles now and then to correct drift from missed events
+    if member_counts.needs_reconcile(guild.id):
+        member_counts.reconcile(guild)
+    
+    # Find stat channels by checking each voice channel
+    total_prefix = names.channels['total_members'].split('{}')[0]
+    online_prefix = names.channels['online_members'].split('{}')[0]
+    total_channel = None
+    online_channel = None
+    
+    for channel in guild.voice_channels:
+        if channel.name.startswith(total_prefix):
+            total_channel = channel
+        elif channel.name.startswith(online_prefix):
+            online_channel = channel
+    
+    # Update channel names
+    if total_channel:
+        new_name = names.channels['total_members'].format(total_members)
+        if total_channel.name != new_name:
+            await total_channel.edit(name=new_name)
+            logger.info(f"Updated total members channel: {new_name}")
+    
+    if online_channel:
+        new_name = names.channels['online_members'].format(online_members)
+        if online_channel.name != new_name:
+            await online_channel.edit(name=new_name)
+            logger.info(f"Updated online members channel: {new_name}")
 
 # ADMIN-ONLY COMMANDS
 
-@bot.command(name='fresh')
+@bot.hybrid_command(name='fresh')
 @is_admin()
 async def fresh_setup(ctx):
     """Complete server wipe and recreation (ADMIN ONLY)"""
+    if await guild_is_busy(ctx):
+        return
+    
     embed = create_embed(
         "⚠️ DANGEROUS OPERATION",
         "This will **COMPLETELY WIPE** the server and recreate it from scratch.\n\n"
@@ -160,89 +381,331 @@ async def fresh_setup(ctx):
         "• All channels\n"
         "• All roles (except protected)\n"
         "• All messages\n\n"
-        "**Type `CONFIRM` within 30 seconds to proceed.**",
+        "A snapshot is saved first, so `!restore` can bring the current layout back.",
         color=COLORS['error']
     )
     await ctx.send(embed=embed)
     
-    def check(m):
-        return m.author == ctx.author and m.channel == ctx.channel and m.content == 'CONFIRM'
+    plan = plan_operation(ctx.guild, 'fresh')
+    if not await confirm_plan(ctx, plan):
+        return
     
-    try:
-        await bot.wait_for('message', check=check, timeout=30.0)
-    except asyncio.TimeoutError:
-        embed = create_embed(
-            "❌ Cancelled",
-            "Fresh setup cancelled - no confirmation received.",
-            color=COLORS['warning']
+    async def work(job):
+        job.set_phase("Saving snapshot")
+        name, _ = await snapshots.save(ctx.guild, guild_panels(ctx.guild))
+        await perform_fresh_setup(ctx.guild, job)
+        return create_embed(
+            "✅ Fresh Setup Complete",
+            "Server has been completely wiped and recreated!\n"
+            "The CSMarketCap community is ready for action! 🎮\n\n"
+            f"Snapshot of the old layout: `{name}`\n"
+            f"Took {format_duration(job.duration())} (planned {format_duration(plan.estimate())}).",
+            color=COLORS['success']
         )
-        await ctx.send(embed=embed)
+    
+    await start_job(ctx, 'fresh', work)
+
+@bot.hybrid_command(name='setup')
+@is_admin()
+async def setup_server(ctx):
+    """Standard server setup (ADMIN ONLY)"""
+    if await guild_is_busy(ctx):
         return
     
-    embed = create_embed(
-        "🔄 Fresh Setup Starting",
-        "Starting complete server wipe and recreation...\nThis may take several minutes.",
-        color=COLORS['info']
-    )
-    await ctx.send(embed=embed)
+    plan = plan_operation(ctx.guild, 'setup')
+    if not await confirm_plan(ctx, plan):
+        return
+    
+    async def work(job):
+        await perform_server_setup(ctx.guild, job)
+        return create_embed(
+            "✅ Setup Complete",
+            "Server setup completed successfully!\n"
+            "CSMarketCap is ready for trading! 🎮\n\n"
+            f"Took {format_duration(job.duration())} (planned {format_duration(plan.estimate())}).",
+            color=COLORS['success']
+        )
+    
+    await start_job(ctx, 'setup', work)
+
+@bot.hybrid_command(name='cleanup')
+@is_admin()
+async def cleanup_server(ctx):
+    """Clean server without full recreation (ADMIN ONLY)"""
+    if await guild_is_busy(ctx):
+        return
+    
+    plan = plan_operation(ctx.guild, 'cleanup')
+    if not await confirm_plan(ctx, plan):
+        return
+    
+    async def work(job):
+        await perform_cleanup(ctx.guild, job)
+        return create_embed(
+            "✅ Cleanup Complete",
+            "Server cleanup completed successfully!\n\n"
+            f"Took {format_duration(job.duration())} (planned {format_duration(plan.estimate())}).",
+            color=COLORS['success']
+        )
     
-    await perform_fresh_setup(ctx.guild)
+    await start_job(ctx, 'cleanup', work)
+
+@bot.hybrid_command(name='jobs')
+@is_admin()
+async def list_jobs(ctx):
+    """Show the running job, recent jobs and average durations (ADMIN ONLY)"""
+    running = jobs.running(ctx.guild.id)
+    fields = []
+    if running:
+        fields.append({'name': '🔄 Running', 'value': job_progress_text(running), 'inline': False})
+    
+    recent = jobs.recent(ctx.guild.id)
+    if recent:
+        fields.append({
+            'name': '📋 Recent',
+            'value': "\n".join(
+                f"{JOB_STATUS_ICONS[record['status']]} #{record['id']} `{record['name']}` - "
+                f"{format_duration(record['duration'])} • <t:{int(record['started_at'])}:R>"
+                for record in recent
+            ),
+            'inline': False
+        })
+    
+    durations = jobs.durations(ctx.guild.id)
+    if durations:
+        fields.append({
+            'name': '⏱️ Durations (completed runs)',
+            'value': "\n".join(
+                f"`{name}`: {runs} runs • avg {format_duration(average)} • max {format_duration(longest)}"
+                for name, (runs, average, longest) in sorted(durations.items(), key=lambda item: -item[1][1])
+            ),
+            'inline': False
+        })
     
     embed = create_embed(
-        "✅ Fresh Setup Complete",
-        "Server has been completely wiped and recreated!\n"
-        "The CSMarketCap community is ready for action! 🎮",
-        color=COLORS['success']
+        "🧰 Jobs",
+        "Long admin operations run in the background, one at a time per server." if fields else "No jobs have run yet.",
+        color=COLORS['info'],
+        fields=fields
     )
     await ctx.send(embed=embed)
 
-@bot.command(name='setup')
+@bot.hybrid_command(name='cancel')
 @is_admin()
-async def setup_server(ctx):
-    """Standard server setup (ADMIN ONLY)"""
-    embed = create_embed(
-        "🔄 Server Setup",
-        "Starting server setup...\nThis may take a few minutes.",
-        color=COLORS['info']
-    )
+async def cancel_job(ctx, job_id: int = None):
+    """Cancel the running job (ADMIN ONLY)"""
+    job = jobs.cancel(ctx.guild.id, job_id)
+    if job:
+        embed = create_embed(
+            "⏹️ Cancelling Job",
+            f"Cancelling #{job.id} `{job.name}` - it stops at its next API call.\n"
+            "Changes already made are kept; `!restore` can bring back the last snapshot.",
+            color=COLORS['warning']
+        )
+    else:
+        embed = create_embed(
+            "ℹ️ Nothing To Cancel",
+            "No job is running" + (f" with id #{job_id}." if job_id is not None else "."),
+            color=COLORS['info']
+        )
     await ctx.send(embed=embed)
-    
-    await perform_server_setup(ctx.guild)
-    
+
+JOB_STATUS_ICONS = {'queued': '⏳', 'running': '🔄', 'done': '✅', 'failed': '❌', 'cancelled': '⏹️'}
+
+def job_progress_text(job):
+    progress = f"{job.done}/{job.total}" if job.total else str(job.done) if job.done else None
+    lines = [f"**#{job.id}** `{job.name}` • {job.status} • {format_duration(job.duration())}"]
+    if job.phase:
+        lines.append(f"**{job.phase}**" + (f": {progress}" if progress else ""))
+    return "\n".join(lines)
+
+def job_embed(job):
+    """Progress (or final state) of a job"""
+    description = job_progress_text(job)
+    if job.status == 'failed':
+        description += f"\n\n**Error:** {job.error}"
+    elif job.status == 'cancelled':
+        description += "\n\nStopped part-way - changes already made are kept. `!restore` can bring back the last snapshot."
+    return create_embed(
+        f"{JOB_STATUS_ICONS[job.status]} Job #{job.id}: {job.name}",
+        description,
+        color=COLORS['error'] if job.status == 'failed' else COLORS['warning'] if job.status == 'cancelled' else COLORS['info']
+    )
+
+async def render_job(job):
+    """Edit a job's progress message in place (called by the runner, throttled)"""
+    if job.message is None:
+        return
+    embed = job.result if job.status == 'done' and isinstance(job.result, discord.Embed) else job_embed(job)
+    try:
+        await job.message.edit(embed=embed)
+    except discord.NotFound:
+        job.message = None  # e.g. !fresh deleted the channel it was posted in
+
+async def guild_is_busy(ctx):
+    """Tell the admin (and return True) if another job is running in this server"""
+    running = jobs.running(ctx.guild.id)
+    if running:
+        await ctx.send(embed=create_embed(
+            "⏳ Another Job Is Running",
+            f"{job_progress_text(running)}\n\nWait for it to finish or stop it with `!cancel`.",
+            color=COLORS['warning']
+        ))
+    return running is not None
+
+async def start_job(ctx, name, work):
+    """Run ``work(job)`` as a background job with a progress message; returns the job or None"""
+    try:
+        job = jobs.start(ctx.guild.id, name, work, user_id=ctx.author.id)
+    except JobBusy:
+        await guild_is_busy(ctx)
+        return None
+    job.message = await ctx.send(embed=job_embed(job))
+    if job.finished_at:
+        await render_job(job)
+    return job
+
+@bot.hybrid_command(name='plan')
+@is_admin()
+async def plan_command(ctx, operation: str = 'setup'):
+    """Dry-run !fresh, !setup or !cleanup: planned calls and ETA, exported as JSON (ADMIN ONLY)"""
+    if operation not in PLANNED_OPERATIONS:
+        await ctx.send(embed=create_embed(
+            "❌ Unknown Operation",
+            f"Use one of: {', '.join(f'`{name}`' for name in PLANNED_OPERATIONS)}",
+            color=COLORS['error']
+        ))
+        return
+    await send_plan(ctx, plan_operation(ctx.guild, operation))
+
+async def send_plan(ctx, plan, footer=None, view=None):
+    """Post a plan summary with the full plan attached as JSON"""
+    actions = plan.actions()
+    requests = plan.requests()
+    fields = [
+        {'name': 'Creates', 'value': str(actions['create']), 'inline': True},
+        {'name': 'Edits', 'value': str(actions['edit']), 'inline': True},
+        {'name': 'Deletes', 'value': str(actions['delete']), 'inline': True},
+        {'name': 'Messages', 'value': str(actions['send']), 'inline': True},
+        {'name': 'REST Calls', 'value': str(sum(requests.values())), 'inline': True},
+        {'name': 'Estimated Time', 'value': format_duration(plan.estimate()), 'inline': True},
+        {
+            'name': 'Calls per Route',
+            'value': "\n".join(f"`{route}`: {count}" for route, count in requests.most_common()) or "None",
+            'inline': False
+        }
+    ]
+    if plan.warnings:
+        fields.append({
+            'name': f'⚠️ Warnings ({len(plan.warnings)})',
+            'value': "\n".join(f"• {warning}" for warning in plan.warnings[:5])[:1024],
+            'inline': False
+        })
+    
+    description = f"Dry run of `!{plan.operation}` against the current server state. Nothing has been changed."
+    if footer:
+        description += f"\n\n{footer}"
+    os.makedirs(DATA_DIR, exist_ok=True)
+    path = os.path.join(DATA_DIR, f'plan_{ctx.guild.id}_{plan.operation}.json')
+    plan.write(path)
+    embed = create_embed(f"📋 Plan: !{plan.operation}", description, color=COLORS['info'], fields=fields)
+    await ctx.send(embed=embed, file=discord.File(path), view=view)
+
+async def confirm_plan(ctx, plan):
+    """Show the plan with Confirm/Cancel buttons; returns whether to proceed"""
+    view = ConfirmView(ctx.author.id)
+    await send_plan(ctx, plan, footer="**Press Confirm within 30 seconds to proceed.**", view=view)
+    return await wait_for_confirmation(ctx, view, f"`!{plan.operation}`")
+
+async def wait_for_confirmation(ctx, view, operation):
+    """Wait for a ConfirmView; tells the admin when the operation was not confirmed"""
+    await view.wait()
+    if not view.confirmed:
+        embed = create_embed(
+            "❌ Cancelled",
+            f"{operation} cancelled - no confirmation received.",
+            color=COLORS['warning']
+        )
+        await ctx.send(embed=embed)
+    return view.confirmed
+
+@bot.hybrid_command(name='snapshot')
+@is_admin()
+async def snapshot_command(ctx):
+    """Save the server's roles, channels, overwrites and panels to a snapshot file (ADMIN ONLY)"""
+    name, snapshot = await snapshots.save(ctx.guild, guild_panels(ctx.guild))
     embed = create_embed(
-        "✅ Setup Complete",
-        "Server setup completed successfully!\n"
-        "CSMarketCap is ready for trading! 🎮",
-        color=COLORS['success']
+        "💾 Snapshot Saved",
+        f"Saved as `{name}`. Use `!restore {name}` to recreate it.",
+        color=COLORS['success'],
+        fields=[
+            {'name': 'Roles', 'value': str(len(snapshot['roles'])), 'inline': True},
+            {'name': 'Categories', 'value': str(len(snapshot['categories'])), 'inline': True},
+            {'name': 'Channels', 'value': str(len(snapshot['channels'])), 'inline': True},
+            {'name': 'Panels', 'value': str(len(snapshot['panels'])), 'inline': True}
+        ]
     )
     await ctx.send(embed=embed)
 
-@bot.command(name='cleanup')
+@bot.hybrid_command(name='snapshots')
 @is_admin()
-async def cleanup_server(ctx):
-    """Clean server without full recreation (ADMIN ONLY)"""
+async def list_snapshots(ctx):
+    """List saved snapshots for this server (ADMIN ONLY)"""
+    names = snapshots.list(ctx.guild.id)
     embed = create_embed(
-        "🧹 Server Cleanup",
-        "Starting server cleanup...",
+        "💾 Snapshots",
+        "\n".join(f"`{name}`" for name in names[:20]) if names else "No snapshots yet - use `!snapshot`.",
         color=COLORS['info']
     )
     await ctx.send(embed=embed)
+
+@bot.hybrid_command(name='restore')
+@is_admin()
+async def restore_snapshot(ctx, name: str = None):
+    """Recreate a saved snapshot; existing roles and channels with the same names are kept (ADMIN ONLY)"""
+    if await guild_is_busy(ctx):
+        return
     
-    await perform_cleanup(ctx.guild)
+    try:
+        name, snapshot = await asyncio.to_thread(snapshots.load, ctx.guild.id, name)
+    except (OSError, ValueError) as e:
+        await ctx.send(embed=create_embed("❌ Snapshot Not Found", str(e), color=COLORS['error']))
+        return
     
     embed = create_embed(
-        "✅ Cleanup Complete",
-        "Server cleanup completed successfully!",
-        color=COLORS['success']
+        "⚠️ Restore Snapshot",
+        f"This will recreate `{name}`: {len(snapshot['roles'])} roles, {len(snapshot['categories'])} categories "
+        f"and {len(snapshot['channels'])} channels. Anything that already exists by name is kept as is.\n\n"
+        "**Press Confirm within 30 seconds to proceed.**",
+        color=COLORS['warning']
     )
-    await ctx.send(embed=embed)
+    view = ConfirmView(ctx.author.id)
+    await ctx.send(embed=embed, view=view)
+    if not await wait_for_confirmation(ctx, view, "Restore"):
+        return
+    
+    async def work(job):
+        job.set_phase(f"Restoring {name}")
+        result = await snapshots.restore(ctx.guild, snapshot, post_panel=post_panel)
+        fields = [
+            {'name': section.title(), 'value': f"{count} created, {result.reused.get(section, 0)} kept", 'inline': True}
+            for section, count in result.created.items()
+        ]
+        return create_embed(
+            "✅ Restore Complete" if not result.failed else "⚠️ Restore Finished With Errors",
+            f"Restored `{name}` in {result.elapsed:.1f}s" + (f" - {result.failed} items failed (see logs)." if result.failed else "."),
+            color=COLORS['success'] if not result.failed else COLORS['warning'],
+            fields=fields
+        )
+    
+    await start_job(ctx, 'restore', work)
 
-@bot.command(name='language')
+@bot.hybrid_command(name='language')
 @is_admin()
 async def manual_language_setup(ctx):
     """Manually setup language selection (ADMIN ONLY)"""
     # Find language channel
-    language_channel = discord.utils.get(ctx.guild.text_channels, name=CHANNELS['choose_language'])
+    language_channel = discord.utils.get(ctx.guild.text_channels, name=guild_configs.get(ctx.guild.id).channels['choose_language'])
     
     if not language_channel:
         embed = create_embed(
@@ -262,7 +725,7 @@ async def manual_language_setup(ctx):
     )
     await ctx.send(embed=embed)
 
-@bot.command(name='help')
+@bot.hybrid_command(name='help')
 @is_admin()
 async def help_command(ctx):
     """Show bot commands (ADMIN ONLY)"""
@@ -272,19 +735,40 @@ async def help_command(ctx):
             'value': '`!fresh` - Complete server wipe and recreation\n'
                     '`!setup` - Standard server setup\n'
                     '`!cleanup` - Clean server without recreation\n'
+                    '`!plan [fresh|setup|cleanup]` - Dry run: planned calls and ETA (JSON)\n'
+                    '`!jobs` / `!cancel [id]` - Running and recent background jobs / stop the running one\n'
                     '`!language` - Setup language selection\n'
+                    '`!snapshot` / `!snapshots` - Save / list server structure snapshots\n'
+                    '`!restore [file]` - Recreate a snapshot (newest by default)\n'
                     '`!refresh_support` - Refresh support channel buttons\n'
                     '`!clear_support` - Clear all support channel messages\n'
                     '`!reset_tickets` - Clear stuck active tickets\n'
                     '`!fix_bot_permissions` - Check and fix bot permissions\n'
+                    '`!audit_permissions [fix]` - Check all channel permissions against the setup rules\n'
                     '`!check_tickets` - Show active tickets status\n'
-                    '`!clear_user_tickets <user_id>` - Clear tickets for specific user',
+                    '`!clear_user_tickets <user_id>` - Clear tickets for specific user\n'
+                    '`!transcript <thread_id>` - Download a closed ticket transcript\n'
+                    '`!search_tickets <text> [user:] [lang:] [from:] [to:] [page:]` - Search closed tickets\n'
+                    '`!reindex_tickets` - Index transcripts missing from search\n'
+                    '`!ticket_stats` - Ticket response/resolution times and backlog\n'
+                    '`!export_metrics` - Download ticket metrics (Prometheus format)',
             'inline': False
         },
         {
             'name': '📊 Information Commands',
             'value': '`!info` - Bot information\n'
                     '`!stats` - Server statistics\n'
+                    '`!export_stats [1m|1h|1d] [days]` - Download member history (CSV)\n'
+                    '`!guild_config` - Show/override this server\'s role and channel names\n'
+                    '`!reload_content` - Apply the content file now\n'
+                    '`!sync_commands` - Force a slash command sync\n'
+                    '`!tasks` - Periodic task metrics\n'
+                    '`!memory [start|stop]` - Memory report with allocation growth\n'
+                    '`!profile [seconds]` - CPU profile with a flame graph file\n'
+                    '`!latency` - Interaction ack/completion latency\n'
+                    '`!dm_stats` - DM delivery queue statistics\n'
+                    '`!lockdown [on|off]` - Raid lockdown status and control\n'
+                    '`!language_roles <mode>` - Bulk assign/migrate language roles\n'
                     '`!help` - Show this help message',
             'inline': False
         },
@@ -309,10 +793,20 @@ async def help_command(ctx):
     
     await ctx.send(embed=embed)
 
-@bot.command(name='info')
+def language_role_totals():
+    """English/Russian role counts across guilds from the count cache"""
+    totals = {language: 0 for language in LANGUAGE_KEYS}
+    for guild in bot.guilds:
+        for language in LANGUAGE_KEYS:
+            role = discord.utils.get(guild.roles, name=guild_configs.get(guild.id).roles[language])
+            totals[language] += member_counts.role_count(guild.id, role)
+    return ' • '.join(f'{language.title()} {count}' for language, count in totals.items())
+
+@bot.hybrid_command(name='info')
 @is_admin()
 async def bot_info(ctx):
     """Show bot information (ADMIN ONLY)"""
+    runtime_info = runtime.describe(bot)
     fields = [
         {
             'name': '🤖 Bot Information',
@@ -322,10 +816,19 @@ async def bot_info(ctx):
                     f'**Uptime:** Online since bot start',
             'inline': False
         },
+        {
+            'name': '⚙️ Runtime',
+            'value': f"**Profile:** {runtime_info['profile']}\n"
+                    f"**Event Loop:** {runtime_info['event_loop']}\n"
+                    f"**JSON:** {runtime_info['json']}\n"
+                    f"**Message Cache:** {runtime_info['message_cache']}",
+            'inline': False
+        },
         {
             'name': '📊 Server Statistics',
             'value': f'**Servers:** {len(bot.guilds)}\n'
                     f'**Total Members:** {sum(guild.member_count for guild in bot.guilds)}\n'
+                    f'**Language Roles:** {language_role_totals()}\n'
                     f'**Ping:** {round(bot.latency * 1000)}ms',
             'inline': False
         },
@@ -349,19 +852,33 @@ async def bot_info(ctx):
     
     await ctx.send(embed=embed)
 
-@bot.command(name='stats')
+@bot.hybrid_command(name='stats')
 @is_admin()
 async def server_stats(ctx):
     """Show server statistics (ADMIN ONLY)"""
+    await ctx.defer()  # slash commands must answer within 3 seconds
     guild = ctx.guild
-    total_members, online_members = get_member_count_stats(guild)
+    names = guild_configs.get(guild.id)
+    
+    # Cached counts (O(1)); only counted here before the stats loop's first pass
+    snapshot = member_counts.snapshot(guild.id)
+    if snapshot is None or snapshot['total'] is None:
+        member_counts.sample(guild.id, *get_member_count_stats(guild))
+        member_counts.reconcile(guild)
+        snapshot = member_counts.snapshot(guild.id)
+    total_members, online_members = snapshot['total'], snapshot['online']
     
     # Count roles
-    english_role = discord.utils.get(guild.roles, name=ROLES['english'])
-    russian_role = discord.utils.get(guild.roles, name=ROLES['russian'])
+    english_role = discord.utils.get(guild.roles, name=names.roles['english'])
+    russian_role = discord.utils.get(guild.roles, name=names.roles['russian'])
+    
+    english_count = member_counts.role_count(guild.id, english_role)
+    russian_count = member_counts.role_count(guild.id, russian_role)
     
-    english_count = len(english_role.members) if english_role else 0
-    russian_count = len(russian_role.members) if russian_role else 0
+    trends = await stats_history.trends(guild.id)
+    
+    def signed(value):
+        return 'n/a' if value is None else f'{value:+d}'
     
     fields = [
         {
@@ -384,91 +901,498 @@ async def server_stats(ctx):
                     f'**Text Channels:** {len(guild.text_channels)}\n'
                     f'**Voice Channels:** {len(guild.voice_channels)}',
             'inline': True
+        },
+        {
+            'name': '📈 Trends',
+            'value': f"**Members 24h:** {signed(trends['delta_24h'])} • **7d:** {signed(trends['delta_7d'])}\n"
+                    f"**Peak online 24h:** {trends['peak_online_24h'] or 'n/a'} • "
+                    f"**7d:** {trends['peak_online_7d'] or 'n/a'} • "
+                    f"**All time:** {trends['peak_online_all'] or 'n/a'}",
+            'inline': False
         }
     ]
     
     embed = create_embed(
         "📊 Server Statistics",
-        f"Statistics for **{guild.name}**",
+        f"Statistics for **{guild.name}**\n"
+        f"*Counts as of {format_duration(time.time() - snapshot['sampled_at'])} ago • "
+        f"roles recounted {format_duration(time.time() - snapshot['reconciled_at'])} ago*",
         color=COLORS['secondary'],
         fields=fields
     )
     
     await ctx.send(embed=embed)
 
-@bot.command(name='refresh_support')
+@bot.hybrid_command(name='export_stats')
 @is_admin()
-async def refresh_support_channels(ctx):
-    """Refresh support channel messages with updated buttons (ADMIN ONLY)"""
+async def export_stats(ctx, resolution: str = '1h', days: int = 30):
+    """Download member/online history as CSV (ADMIN ONLY)"""
+    await ctx.defer()
+    if resolution not in RESOLUTIONS:
+        await ctx.send(embed=create_embed(
+            "❌ Unknown Resolution",
+            f"Use one of: {', '.join(f'`{name}`' for name in RESOLUTIONS)}",
+            color=COLORS['error']
+        ))
+        return
+    
+    since = time.time() - days * 86400
+    text, rows = await stats_history.export_csv(ctx.guild.id, resolution, since)
+    os.makedirs(DATA_DIR, exist_ok=True)
+    path = os.path.join(DATA_DIR, f'stats_{ctx.guild.id}_{resolution}.csv')
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write(text)
+    await ctx.send(f"📈 {rows} `{resolution}` samples from the last {days} days", file=discord.File(path))
+
+@bot.hybrid_command(name='guild_config')
+@is_admin()
+async def guild_config_command(ctx, action: str = 'show', section: str = None, key: str = None, *, value: str = None):
+    """Show or override this server's role/category/channel names (ADMIN ONLY)
+
+    Usage: !guild_config show | set <roles|categories|channels> <key> <name> | reset <section> <key> | reload
+    """
+    guild_id = ctx.guild.id
+    
+    if action == 'show':
+        names = guild_configs.get(guild_id)
+        fields = []
+        for name in SECTIONS:
+            overrides = names.overrides.get(name, {})
+            fields.append({
+                'name': f'⚙️ {name.title()}',
+                'value': '\n'.join(f'`{k}` → {v}' for k, v in overrides.items()) or 'Defaults',
+                'inline': False
+            })
+        await ctx.send(embed=create_embed(
+            "⚙️ Server Configuration",
+            f"Overrides for **{ctx.guild.name}** (everything else uses the defaults)",
+            color=COLORS['info'],
+            fields=fields
+        ))
+        return
+    
+    if action == 'reload':
+        guild_configs.invalidate(guild_id)
+        await ctx.send(embed=create_embed("🔄 Reloaded", "Server configuration will be re-read from disk.", color=COLORS['success']))
+        return
+    
+    if action in ('set', 'reset') and section and key:
+        try:
+            if action == 'set' and value:
+                guild_configs.set_override(guild_id, section, key, value)
+                message = f"`{section}.{key}` is now **{value}**"
+            elif action == 'reset':
+                if guild_configs.clear_override(guild_id, section, key):
+                    message = f"`{section}.{key}` is back to its default"
+                else:
+                    message = f"`{section}.{key}` was not overridden"
+            else:
+                raise ValueError("missing value")
+        except (KeyError, ValueError) as e:
+            await ctx.send(embed=create_embed("❌ Invalid Setting", f"Could not update `{section}.{key}`: {e}", color=COLORS['error']))
+            return
+        await ctx.send(embed=create_embed("✅ Configuration Updated", message, color=COLORS['success']))
+        return
+    
+    await ctx.send(embed=create_embed(
+        "❌ Invalid Usage",
+        "`!guild_config show` • `!guild_config set <roles|categories|channels> <key> <name>` • "
+        "`!guild_config reset <section> <key>` • `!guild_config reload`",
+        color=COLORS['error']
+    ))
+
+@bot.hybrid_command(name='reload_content')
+@is_admin()
+async def reload_content(ctx):
+    """Apply the content file now and report validation problems (ADMIN ONLY)"""
+    result = await content.reload()
+    if content.last_error:
+        await ctx.send(embed=create_embed(
+            "❌ Content Not Applied",
+            "\n".join(f"• {problem}" for problem in content.last_error[:15]),
+            color=COLORS['error']
+        ))
+    elif result is None:
+        await ctx.send(embed=create_embed("ℹ️ No Changes", f"`{content.path}` has not changed.", color=COLORS['info']))
+    else:
+        changed, names_changed = result
+        await ctx.send(embed=create_embed(
+            "✅ Content Reloaded",
+            f"**Panels re-rendered:** {', '.join(changed) or 'none'}\n"
+            f"**Names changed:** {'yes' if names_changed else 'no'}",
+            color=COLORS['success']
+        ))
+
+@bot.hybrid_command(name='sync_commands')
+@is_admin()
+async def sync_commands(ctx):
+    """Push the slash command tree to Discord even if it looks unchanged (ADMIN ONLY)"""
+    await ctx.defer()
+    try:
+        count = await command_sync.sync(bot.tree, bot.application_id, force=True)
+    except discord.HTTPException as e:
+        await ctx.send(embed=create_embed("❌ Sync Failed", str(e), color=COLORS['error']))
+        return
+    await ctx.send(embed=create_embed(
+        "✅ Commands Synced",
+        f"**Application commands:** {count}\n**Tree hash:** `{command_sync.state['hash'][:12]}`",
+        color=COLORS['success']
+    ))
+
+@bot.hybrid_command(name='tasks')
+@is_admin()
+async def periodic_tasks(ctx):
+    """Show periodic task runs, failures, overruns and durations (ADMIN ONLY)"""
+    fields = []
+    for name, summary in periodic.summary().items():
+        scope = f"{summary['instances']} servers" if summary['per_guild'] else 'global'
+        avg = f"{summary['avg_ms']}ms" if summary['avg_ms'] is not None else '-'
+        fields.append({
+            'name': f"{'⚠️' if summary['failing'] else '✅'} {name} (every {summary['interval']:g}s, {scope})",
+            'value': (
+                f"Runs: {summary['runs']} | Failures: {summary['failures']} | Failing now: {summary['failing']}\n"
+                f"Overruns: {summary['overruns']} | Restarts: {summary['restarts']}\n"
+                f"Avg: {avg} | Max: {summary['max_ms']}ms"
+            ),
+            'inline': False
+        })
+    await ctx.send(embed=create_embed("⏱️ Periodic Tasks", "Counters since the bot started.", color=COLORS['info'], fields=fields))
+
+@bot.hybrid_command(name='memory')
+@is_admin()
+async def memory_report(ctx, mode: str = 'report'):
+    """Memory report diffed against the last one; `start`/`stop` toggle tracing (ADMIN ONLY)"""
+    mode = mode.lower()
+    if mode not in ('report', 'start', 'stop'):
+        await ctx.send(embed=create_embed("❌ Invalid Mode", "Use `report`, `start` or `stop`.", color=COLORS['error']))
+        return
+    if mode == 'start':
+        memory.start()
+    elif mode == 'stop':
+        memory.stop()
+    await ctx.defer()
+    
+    report = memory.capture()
+    changes = report['count_changes']
+    counts = "\n".join(
+        f"**{name}:** {count:,}" + (f" ({changes[name]:+,})" if name in changes else "")
+        for name, count in report['counts'].items()
+    )
+    fields = [{'name': '📦 Caches and Objects', 'value': counts or 'None', 'inline': False}]
+    if report['sites']:
+        key = 'size_diff_kb' if report['diffed'] else 'size_kb'
+        sites = "\n".join(f"`{site['site']}` {site[key]:+,.1f} KB" for site in report['sites'][:8])
+        fields.append({
+            'name': '📈 Growth Since Last Report' if report['diffed'] else '📊 Largest Allocation Sites',
+            'value': sites[:1024],
+            'inline': False
+        })
+    
+    description = f"**RSS:** {report['rss_mb']} MB"
+    if report['tracing']:
+        description += f"\n**Traced:** {report['traced_mb']} MB (peak {report['traced_peak_mb']} MB)"
+    else:
+        description += "\nTracing is off - `!memory start` to record allocation sites."
+    if report['since_previous_seconds'] is not None:
+        description += f"\nChanges are since the previous report, {format_duration(report['since_previous_seconds'])} ago."
+    
+    os.makedirs(DATA_DIR, exist_ok=True)
+    path = os.path.join(DATA_DIR, 'memory_report.json')
+    memory.write(report, path)
+    embed = create_embed("🧠 Memory Report", description, color=COLORS['info'], fields=fields)
+    await ctx.send(embed=embed, file=discord.File(path))
+
+@bot.hybrid_command(name='profile')
+@is_admin()
+async def cpu_profile(ctx, seconds: int = 30):
+    """Sample the bot's CPU use for N seconds and attach a flame graph file (ADMIN ONLY)"""
+    if not 1 <= seconds <= PROFILE_MAX_SECONDS:
+        await ctx.send(embed=create_embed("❌ Invalid Duration", f"Use 1 to {PROFILE_MAX_SECONDS} seconds.", color=COLORS['error']))
+        return
+    if cpu_profiler.running:
+        await ctx.send(embed=create_embed("⏳ Already Profiling", "Wait for the current session to finish.", color=COLORS['warning']))
+        return
+    await ctx.send(embed=create_embed("🔬 Profiling", f"Sampling CPU use for {seconds} seconds...", color=COLORS['info']))
+    
+    started_at = time.time()
+    try:
+        profile = await cpu_profiler.profile(seconds)
+    except RuntimeError as e:
+        await ctx.send(embed=create_embed("❌ Profiling Failed", str(e), color=COLORS['error']))
+        return
+    path = cpu_profiler.path_for(started_at)
+    profile.write(path)
+    
+    def share(samples):
+        return f"{samples / profile.samples:.0%}"
+    
+    fields = []
+    if profile.samples:
+        fields = [
+            {'name': '🔥 Top Functions (self)', 'value': "\n".join(f"`{share(count)}` {name}" for name, count in profile.top_self(8))[:1024], 'inline': False},
+            {'name': '📚 Top Functions (total)', 'value': "\n".join(f"`{share(count)}` {name}" for name, count in profile.top_total(8))[:1024], 'inline': False},
+            {'name': '🧵 By Task', 'value': "\n".join(f"`{share(count)}` {name}" for name, count in profile.top_tasks(8))[:1024], 'inline': False}
+        ]
     embed = create_embed(
-        "🔄 Refreshing Support Channels",
-        "Clearing old messages and updating support channels...",
-        color=COLORS['info']
+        "🔬 CPU Profile",
+        f"**Duration:** {profile.elapsed:.1f}s\n"
+        f"**CPU used:** {profile.cpu_seconds:.2f}s ({profile.cpu_share:.0%} of one core)\n"
+        f"**Samples:** {profile.samples} (one per {profile.interval * 1000:g}ms of CPU)\n"
+        f"Saved to `{path}` - open it with speedscope or flamegraph.pl.",
+        color=COLORS['info'],
+        fields=fields
+    )
+    await ctx.send(embed=embed, file=discord.File(path))
+
+@bot.hybrid_command(name='latency')
+@is_admin()
+async def interaction_latency(ctx):
+    """Show interaction ack and completion latency (ADMIN ONLY)"""
+    summary = pipeline.metrics.summary()
+    
+    fields = []
+    for kind, stats in summary.items():
+        fields.append({
+            'name': f'⚡ {kind}',
+            'value': f"**Ack:** p50 {stats['ack_p50_ms']}ms • p95 {stats['ack_p95_ms']}ms • max {stats['ack_max_ms']}ms\n"
+                    f"**Complete:** p50 {stats['complete_p50_ms']}ms • p95 {stats['complete_p95_ms']}ms • max {stats['complete_max_ms']}ms\n"
+                    f"**Samples:** {stats['ack_count']} • **Missed acks:** {stats['failures']}",
+            'inline': False
+        })
+    
+    embed = create_embed(
+        "⚡ Interaction Latency",
+        f"Background tasks in flight: {len(pipeline.tasks)}" if fields else "No interactions recorded yet.",
+        color=COLORS['info'],
+        fields=fields
     )
-    await ctx.send(embed=embed)
     
+    await ctx.send(embed=embed)
+
+@bot.hybrid_command(name='dm_stats')
+@is_admin()
+async def dm_stats(ctx):
+    """Show DM outbox delivery statistics (ADMIN ONLY)"""
+    stats = outbox.snapshot()
+    fields = [
+        {
+            'name': '📬 Queue',
+            'value': f"**Depth:** {stats['depth']}/{stats['capacity']}\n"
+                    f"**Peak depth:** {stats['max_depth']}\n"
+                    f"**Known closed DMs:** {stats['closed_cached']}",
+            'inline': True
+        },
+        {
+            'name': '📤 Delivery',
+            'value': f"**Queued:** {stats['queued']}\n"
+                    f"**Sent:** {stats['sent']}\n"
+                    f"**Failed:** {stats['failed']}",
+            'inline': True
+        },
+        {
+            'name': '🚫 Suppressed',
+            'value': f"**Deduplicated:** {stats['deduplicated']}\n"
+                    f"**DMs closed:** {stats['forbidden']} (+{stats['skipped_closed']} skipped)\n"
+                    f"**Dropped (queue full):** {stats['dropped_full']}",
+            'inline': True
+        }
+    ]
+    embed = create_embed(
+        "📬 DM Outbox",
+        "Welcome and confirmation DM delivery.",
+        color=COLORS['info'],
+        fields=fields
+    )
+    await ctx.send(embed=embed)
+
+@bot.hybrid_command(name='lockdown')
+@is_admin()
+async def lockdown(ctx, mode: str = 'status'):
+    """Show or change raid lockdown (ADMIN ONLY)"""
     guild = ctx.guild
-    updated_channels = []
-    
-    # Find and update English support channel
-    en_support_channel = discord.utils.get(guild.text_channels, name=CHANNELS['en_support'])
-    if en_support_channel:
-        # Delete ALL messages from bot (no limit)
-        deleted_count = 0
-        async for message in en_support_channel.history(limit=None):
-            if message.author == bot.user:
-                try:
-                    await message.delete()
-                    deleted_count += 1
-                    await asyncio.sleep(0.1)  # Rate limit protection
-                except:
-                    pass
-        
-        # Wait a moment to ensure all deletions are processed
-        await asyncio.sleep(1)
-        
-        # Send new support message
-        await setup_support_channel(en_support_channel, 'english')
-        updated_channels.append(f'English ({deleted_count} old messages cleared)')
-    
-    # Find and update Russian support channel
-    ru_support_channel = discord.utils.get(guild.text_channels, name=CHANNELS['ru_support'])
-    if ru_support_channel:
-        # Delete ALL messages from bot (no limit)
-        deleted_count = 0
-        async for message in ru_support_channel.history(limit=None):
-            if message.author == bot.user:
-                try:
-                    await message.delete()
-                    deleted_count += 1
-                    await asyncio.sleep(0.1)  # Rate limit protection
-                except:
-                    pass
-        
-        # Wait a moment to ensure all deletions are processed
-        await asyncio.sleep(1)
-        
-        # Send new support message
-        await setup_support_channel(ru_support_channel, 'russian')
-        updated_channels.append(f'Russian ({deleted_count} old messages cleared)')
+    mode = mode.lower()
     
-    if updated_channels:
+    if mode == 'on':
+        raid_guard.lock(guild.id, reason=f"Manual lockdown by {ctx.author.name}")
         embed = create_embed(
-            "✅ Support Channels Refreshed",
-            f"Updated support channels:\n• {chr(10).join(updated_channels)}\n\n"
-            "Each channel now has exactly one message with the correct language button!",
-            color=COLORS['success']
+            "🔒 Lockdown Enabled",
+            "Welcome DMs and language role assignment are paused until `!lockdown off`.",
+            color=COLORS['warning']
+        )
+    elif mode == 'off':
+        lifted = raid_guard.unlock(guild.id)
+        embed = create_embed(
+            "🔓 Lockdown Lifted" if lifted else "ℹ️ Not Locked",
+            "Onboarding is back to normal." if lifted else "The server was not in lockdown.",
+            color=COLORS['success'] if lifted else COLORS['info']
         )
     else:
+        state, counts = raid_guard.status(guild.id)
+        if state:
+            until = f"<t:{int(state['until'])}:R>" if state['until'] else "manual release"
+            description = (
+                f"**Status:** 🔒 Locked since <t:{int(state['since'])}:R>\n"
+                f"**Reason:** {state['reason']}\n"
+                f"**Lifts:** {until}\n"
+                f"**Suppressed actions:** {state['suppressed']}"
+            )
+        else:
+            description = "**Status:** 🔓 Normal"
+        description += (
+            f"\n\n**Last {RAID_WINDOW_SECONDS}s:** {counts['joins']} joins "
+            f"({counts['young_joins']} accounts younger than {RAID_YOUNG_ACCOUNT_DAYS:g} days)"
+        )
         embed = create_embed(
+            "🛡️ Raid Protection",
+            description,
+            color=COLORS['warning'] if state else COLORS['info']
+        )
+    
+    await ctx.send(embed=embed)
+
+@bot.hybrid_command(name='language_roles')
+@is_admin()
+async def language_roles_job(ctx, mode: str = 'status'):
+    """Bulk assign or migrate language roles (ADMIN ONLY)
+    
+    Modes: locale, missing:<language>, migrate:<from>:<to>, resume, cancel, status
+    """
+    guild = ctx.guild
+    checkpoint_dir = role_jobs.checkpoint_dir
+    
+    if mode == 'status':
+        job = role_jobs.get(guild.id)
+        if not job:
+            await ctx.send(embed=create_embed("ℹ️ Language Role Job", "No job has run since startup.", color=COLORS['info']))
+            return
+        state = job.state
+        running = role_jobs.is_running(guild.id)
+        await ctx.send(embed=create_embed(
+            "🔄 Language Role Job" if running else "📋 Language Role Job",
+            f"**Mode:** `{state['mode']}` • **{'Running' if running else 'Stopped'}**\n"
+            f"**Progress:** {state['processed']}/{state['total']}\n"
+            f"**Changed:** {state['changed']} • **Unchanged:** {state['skipped']} • **Failed:** {state['failed']}",
+            color=COLORS['info']
+        ))
+        return
+    
+    if mode == 'cancel':
+        cancelled = role_jobs.cancel(guild.id)
+        await ctx.send(embed=create_embed(
+            "⏹️ Job Cancelled" if cancelled else "ℹ️ Nothing Running",
+            "Progress is checkpointed - use `!language_roles resume` to continue." if cancelled
+            else "There is no language role job running.",
+            color=COLORS['warning'] if cancelled else COLORS['info']
+        ))
+        return
+    
+    if role_jobs.is_running(guild.id):
+        await ctx.send(embed=create_embed(
+            "❌ Job Already Running",
+            "Use `!language_roles status` or `!language_roles cancel`.",
+            color=COLORS['error']
+        ))
+        return
+    
+    if mode == 'resume':
+        job = LanguageRoleJob.resume(guild, checkpoint_dir)
+        if not job:
+            await ctx.send(embed=create_embed("ℹ️ Nothing To Resume", "No unfinished job checkpoint found.", color=COLORS['info']))
+            return
+    else:
+        parts = mode.split(':')
+        valid = (
+            (parts[0] == 'locale' and len(parts) == 1) or
+            (parts[0] == 'missing' and len(parts) == 2 and parts[1] in LANGUAGE_KEYS) or
+            (parts[0] == 'migrate' and len(parts) == 3 and parts[1] in LANGUAGE_KEYS and parts[2] in LANGUAGE_KEYS)
+        )
+        if not valid:
+            await ctx.send(embed=create_embed(
+                "❌ Invalid Mode",
+                "Use `locale`, `missing:<english|russian>`, `migrate:<from>:<to>`, `resume`, `cancel` or `status`.",
+                color=COLORS['error']
+            ))
+            return
+        job = LanguageRoleJob(guild, mode, checkpoint_dir)
+    
+    status_message = await ctx.send(embed=create_embed(
+        "🔄 Language Role Job Started",
+        f"**Mode:** `{job.mode}`\nProcessing members...",
+        color=COLORS['info']
+    ))
+    last_edit = 0.0
+    
+    async def report(state):
+        nonlocal last_edit
+        # Edit at most every 5 seconds to stay clear of rate limits
+        if time.monotonic() - last_edit < 5 and state['processed'] < state['total']:
+            return
+        last_edit = time.monotonic()
+        finished = state['processed'] >= state['total']
+        await status_message.edit(embed=create_embed(
+            "✅ Language Role Job Complete" if finished else "🔄 Language Role Job Running",
+            f"**Mode:** `{state['mode']}`\n"
+            f"**Progress:** {state['processed']}/{state['total']}\n"
+            f"**Changed:** {state['changed']} • **Unchanged:** {state['skipped']} • **Failed:** {state['failed']}",
+            color=COLORS['success'] if finished else COLORS['info']
+        ))
+    
+    role_jobs.start(job, locales, progress=report)
+
+@bot.hybrid_command(name='refresh_support')
+@is_admin()
+async def refresh_support_channels(ctx):
+    """Refresh support channel messages with updated buttons (ADMIN ONLY)"""
+    async def work(job):
+        guild = ctx.guild
+        names = guild_configs.get(guild.id)
+        updated_channels = []
+        
+        for language, label, channel_key in (('english', 'English', 'en_support'), ('russian', 'Russian', 'ru_support')):
+            support_channel = discord.utils.get(guild.text_channels, name=names.channels[channel_key])
+            if not support_channel:
+                continue
+            
+            job.set_phase(f"Clearing {support_channel.name}")
+            deleted_count = await clear_bot_messages(support_channel, job)
+            
+            # Wait a moment to ensure all deletions are processed
+            await asyncio.sleep(1)
+            
+            # Send new support message
+            await setup_support_channel(support_channel, language)
+            updated_channels.append(f'{label} ({deleted_count} old messages cleared)')
+        
+        if updated_channels:
+            return create_embed(
+                "✅ Support Channels Refreshed",
+                f"Updated support channels:\n• {chr(10).join(updated_channels)}\n\n"
+                "Each channel now has exactly one message with the correct language button!",
+                color=COLORS['success']
+            )
+        return create_embed(
             "❌ No Support Channels Found",
             "Could not find support channels. Run `!setup` first.",
             color=COLORS['error']
         )
     
-    await ctx.send(embed=embed)
+    await start_job(ctx, 'refresh_support', work)
 
-@bot.command(name='reset_tickets')
+async def clear_bot_messages(channel, job):
+    """Delete ALL of the bot's messages in a channel (no limit); returns how many were deleted"""
+    deleted_count = 0
+    async for message in channel.history(limit=None):
+        if message.author == bot.user:
+            try:
+                await message.delete()
+                deleted_count += 1
+                job.advance()
+                await asyncio.sleep(0.1)  # Rate limit protection
+            except discord.HTTPException:
+                pass
+    return deleted_count
+
+@bot.hybrid_command(name='reset_tickets')
 @is_admin()
 async def reset_ticket_system(ctx):
     """Reset ticket system and clear active tickets (ADMIN ONLY)"""
@@ -479,14 +1403,8 @@ async def reset_ticket_system(ctx):
     )
     await ctx.send(embed=embed)
     
-    # Clear active tickets from both views
-    cleared_count = 0
-    if english_ticket_view:
-        cleared_count += len(english_ticket_view.active_tickets)
-        english_ticket_view.active_tickets.clear()
-    if russian_ticket_view:
-        cleared_count += len(russian_ticket_view.active_tickets)
-        russian_ticket_view.active_tickets.clear()
+    # Clear this server's active tickets (shared by both views)
+    cleared_count = admission.guild(ctx.guild.id).clear_active_tickets()
     
     embed = create_embed(
         "✅ Ticket System Reset",
@@ -496,68 +1414,42 @@ async def reset_ticket_system(ctx):
     )
     await ctx.send(embed=embed)
 
-@bot.command(name='clear_support')
+@bot.hybrid_command(name='clear_support')
 @is_admin()
 async def clear_support_channels(ctx):
     """Clear all messages from support channels (ADMIN ONLY)"""
-    embed = create_embed(
-        "🧹 Clearing Support Channels",
-        "Removing all bot messages from support channels...",
-        color=COLORS['info']
-    )
-    await ctx.send(embed=embed)
-    
-    guild = ctx.guild
-    cleared_channels = []
-    
-    # Clear English support channel
-    en_support_channel = discord.utils.get(guild.text_channels, name=CHANNELS['en_support'])
-    if en_support_channel:
-        deleted_count = 0
-        async for message in en_support_channel.history(limit=None):
-            if message.author == bot.user:
-                try:
-                    await message.delete()
-                    deleted_count += 1
-                    await asyncio.sleep(0.1)
-                except:
-                    pass
-        cleared_channels.append(f'English ({deleted_count} messages)')
-    
-    # Clear Russian support channel
-    ru_support_channel = discord.utils.get(guild.text_channels, name=CHANNELS['ru_support'])
-    if ru_support_channel:
-        deleted_count = 0
-        async for message in ru_support_channel.history(limit=None):
-            if message.author == bot.user:
-                try:
-                    await message.delete()
-                    deleted_count += 1
-                    await asyncio.sleep(0.1)
-                except:
-                    pass
-        cleared_channels.append(f'Russian ({deleted_count} messages)')
-    
-    if cleared_channels:
-        embed = create_embed(
-            "✅ Support Channels Cleared",
-            f"Cleared channels:\n• {chr(10).join(cleared_channels)}\n\n"
-            "Use `!refresh_support` to add new messages.",
-            color=COLORS['success']
-        )
-    else:
-        embed = create_embed(
+    async def work(job):
+        guild = ctx.guild
+        names = guild_configs.get(guild.id)
+        cleared_channels = []
+        
+        for language, label, channel_key in (('english', 'English', 'en_support'), ('russian', 'Russian', 'ru_support')):
+            support_channel = discord.utils.get(guild.text_channels, name=names.channels[channel_key])
+            if support_channel:
+                job.set_phase(f"Clearing {support_channel.name}")
+                deleted_count = await clear_bot_messages(support_channel, job)
+                cleared_channels.append(f'{label} ({deleted_count} messages)')
+        
+        if cleared_channels:
+            return create_embed(
+                "✅ Support Channels Cleared",
+                f"Cleared channels:\n• {chr(10).join(cleared_channels)}\n\n"
+                "Use `!refresh_support` to add new messages.",
+                color=COLORS['success']
+            )
+        return create_embed(
             "❌ No Support Channels Found",
             "Could not find support channels to clear.",
             color=COLORS['error']
         )
     
-    await ctx.send(embed=embed)
+    await start_job(ctx, 'clear_support', work)
 
-@bot.command(name='fix_bot_permissions')
+@bot.hybrid_command(name='fix_bot_permissions')
 @is_admin()
 async def fix_bot_permissions(ctx):
     """Check and fix bot permissions (ADMIN ONLY)"""
+    await ctx.defer()
     embed = create_embed(
         "🔧 Checking Bot Permissions",
         "Analyzing bot permissions and role assignment...",
@@ -566,10 +1458,11 @@ async def fix_bot_permissions(ctx):
     await ctx.send(embed=embed)
     
     guild = ctx.guild
+    names = guild_configs.get(guild.id)
     bot_member = guild.me
     
     # Find bot role
-    bot_role = discord.utils.get(guild.roles, name=ROLES['bot'])
+    bot_role = discord.utils.get(guild.roles, name=names.roles['bot'])
     
     issues = []
     fixes = []
@@ -581,7 +1474,7 @@ async def fix_bot_permissions(ctx):
         try:
             bot_role = await safe_create_role(
                 guild,
-                ROLES['bot'],
+                names.roles['bot'],
                 permissions=get_bot_permissions(),
                 color=discord.Color.blue(),
                 hoist=True,
@@ -602,44 +1495,20 @@ async def fix_bot_permissions(ctx):
         except Exception as e:
             issues.append(f"❌ Failed to add bot role: {e}")
     
-    # Check permissions in support channels
-    en_support = discord.utils.get(guild.text_channels, name=CHANNELS['en_support'])
-    ru_support = discord.utils.get(guild.text_channels, name=CHANNELS['ru_support'])
-    
-    for channel in [en_support, ru_support]:
-        if channel:
-            perms = channel.permissions_for(bot_member)
-            channel_issues = []
-            
-            if not perms.create_private_threads:
-                channel_issues.append("create_private_threads")
-            if not perms.manage_threads:
-                channel_issues.append("manage_threads")
-            if not perms.send_messages:
-                channel_issues.append("send_messages")
-            if not perms.read_messages:
-                channel_issues.append("read_messages")
-            
-            if channel_issues:
-                issues.append(f"❌ {channel.name}: missing {', '.join(channel_issues)}")
-                
-                # Try to fix by setting bot role permissions
-                if bot_role:
-                    try:
-                        await channel.set_permissions(
-                            bot_role,
-                            read_messages=True,
-                            send_messages=True,
-                            manage_messages=True,
-                            manage_threads=True,
-                            create_private_threads=True,
-                            create_public_threads=True
-                        )
-                        fixes.append(f"✅ Fixed permissions in {channel.name}")
-                    except Exception as e:
-                        issues.append(f"❌ Failed to fix {channel.name}: {e}")
-            else:
-                fixes.append(f"✅ {channel.name}: permissions OK")
+    # Check what the bot needs in support channels (computed locally, fixed with minimal edits)
+    _, requirements, _ = permission_rules(guild)
+    audit = PermissionAudit(guild, [], requirements)
+    for finding in audit.run():
+        issues.append(f"❌ {finding.channel.name}: missing {', '.join(sorted(finding.diffs))}")
+    if audit.findings:
+        fixed, failed = await audit.apply(reason="Fixing bot permissions")
+        if fixed:
+            fixes.append(f"✅ Fixed permissions in {fixed} support channels")
+        if failed:
+            issues.append(f"❌ Failed to fix {failed} support channels (see logs)")
+    for channel, _, _, _ in requirements:
+        if not any(finding.channel == channel for finding in audit.findings):
+            fixes.append(f"✅ {channel.name}: permissions OK")
     
     # Create result embed
     result_parts = []
@@ -661,10 +1530,143 @@ async def fix_bot_permissions(ctx):
     
     await ctx.send(embed=embed)
 
-@bot.command(name='check_tickets')
+@bot.hybrid_command(name='audit_permissions')
+@is_admin()
+async def audit_permissions(ctx, mode: str = 'check'):
+    """Check channel permissions against the setup rules; `fix` applies the edits (ADMIN ONLY)"""
+    await ctx.defer()
+    guild = ctx.guild
+    rules, requirements, missing_roles = permission_rules(guild)
+    audit = PermissionAudit(guild, rules, requirements)
+    findings = audit.run()
+    drift = role_permission_drift(guild)
+    
+    fields = [
+        {'name': 'Channels', 'value': str(len(rules)), 'inline': True},
+        {'name': 'Pairs Checked', 'value': str(audit.checked), 'inline': True},
+        {'name': 'CPU Time', 'value': f"{audit.cpu_seconds * 1000:.1f}ms", 'inline': True}
+    ]
+    if findings:
+        lines = [f"• {finding.describe()}" for finding in findings[:15]]
+        if len(findings) > 15:
+            lines.append(f"…and {len(findings) - 15} more")
+        fields.append({'name': f'❌ Overwrites To Fix ({len(findings)})', 'value': "\n".join(lines)[:1024], 'inline': False})
+    if drift:
+        fields.append({
+            'name': '⚠️ Role Permissions Differ From Defaults (not changed)',
+            'value': "\n".join(f"• {line}" for line in drift)[:1024],
+            'inline': False
+        })
+    if missing_roles:
+        fields.append({'name': '⚠️ Missing Roles', 'value': ", ".join(missing_roles), 'inline': False})
+    
+    if mode != 'fix' or not findings:
+        footer = "Run `!audit_permissions fix` to apply the edits." if findings else "All managed channels match the setup rules ✅"
+        await ctx.send(embed=create_embed(
+            "🔍 Permission Audit",
+            footer,
+            color=COLORS['warning'] if findings else COLORS['success'],
+            fields=fields
+        ))
+        return
+    
+    async def work(job):
+        job.set_phase("Applying overwrite edits", total=len(findings))
+        fixed, failed = await audit.apply()
+        job.advance(fixed + failed)
+        return create_embed(
+            "✅ Permissions Fixed" if not failed else "⚠️ Permissions Partly Fixed",
+            f"Applied {fixed} overwrite edits" + (f", {failed} failed (see logs)." if failed else "."),
+            color=COLORS['success'] if not failed else COLORS['warning'],
+            fields=fields
+        )
+    
+    await start_job(ctx, 'audit_permissions', work)
+
+# Bot needs these in support channels to open ticket threads
+SUPPORT_BOT_PERMISSIONS = ('read_messages', 'send_messages', 'manage_threads', 'create_private_threads')
+
+def permission_rules(guild):
+    """Expected overwrites for every managed channel, derived from the setup rules
+    
+    Returns (rules, requirements, missing role names) for PermissionAudit.
+    Channels created inside a category start with the category's overwrites,
+    so each channel's rules are its category's plus its own setup call.
+    """
+    names = guild_configs.get(guild.id)
+    roles = {key: discord.utils.get(guild.roles, name=name) for key, name in names.roles.items()}
+    roles['everyone'] = guild.default_role
+    missing_roles = [names.roles[key] for key in names.roles if roles[key] is None]
+    rules = []
+    requirements = []
+    
+    def add(channel, overwrites):
+        if channel:
+            rules.append((channel, {roles[key]: flags for key, flags in overwrites.items() if roles.get(key)}))
+    
+    def find_channel(category, name):
+        return discord.utils.get(category.channels if category else guild.channels, name=name)
+    
+    # Server stats: the category and its (renamed) counter channels
+    stats_category = discord.utils.get(guild.categories, name=names.categories['server_stats'])
+    add(stats_category, BASIC_OVERWRITES)
+    for channel in (stats_category.channels if stats_category else []):
+        add(channel, BASIC_OVERWRITES)
+    
+    # Language selection is visible to everyone, read-only
+    selection_overwrites = {**BASIC_OVERWRITES, 'everyone': dict(read_messages=True)}
+    language_category = discord.utils.get(guild.categories, name=names.categories['language_selection'])
+    add(language_category, selection_overwrites)
+    add(
+        find_channel(language_category, names.channels['choose_language']),
+        {**selection_overwrites, 'everyone': dict(read_messages=True, send_messages=False)}
+    )
+    
+    language_overwrites = {
+        'welcome': WELCOME_LANGUAGE_OVERWRITE,
+        'community': COMMUNITY_LANGUAGE_OVERWRITE,
+        'trading': COMMUNITY_LANGUAGE_OVERWRITE,
+        'support': SUPPORT_LANGUAGE_OVERWRITE
+    }
+    for language in LANGUAGE_KEYS:
+        for category_type, (category_key, channel_keys) in language_layout(language).items():
+            category = discord.utils.get(guild.categories, name=names.categories[category_key])
+            add(category, BASIC_OVERWRITES)
+            for channel_key in channel_keys:
+                channel = find_channel(category, names.channels[channel_key])
+                add(channel, {**BASIC_OVERWRITES, language: language_overwrites[category_type]})
+                if channel and category_type == 'support' and roles['bot']:
+                    requirements.append((channel, guild.me, roles['bot'], SUPPORT_BOT_PERMISSIONS))
+    
+    return rules, requirements, missing_roles
+
+def role_permission_drift(guild):
+    """Managed roles whose server-wide permissions differ from the get_*_permissions defaults"""
+    names = guild_configs.get(guild.id)
+    expected = {
+        'admin': get_admin_permissions(),
+        'moderator': get_moderator_permissions(),
+        'bot': get_bot_permissions(),
+        'member': get_basic_permissions(),
+        'english': get_language_permissions(),
+        'russian': get_language_permissions()
+    }
+    drift = []
+    for key, permissions in expected.items():
+        role = discord.utils.get(guild.roles, name=names.roles[key])
+        if not role or role.permissions.value == permissions.value:
+            continue
+        extra = [flag for flag, value in discord.Permissions(role.permissions.value & ~permissions.value) if value]
+        lacking = [flag for flag, value in discord.Permissions(permissions.value & ~role.permissions.value) if value]
+        parts = ([f"+{', +'.join(extra)}"] if extra else []) + ([f"-{', -'.join(lacking)}"] if lacking else [])
+        drift.append(f"{role.name}: {' '.join(parts)}")
+    return drift
+
+@bot.hybrid_command(name='check_tickets')
 @is_admin()
 async def check_active_tickets(ctx):
     """Check and display active tickets (ADMIN ONLY)"""
+    await ctx.defer()
     embed = create_embed(
         "🎫 Checking Active Tickets",
         "Analyzing active ticket status...",
@@ -676,12 +1678,13 @@ async def check_active_tickets(ctx):
     
     # Check English tickets
     if english_ticket_view:
-        english_count = len(english_ticket_view.active_tickets)
+        english_tickets = english_ticket_view.active_tickets(ctx.guild.id)
+        english_count = len(english_tickets)
         if english_count > 0:
             tickets_info.append(f"**English Support:** {english_count} active tickets")
             # Show user IDs
             user_list = []
-            for user_id in list(english_ticket_view.active_tickets):
+            for user_id in list(english_tickets):
                 user = ctx.guild.get_member(user_id)
                 if user:
                     user_list.append(f"• {user.name} ({user_id})")
@@ -696,12 +1699,13 @@ async def check_active_tickets(ctx):
     
     # Check Russian tickets
     if russian_ticket_view:
-        russian_count = len(russian_ticket_view.active_tickets)
+        russian_tickets = russian_ticket_view.active_tickets(ctx.guild.id)
+        russian_count = len(russian_tickets)
         if russian_count > 0:
             tickets_info.append(f"**Russian Support:** {russian_count} active tickets")
             # Show user IDs
             user_list = []
-            for user_id in list(russian_ticket_view.active_tickets):
+            for user_id in list(russian_tickets):
                 user = ctx.guild.get_member(user_id)
                 if user:
                     user_list.append(f"• {user.name} ({user_id})")
@@ -714,6 +1718,30 @@ async def check_active_tickets(ctx):
     else:
         tickets_info.append("**Russian Support:** View not found")
     
+    # Ticket creation admission state
+    admission_state = admission.guild(ctx.guild.id).snapshot()
+    tickets_info.append(
+        f"**Creation Queue:** {admission_state['running']}/{admission_state['max_concurrent']} creating, "
+        f"{admission_state['queued']} queued"
+    )
+    
+    # Active ticket threads per support channel and its overflow channels
+    names = guild_configs.get(ctx.guild.id)
+    for key in ('en_support', 'ru_support'):
+        base = discord.utils.get(ctx.guild.text_channels, name=names.channels[key])
+        if base:
+            usage = ", ".join(f"{channel.mention} {count}/{placement.channel_limit}" for channel, count in placement.usage(base))
+            tickets_info.append(f"**Active Threads:** {usage}")
+    active_threads = sum(1 for thread in ctx.guild.threads if not thread.archived)
+    tickets_info.append(f"**Server Threads:** {active_threads} active (idle tickets archived above {placement.guild_soft_limit})")
+    
+    # Pending ticket timers
+    tickets_info.append(
+        f"**Scheduled:** {len(scheduler.pending('archive_ticket'))} archives, "
+        f"{len(scheduler.pending('ticket_reminder'))} reminders, "
+        f"{len(scheduler.pending('ticket_idle_close'))} auto-closes"
+    )
+    
     embed = create_embed(
         "🎫 Active Tickets Status",
         "\n\n".join(tickets_info) if tickets_info else "No ticket information available",
@@ -722,24 +1750,16 @@ async def check_active_tickets(ctx):
     
     await ctx.send(embed=embed)
 
-@bot.command(name='clear_user_tickets')
+@bot.hybrid_command(name='clear_user_tickets')
 @is_admin()
-async def clear_user_tickets(ctx, user_id: int):
+async def clear_user_tickets(ctx, user_id: snowflake):
     """Clear tickets for a specific user (ADMIN ONLY)"""
     user = ctx.guild.get_member(user_id)
     user_name = user.name if user else f"Unknown ({user_id})"
     
-    cleared_count = 0
-    
-    # Clear from English tickets
-    if english_ticket_view and user_id in english_ticket_view.active_tickets:
-        english_ticket_view.remove_active_ticket(user_id)
-        cleared_count += 1
-    
-    # Clear from Russian tickets
-    if russian_ticket_view and user_id in russian_ticket_view.active_tickets:
-        russian_ticket_view.remove_active_ticket(user_id)
-        cleared_count += 1
+    guild_admission = admission.guild(ctx.guild.id)
+    cleared_count = 1 if guild_admission.remove_active_ticket(user_id) else 0
+    guild_admission.end(user_id)
     
     embed = create_embed(
         "🧹 User Tickets Cleared",
@@ -750,70 +1770,538 @@ async def clear_user_tickets(ctx, user_id: int):
     
     await ctx.send(embed=embed)
 
-# SETUP FUNCTIONS
+@bot.hybrid_command(name='transcript')
+@is_admin()
+async def get_transcript(ctx, thread_id: snowflake):
+    """Upload the saved transcript of a closed ticket (ADMIN ONLY)"""
+    await ctx.defer()
+    path = exporter.path_for(ctx.guild.id, thread_id)
+    if not os.path.exists(path):
+        embed = create_embed(
+            "❌ Transcript Not Found",
+            f"No transcript saved for thread `{thread_id}`.",
+            color=COLORS['error']
+        )
+        await ctx.send(embed=embed)
+        return
+    
+    files = [discord.File(path)]
+    html_path = exporter.path_for(ctx.guild.id, thread_id, 'html')
+    if os.path.exists(html_path):
+        files.append(discord.File(html_path))
+    
+    embed = create_embed(
+        "📜 Ticket Transcript",
+        f"Transcript for thread `{thread_id}`.",
+        color=COLORS['info']
+    )
+    await ctx.send(embed=embed, files=files)
 
-async def perform_fresh_setup(guild):
-    """Perform complete server wipe and recreation"""
-    logger.info(f"Starting fresh setup for {guild.name}")
+# Accepted lang: filter values
+SEARCH_LANGUAGES = {'en': 'english', 'english': 'english', 'ru': 'russian', 'russian': 'russian'}
+
+def parse_search_query(query):
+    """Split a search query into free text and user:/lang:/from:/to:/page: filters (ValueError on a bad filter)"""
+    filters = {'text': [], 'user_id': None, 'language': None, 'since': None, 'until': None, 'page': 1}
+    for token in query.split():
+        key, sep, value = token.partition(':')
+        key = key.lower()
+        if not sep or not value or key not in ('user', 'lang', 'from', 'to', 'page'):
+            filters['text'].append(token)
+        elif key == 'user':
+            filters['user_id'] = int(value.strip('<@!>'))
+        elif key == 'lang':
+            if value.lower() not in SEARCH_LANGUAGES:
+                raise ValueError(f"Unknown language {value!r}")
+            filters['language'] = SEARCH_LANGUAGES[value.lower()]
+        elif key in ('from', 'to'):
+            moment = datetime.strptime(value, '%Y-%m-%d').replace(tzinfo=timezone.utc).timestamp()
+            filters['since' if key == 'from' else 'until'] = moment
+        elif key == 'page':
+            filters['page'] = max(int(value), 1)
+    filters['text'] = ' '.join(filters['text'])
+    return filters
+
+@bot.hybrid_command(name='search_tickets')
+@is_admin()
+async def search_tickets(ctx, *, query: str):
+    """Full-text search over closed ticket transcripts (ADMIN ONLY)"""
+    await ctx.defer()
+    try:
+        filters = parse_search_query(query)
+    except ValueError:
+        embed = create_embed(
+            "❌ Invalid Filter",
+            f"Use `user:<id>`, `lang:{'|'.join(SEARCH_LANGUAGES)}`, `from:YYYY-MM-DD`, `to:YYYY-MM-DD`, `page:<n>`.",
+            color=COLORS['error']
+        )
+        await ctx.send(embed=embed)
+        return
     
-    # Delete all channels
-    for channel in guild.channels:
-        await safe_delete_channel(channel)
+    results, elapsed_ms = await search_index.search(
+        ctx.guild.id,
+        text=filters['text'] or None,
+        user_id=filters['user_id'],
+        language=filters['language'],
+        since=filters['since'],
+        until=filters['until'],
+        page=filters['page']
+    )
+    
+    fields = []
+    for result in results:
+        fields.append({
+            'name': f"{result['ticket_name']} • {result['author_name']}"[:256],
+            'value': f"<#{result['thread_id']}> • <t:{int(result['created_at'])}:d> • `{result['thread_id']}`\n"
+                    f"{(result['snippet'] or '*(no text)*')[:900]}",
+            'inline': False
+        })
+    
+    embed = create_embed(
+        "🔎 Ticket Search",
+        f"**{len(results)}** results on page {filters['page']} • {elapsed_ms:.0f}ms"
+        if results else f"No results on page {filters['page']} • {elapsed_ms:.0f}ms",
+        color=COLORS['info'],
+        fields=fields
+    )
+    await ctx.send(embed=embed)
+
+@bot.hybrid_command(name='reindex_tickets')
+@is_admin()
+async def reindex_tickets(ctx):
+    """Index saved transcripts that are missing from the search index (ADMIN ONLY)"""
+    added = await search_index.reindex_directory(exporter.directory)
+    tickets, messages = await asyncio.to_thread(search_index.stats)
+    embed = create_embed(
+        "✅ Search Index Updated",
+        f"Indexed {added} new tickets.\n"
+        f"Index now holds **{tickets}** tickets and **{messages}** messages.",
+        color=COLORS['success']
+    )
+    await ctx.send(embed=embed)
+
+@bot.hybrid_command(name='ticket_stats')
+@is_admin()
+async def ticket_stats(ctx):
+    """Show ticket response and resolution times and backlog (ADMIN ONLY)"""
+    fields = []
+    for language in LANGUAGES:
+        backlog = analytics.backlog(language, ctx.guild.id)
+        response = analytics.summary('response', ctx.guild.id, language)
+        resolution = analytics.summary('resolution', ctx.guild.id, language)
+        fields.append({
+            'name': '🇺🇸 English' if language == 'english' else '🇷🇺 Russian',
+            'value': f"**Backlog:** {backlog['open']} open, {backlog['waiting']} awaiting reply "
+                    f"(oldest {format_duration(backlog['oldest_wait'])})\n"
+                    f"**First reply:** p50 {format_duration(response['p50'])} • "
+                    f"p90 {format_duration(response['p90'])} • p99 {format_duration(response['p99'])} "
+                    f"({response['count']})\n"
+                    f"**Resolution:** p50 {format_duration(resolution['p50'])} • "
+                    f"p90 {format_duration(resolution['p90'])} • p99 {format_duration(resolution['p99'])} "
+                    f"({resolution['count']})",
+            'inline': False
+        })
+    
+    staff_lines = []
+    for staff_id in analytics.staff_ids(ctx.guild.id):
+        response = analytics.summary('response', ctx.guild.id, f'staff:{staff_id}')
+        resolution = analytics.summary('resolution', ctx.guild.id, f'staff:{staff_id}')
+        member = ctx.guild.get_member(staff_id)
+        staff_lines.append((
+            response['count'],
+            f"**{member.display_name if member else staff_id}:** {response['count']} tickets • "
+            f"reply p50 {format_duration(response['p50'])} • resolve p50 {format_duration(resolution['p50'])}"
+        ))
+    if staff_lines:
+        staff_lines.sort(reverse=True)
+        fields.append({
+            'name': '👮 Staff',
+            'value': '\n'.join(line for _, line in staff_lines[:10]),
+            'inline': False
+        })
+    
+    embed = create_embed(
+        "📈 Ticket Analytics",
+        "First reply is measured from ticket creation to the first staff message.",
+        color=COLORS['secondary'],
+        fields=fields
+    )
+    await ctx.send(embed=embed)
+
+@bot.hybrid_command(name='export_metrics')
+@is_admin()
+async def export_metrics(ctx):
+    """Download this server's ticket metrics in Prometheus text format (ADMIN ONLY)"""
+    os.makedirs(DATA_DIR, exist_ok=True)
+    path = os.path.join(DATA_DIR, f'ticket_metrics_{ctx.guild.id}.prom')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(analytics.metrics_text(ctx.guild.id))
+    await ctx.send(file=discord.File(path))
+
+# STATUS API ENDPOINTS (in-memory reads only - no Discord API calls)
+
+@status_api.endpoint('/health')
+def health_status():
+    """Gateway connection, event loop lag and stats loop freshness"""
+    since_stats = status_api.since_beat('update_stats')
+    # Without guilds there is nothing to sample, so no beat is expected
+    stats_fresh = not bot.guilds or (since_stats is not None and since_stats < STATUS_STATS_STALE_SECONDS)
+    healthy = status_api.gateway_connected and stats_fresh
+    body = {
+        'status': 'ok' if healthy else 'unhealthy',
+        'gateway_connected': status_api.gateway_connected,
+        'gateway_changed_at': status_api.gateway_changed_at,
+        'gateway_latency_ms': round(bot.latency * 1000, 1) if math.isfinite(bot.latency) else None,
+        **status_api.loop_lag.read(),
+        'last_stats_update_seconds': round(since_stats, 1) if since_stats is not None else None,
+        'uptime_seconds': round(time.time() - status_api.started_at),
+        'guilds': len(bot.guilds)
+    }
+    return (200 if healthy else 503), body
+
+@status_api.endpoint('/tasks')
+def tasks_status():
+    """Periodic task metrics, summed per task and per instance"""
+    return {
+        'tasks': periodic.summary(),
+        'instances': {name: periodic.instance_stats(name) for name in periodic.tasks}
+    }
+
+@status_api.endpoint('/memory')
+def memory_status():
+    """Current RSS and the last !memory report (never snapshots, so !memory diffs are unaffected)"""
+    return memory.status()
+
+@status_api.endpoint('/stats')
+def stats_status():
+    """Cached member, online and language role counts per guild"""
+    guilds = []
+    for guild in bot.guilds:
+        snapshot = member_counts.snapshot(guild.id)
+        entry = {'id': str(guild.id), 'name': guild.name}
+        if snapshot:
+            names = guild_configs.get(guild.id)
+            entry.update({
+                'total': snapshot['total'],
+                'online': snapshot['online'],
+                'languages': {
+                    language: member_counts.role_count(guild.id, discord.utils.get(guild.roles, name=names.roles[language]))
+                    for language in LANGUAGE_KEYS
+                },
+                'as_of': snapshot['as_of'],
+                'sampled_at': snapshot['sampled_at'],
+                'reconciled_at': snapshot['reconciled_at']
+            })
+        guilds.append(entry)
+    return {'guilds': guilds}
+
+@status_api.endpoint('/tickets')
+def tickets_status():
+    """Active tickets and backlog per guild and language plus the creation queues"""
+    guilds = []
+    for guild in bot.guilds:
+        guild_admission = admission.guild(guild.id)
+        languages = {}
+        for language in LANGUAGES:
+            backlog = analytics.backlog(language, guild.id)
+            languages[language] = {
+                'active': len(guild_admission.tickets_for(language)),
+                'open': backlog['open'],
+                'waiting_for_staff': backlog['waiting'],
+                'oldest_wait_seconds': round(backlog['oldest_wait']) if backlog['oldest_wait'] else None
+            }
+        guilds.append({
+            'id': str(guild.id),
+            'name': guild.name,
+            'languages': languages,
+            'creation_queue': guild_admission.snapshot()
+        })
+    return {'guilds': guilds, 'creation_queue': admission.snapshot()}
+
+# SCHEDULED TICKET ACTIONS
+
+def register_scheduled_actions():
+    """Register handlers for persisted ticket timers"""
+    scheduler.register('archive_ticket', archive_ticket_action)
+    scheduler.register('ticket_reminder', ticket_reminder_action)
+    scheduler.register('ticket_idle_close', ticket_idle_close_action)
+
+async def fetch_ticket_thread(thread_id):
+    """Get a ticket thread from cache or the API, None if it no longer exists"""
+    thread = bot.get_channel(thread_id)
+    if thread is None:
+        try:
+            thread = await bot.fetch_channel(thread_id)
+        except (discord.NotFound, discord.Forbidden):
+            logger.warning(f"Ticket thread {thread_id} no longer accessible")
+            return None
+    return thread if isinstance(thread, discord.Thread) else None
+
+async def ticket_idle_seconds(thread):
+    """Seconds since the last message in a ticket that was not sent by the bot"""
+    last_activity = thread.created_at or discord.utils.snowflake_time(thread.id)
+    async for message in thread.history(limit=20):
+        if message.author != bot.user:
+            last_activity = message.created_at
+            break
+    return (datetime.now(timezone.utc) - last_activity).total_seconds()
+
+async def last_message_is(thread, embed):
+    """Whether the newest message of a thread is this bot embed (a timer that already ran before a restart)"""
+    async for message in thread.history(limit=1):
+        return message.author == bot.user and any(sent.title == embed.title for sent in message.embeds)
+    return False
+
+async def archive_ticket_action(payload):
+    """Archive a closed ticket thread"""
+    thread = await fetch_ticket_thread(payload['thread_id'])
+    if thread and not thread.archived:
+        await thread.edit(archived=True, reason=payload.get('reason'))
+        logger.info(f"Archived ticket thread {thread.name}")
+
+async def ticket_reminder_action(payload):
+    """Remind the ticket owner about an idle ticket"""
+    thread = await fetch_ticket_thread(payload['thread_id'])
+    if not thread or (thread.archived and not analytics.is_ticket(thread.id)):
+        return
+    
+    reminder_after = TICKET_REMINDER_HOURS * 3600
+    idle = await ticket_idle_seconds(thread)
+    if idle < reminder_after:
+        # There was activity since the timer was armed - wait for the remaining idle time
+        scheduler.schedule('ticket_reminder', reminder_after - idle, payload, key=f"reminder:{thread.id}")
+        return
     
+    if payload['language'] == 'english':
+        embed = create_embed(
+            "⏰ Ticket Reminder",
+            f"<@{payload['owner_id']}>, this ticket has been inactive for a while.\n"
+            "Reply here if you still need help, otherwise it will be closed automatically.",
+            color=COLORS['warning']
+        )
+    else:
+        embed = create_embed(
+            "⏰ Напоминание о тикете",
+            f"<@{payload['owner_id']}>, этот тикет неактивен уже некоторое время.\n"
+            "Ответьте здесь, если вам все еще нужна помощь, иначе он будет закрыт автоматически.",
+            color=COLORS['warning']
+        )
+    if await last_message_is(thread, embed):
+        return
+    await thread.send(embed=embed)
+    logger.info(f"Sent idle reminder in ticket {thread.name}")
+
+async def ticket_idle_close_action(payload):
+    """Close a ticket that has been idle for too long"""
+    thread = await fetch_ticket_thread(payload['thread_id'])
+    # Archived tickets are still open unless they were closed (idle ones are archived to save thread slots)
+    if not thread or (thread.archived and not analytics.is_ticket(thread.id)):
+        if payload.get('guild_id'):
+            admission.guild(payload['guild_id']).remove_active_ticket(payload['owner_id'])
+        return
+    
+    close_after = TICKET_IDLE_CLOSE_HOURS * 3600
+    idle = await ticket_idle_seconds(thread)
+    if idle < close_after:
+        # Activity since the timer was armed - push both timers back
+        remaining = close_after - idle
+        scheduler.schedule('ticket_idle_close', remaining, payload, key=f"idle_close:{thread.id}")
+        if TICKET_REMINDER_HOURS > 0 and TICKET_REMINDER_HOURS < TICKET_IDLE_CLOSE_HOURS:
+            reminder_in = max(TICKET_REMINDER_HOURS * 3600 - idle, 0)
+            scheduler.schedule('ticket_reminder', reminder_in, payload, key=f"reminder:{thread.id}")
+        return
+    
+    if payload['language'] == 'english':
+        embed = create_embed(
+            "🔒 Ticket Closed",
+            "This ticket was closed automatically due to inactivity.\n"
+            "Feel free to open a new ticket if you need more help.",
+            color=COLORS['info']
+        )
+    else:
+        embed = create_embed(
+            "🔒 Тикет закрыт",
+            "Этот тикет был закрыт автоматически из-за неактивности.\n"
+            "Создайте новый тикет, если вам нужна дополнительная помощь.",
+            color=COLORS['info']
+        )
+    if not await last_message_is(thread, embed):
+        await thread.send(embed=embed)
+    
+    admission.guild(thread.guild.id).remove_active_ticket(payload['owner_id'])
+    cancel_ticket_timers(thread.id)
+    exporter.enqueue(thread, payload['owner_id'], payload['language'])
+    analytics.ticket_closed(thread.id)
+    await thread.edit(archived=True, reason="Ticket closed automatically due to inactivity")
+    logger.info(f"Auto-closed idle ticket {thread.name}")
+
+# DRY-RUN PLANS
+
+PLANNED_OPERATIONS = ('fresh', 'setup', 'cleanup')
+SETUP_ROLE_KEYS = ('admin', 'moderator', 'bot', 'member', 'english', 'russian')
+
+def plan_operation(guild, operation):
+    """Plan !fresh, !setup or !cleanup against the cached guild state"""
+    plan = Plan(operation, guild)
+    if operation == 'setup':
+        plan_server_setup(plan, guild, {role.name for role in guild.roles}, {channel.name for channel in guild.channels})
+    else:
+        channels, roles = fresh_targets(guild) if operation == 'fresh' else cleanup_targets(guild)
+        remaining_roles = plan_deletions(plan, guild, channels, roles)
+        if operation == 'fresh':
+            plan_server_setup(plan, guild, remaining_roles, set())
+    return plan
+
+def plan_deletions(plan, guild, channels, roles):
+    """Add channel and role deletes; returns the role names left afterwards"""
+    for channel in channels:
+        plan.add('delete', 'channel', channel.name, DELETE_CHANNEL, channel.id)
+    
+    deleted = set()
+    for role in roles:
+        if role.name in ['@everyone', 'CSMarketCap']:
+            continue  # skipped by safe_delete_role
+        note = None
+        if role.managed:
+            note = f"Role '{role.name}' is managed by an integration - deleting it will fail"
+        elif role >= guild.me.top_role:
+            note = f"Role '{role.name}' is not below the bot's top role - deleting it will fail"
+        else:
+            deleted.add(role.id)
+        plan.add('delete', 'role', role.name, DELETE_ROLE, guild.id, note=note)
+    return {role.name for role in guild.roles if role.id not in deleted}
+
+def plan_server_setup(plan, guild, existing_roles, existing_channels):
+    """Add the calls perform_server_setup makes, in the same order"""
+    names = guild_configs.get(guild.id)
+    
+    def create(kind, name, existing, route=CREATE_CHANNEL, sleep=0.5):
+        note = f"'{name}' already exists - setup creates a duplicate" if name in existing else None
+        plan.add('create', kind, name, route, guild.id, sleep=sleep, note=note)
+    
+    def overwrites(channel_name, role_keys):
+        for key in role_keys:
+            target = '@everyone' if key == 'everyone' else names.roles[key]
+            plan.add('edit', 'overwrite', f"{channel_name} → {target}", EDIT_OVERWRITE, channel_name)
+    
+    def message(channel_name, key):
+        plan.add('send', 'message', f"{channel_name}: {key}", SEND_MESSAGE, channel_name)
+    
+    basic = tuple(BASIC_OVERWRITES)
+    for key in SETUP_ROLE_KEYS:
+        create('role', names.roles[key], existing_roles, route=CREATE_ROLE, sleep=0.0)
+    
+    # Server stats
+    category = names.categories['server_stats']
+    create('category', category, existing_channels)
+    overwrites(category, basic)
+    total_members, online_members = get_member_count_stats(guild)
+    create('voice channel', names.channels['total_members'].format(total_members), existing_channels)
+    create('voice channel', names.channels['online_members'].format(online_members), existing_channels)
+    
+    # Language selection
+    category = names.categories['language_selection']
+    create('category', category, existing_channels)
+    overwrites(category, basic + ('everyone',))
+    channel = names.channels['choose_language']
+    create('channel', channel, existing_channels)
+    overwrites(channel, ('everyone',))
+    message(channel, 'language_selection')
+    
+    for language in LANGUAGE_KEYS:
+        for category_type, (category_key, channel_keys) in language_layout(language).items():
+            category = names.categories[category_key]
+            create('category', category, existing_channels)
+            overwrites(category, basic)
+            for channel_key in channel_keys:
+                channel = names.channels[channel_key]
+                create('channel', channel, existing_channels)
+                overwrites(channel, basic + (language,))
+                if category_type == 'support':
+                    message(channel, f'support:{language}')
+                elif category_type != 'welcome' or is_announcements_channel(channel):
+                    message(channel, f'{category_type}:{language}')
+
+# SETUP FUNCTIONS
+
+def fresh_targets(guild):
+    """Channels and roles that !fresh deletes"""
     # Delete all roles except protected ones
     protected_roles = ['@everyone', guild.name, 'CSMarketCap']
-    for role in guild.roles:
-        if role.name not in protected_roles:
-            await safe_delete_role(role)
-    
-    # Now perform standard setup
-    await perform_server_setup(guild)
+    return list(guild.channels), [role for role in guild.roles if role.name not in protected_roles]
 
-async def perform_cleanup(guild):
-    """Clean server channels and roles"""
-    logger.info(f"Starting cleanup for {guild.name}")
+def cleanup_targets(guild):
+    """Channels and roles that !cleanup deletes"""
+    names = guild_configs.get(guild.id)
     
     # Delete channels that match our naming convention
     channels_to_delete = []
     for channel in guild.channels:
         if any(channel.name.startswith(prefix) for prefix in ['📊', '🌐', '👋', '💬', '💼', '🛠️']) or \
-           any(channel.name in name for name in CHANNELS.values()):
+           any(channel.name in name for name in names.channels.values()) or \
+           any(overflow_index(channel.name, names.channels[key]) for key in ('en_support', 'ru_support')):
             channels_to_delete.append(channel)
     
-    for channel in channels_to_delete:
-        await safe_delete_channel(channel)
-    
     # Delete roles we create
     roles_to_delete = []
     for role in guild.roles:
-        if role.name in ROLES.values() and role.name != '@everyone':
+        if role.name in names.roles.values() and role.name != '@everyone':
             roles_to_delete.append(role)
     
-    for role in roles_to_delete:
+    return channels_to_delete, roles_to_delete
+
+async def delete_targets(channels, roles, job):
+    """Delete channels, then roles, reporting progress on the job"""
+    job.set_phase("Deleting channels", total=len(channels))
+    for channel in channels:
+        await safe_delete_channel(channel)
+        job.advance()
+    
+    job.set_phase("Deleting roles", total=len(roles))
+    for role in roles:
         await safe_delete_role(role)
+        job.advance()
+
+async def perform_fresh_setup(guild, job):
+    """Perform complete server wipe and recreation"""
+    logger.info(f"Starting fresh setup for {guild.name}")
+    channels, roles = fresh_targets(guild)
+    await delete_targets(channels, roles, job)
+    
+    # Now perform standard setup
+    await perform_server_setup(guild, job)
+
+async def perform_cleanup(guild, job):
+    """Clean server channels and roles"""
+    logger.info(f"Starting cleanup for {guild.name}")
+    channels, roles = cleanup_targets(guild)
+    await delete_targets(channels, roles, job)
 
-async def perform_server_setup(guild):
+async def perform_server_setup(guild, job):
     """Perform complete server setup"""
     logger.info(f"Starting server setup for {guild.name}")
     
     # Step 1: Create roles
     logger.info("Creating roles...")
+    job.set_phase("Creating roles")
     guild_roles = await create_server_roles(guild)
     
     # Step 2: Create categories and channels
     logger.info("Creating server structure...")
-    await create_server_structure(guild, guild_roles)
+    job.set_phase("Creating categories and channels")
+    await create_server_structure(guild, guild_roles, job)
     
     logger.info("Server setup completed!")
 
 async def create_server_roles(guild):
     """Create all server roles with proper permissions"""
+    names = guild_configs.get(guild.id)
     guild_roles = {'everyone': guild.default_role}
     
     # Admin role
     admin_role = await safe_create_role(
         guild, 
-        ROLES['admin'],
+        names.roles['admin'],
         permissions=get_admin_permissions(),
         color=discord.Color.red(),
         hoist=True,
@@ -825,7 +2313,7 @@ async def create_server_roles(guild):
     # Moderator role
     moderator_role = await safe_create_role(
         guild,
-        ROLES['moderator'],
+        names.roles['moderator'],
         permissions=get_moderator_permissions(),
         color=discord.Color.orange(),
         hoist=True,
@@ -837,7 +2325,7 @@ async def create_server_roles(guild):
     # Bot role
     bot_role = await safe_create_role(
         guild,
-        ROLES['bot'],
+        names.roles['bot'],
         permissions=get_bot_permissions(),
         color=discord.Color.blue(),
         hoist=True,
@@ -849,7 +2337,7 @@ async def create_server_roles(guild):
     # Member role (very restrictive)
     member_role = await safe_create_role(
         guild,
-        ROLES['member'],
+        names.roles['member'],
         permissions=get_basic_permissions(),
         color=discord.Color.green(),
         hoist=False,
@@ -861,8 +2349,8 @@ async def create_server_roles(guild):
     # Language roles (minimal permissions)
     english_role = await safe_create_role(
         guild,
-        ROLES['english'],
-        permissions=discord.Permissions(read_messages=True, add_reactions=True),
+        names.roles['english'],
+        permissions=get_language_permissions(),
         color=discord.Color.from_rgb(0, 123, 255),
         hoist=False,
         reason="English language role"
@@ -872,8 +2360,8 @@ async def create_server_roles(guild):
     
     russian_role = await safe_create_role(
         guild,
-        ROLES['russian'],
-        permissions=discord.Permissions(read_messages=True, add_reactions=True),
+        names.roles['russian'],
+        permissions=get_language_permissions(),
         color=discord.Color.from_rgb(255, 193, 7),
         hoist=False,
         reason="Russian language role"
@@ -883,31 +2371,34 @@ async def create_server_roles(guild):
     
     return guild_roles
 
-async def create_server_structure(guild, guild_roles):
+async def create_server_structure(guild, guild_roles, job):
     """Create complete server channel structure"""
+    names = guild_configs.get(guild.id)
     
     # Server Stats Category
-    stats_category = await safe_create_category(guild, CATEGORIES['server_stats'])
+    stats_category = await safe_create_category(guild, names.categories['server_stats'])
     if stats_category:
         await setup_channel_permissions(stats_category, guild_roles)
+        job.advance()
         
         # Stats voice channels
         total_members, online_members = get_member_count_stats(guild)
         await safe_create_channel(
             guild,
-            CHANNELS['total_members'].format(total_members),
+            names.channels['total_members'].format(total_members),
             category=stats_category,
             channel_type=discord.ChannelType.voice
         )
         await safe_create_channel(
             guild,
-            CHANNELS['online_members'].format(online_members),
+            names.channels['online_members'].format(online_members),
             category=stats_category,
             channel_type=discord.ChannelType.voice
         )
+        job.advance(2)
     
     # Language Selection Category
-    language_category = await safe_create_category(guild, CATEGORIES['language_selection'])
+    language_category = await safe_create_category(guild, names.categories['language_selection'])
     if language_category:
         await setup_channel_permissions(language_category, guild_roles)
         
@@ -916,50 +2407,56 @@ async def create_server_structure(guild, guild_roles):
         
         language_channel = await safe_create_channel(
             guild,
-            CHANNELS['choose_language'],
+            names.channels['choose_language'],
             category=language_category
         )
         if language_channel:
             await language_channel.set_permissions(guild_roles['everyone'], read_messages=True, send_messages=False)
             await setup_language_selection_channel(language_channel)
+        job.advance(2)
     
     # English Categories
-    await create_language_channels(guild, guild_roles, 'english')
+    await create_language_channels(guild, guild_roles, 'english', job)
     
     # Russian Categories  
-    await create_language_channels(guild, guild_roles, 'russian')
+    await create_language_channels(guild, guild_roles, 'russian', job)
 
-async def create_language_channels(guild, guild_roles, language):
-    """Create channels for a specific language"""
+def language_layout(language):
+    """Category type -> (category key, channel keys) for one language"""
     if language == 'english':
-        categories_config = {
+        return {
             'welcome': ('en_welcome', ['en_announcements', 'en_status', 'en_read_me']),
             'community': ('en_community', ['en_general', 'en_cs2_talk', 'en_skin_chat', 'en_price_discussion', 'en_skin_news']),
             'trading': ('en_trading', ['en_market', 'en_looking_for', 'en_price_check']),
             'support': ('en_support', ['en_support'])
         }
-        language_role = guild_roles['english']
-    else:
-        categories_config = {
-            'welcome': ('ru_welcome', ['ru_announcements', 'ru_status', 'ru_read_me']),
-            'community': ('ru_community', ['ru_general', 'ru_cs2_talk', 'ru_skin_chat', 'ru_price_discussion', 'ru_skin_news']),
-            'trading': ('ru_trading', ['ru_market', 'ru_looking_for', 'ru_price_check']),
-            'support': ('ru_support', ['ru_support'])
-        }
-        language_role = guild_roles['russian']
+    return {
+        'welcome': ('ru_welcome', ['ru_announcements', 'ru_status', 'ru_read_me']),
+        'community': ('ru_community', ['ru_general', 'ru_cs2_talk', 'ru_skin_chat', 'ru_price_discussion', 'ru_skin_news']),
+        'trading': ('ru_trading', ['ru_market', 'ru_looking_for', 'ru_price_check']),
+        'support': ('ru_support', ['ru_support'])
+    }
+
+async def create_language_channels(guild, guild_roles, language, job):
+    """Create channels for a specific language"""
+    names = guild_configs.get(guild.id)
+    categories_config = language_layout(language)
+    language_role = guild_roles[language]
     
     for category_type, (category_key, channel_keys) in categories_config.items():
-        category = await safe_create_category(guild, CATEGORIES[category_key])
+        category = await safe_create_category(guild, names.categories[category_key])
         if not category:
             continue
             
         # Set basic permissions
         await setup_channel_permissions(category, guild_roles)
+        job.advance()
         
         for channel_key in channel_keys:
-            channel = await safe_create_channel(guild, CHANNELS[channel_key], category=category)
+            channel = await safe_create_channel(guild, names.channels[channel_key], category=category)
             if not channel:
                 continue
+            job.advance()
             
             # Apply specific permissions based on category type
             if category_type == 'welcome':
@@ -974,173 +2471,89 @@ async def create_language_channels(guild, guild_roles, language):
 
 async def setup_language_selection_channel(channel):
     """Setup language selection channel with embed and buttons"""
-    embed = create_embed(
-        "🌐 Language Selection",
-        "**Welcome to CSMarketCap!**\n"
-        "Choose your preferred language to access the appropriate channels.\n\n"
-        "🇺🇸 **English** - Access English channels\n"
-        "🇷🇺 **Русский** - Доступ к русским каналам\n\n"
-        "**После выбора языка вы получите:**\n"
-        "• Доступ к каналам на выбранном языке\n"
-        "• Руководство по каналам в ЛС\n"
-        "• Возможность торговать и общаться\n\n"
-        "**After selecting a language you will get:**\n"
-        "• Access to channels in your chosen language\n"
-        "• Channel guide via DM\n"
-        "• Ability to trade and communicate",
-        color=COLORS['primary']
-    )
-    
-    await channel.send(embed=embed, view=language_view)
+    message = await channel.send(embed=content.embed('language_selection'), view=language_view)
+    panels.track(message, 'language_selection')
 
 async def setup_support_channel(channel, language):
     """Setup support channel with ticket creation button"""
-    if language == 'english':
-        embed = create_embed(
-            "🆘 Support Center",
-            "**Need help?** Our support team is here to assist you!\n\n"
-            "**How to get support:**\n"
-            "• Click the button below to create a private ticket\n"
-            "• Describe your issue in detail\n"
-            "• Our staff will respond as soon as possible\n\n"
-            "**What we help with:**\n"
-            "🔹 Trading disputes and scam reports\n"
-            "🔹 Technical issues with the server\n"
-            "🔹 Account problems and verification\n"
-            "🔹 General questions about CS2 trading\n"
-            "🔹 Channel access and permission issues\n\n"
-            "**Response time:** Usually within 24 hours\n"
-            "**Language:** English support",
-            color=COLORS['info']
-        )
-        # Create a simple view with only the English button visible
-        view = SimpleTicketView('english')
-    else:
-        embed = create_embed(
-            "🆘 Центр поддержки",
-            "**Нужна помощь?** Наша команда поддержки готова вам помочь!\n\n"
-            "**Как получить поддержку:**\n"
-            "• Нажмите кнопку ниже, чтобы создать приватный тикет\n"
-            "• Подробно опишите вашу проблему\n"
-            "• Наш персонал ответит как можно скорее\n\n"
-            "**С чем мы помогаем:**\n"
-            "🔹 Торговые споры и жалобы на мошенников\n"
-            "🔹 Технические проблемы с сервером\n"
-            "🔹 Проблемы с аккаунтом и верификацией\n"
-            "🔹 Общие вопросы о торговле CS2\n"
-            "🔹 Доступ к каналам и проблемы с правами\n\n"
-            "**Время ответа:** Обычно в течение 24 часов\n"
-            "**Язык:** Поддержка на русском языке",
-            color=COLORS['info']
-        )
-        # Create a simple view with only the Russian button visible
-        view = SimpleTicketView('russian')
-    
-    await channel.send(embed=embed, view=view)
+    # A simple view with only this language's button visible
+    view = SimpleTicketView(language)
+    key = f'support:{language}'
+    message = await channel.send(embed=content.embed(key), view=view)
+    panels.track(message, key)
+
+def is_announcements_channel(name):
+    return 'announcements' in name or 'объявления' in name
 
 async def send_welcome_channel_content(channel, language):
     """Send welcome content to welcome category channels"""
-    if 'announcements' in channel.name or 'объявления' in channel.name:
-        if language == 'english':
-            embed = create_embed(
-                "📢 Welcome to CSMarketCap Announcements",
-                "**This channel is for important server announcements only.**\n\n"
-                "Here you'll find:\n"
-                "🔹 Server updates and changes\n"
-                "🔹 New features and improvements\n"
-                "🔹 Community events and tournaments\n"
-                "🔹 Important policy changes\n"
-                "🔹 Maintenance notifications\n\n"
-                "*This is a read-only channel for regular members.*",
-                color=COLORS['primary']
-            )
-        else:
-            embed = create_embed(
-                "📢 Добро пожаловать в объявления CSMarketCap",
-                "**Этот канал только для важных объявлений сервера.**\n\n"
-                "Здесь вы найдете:\n"
-                "🔹 Обновления и изменения сервера\n"
-                "🔹 Новые функции и улучшения\n"
-                "🔹 События сообщества и турниры\n"
-                "🔹 Важные изменения политики\n"
-                "🔹 Уведомления о техническом обслуживании\n\n"
-                "*Это канал только для чтения для обычных участников.*",
-                color=COLORS['primary']
-            )
-        await channel.send(embed=embed)
+    if is_announcements_channel(channel.name):
+        key = f'announcements:{language}'
+        message = await channel.send(embed=content.embed(key))
+        panels.track(message, key)
 
 async def send_channel_content(channel, channel_key, language):
     """Send appropriate content to specific channels"""
-    # This would contain detailed channel descriptions and pinned messages
-    # For brevity, I'll just add a basic welcome message
     if language == 'english':
-        if 'general' in channel.name:
-            embed = create_embed(
-                "💬 General Chat",
-                "Welcome to the general discussion channel!\n\n"
-                "**Channel Rules:**\n"
-                "• Keep discussions friendly and respectful\n"
-                "• No spam or excessive caps\n"
-                "• Use appropriate channels for specific topics\n"
-                "• Have fun and be part of the community!\n\n"
-                "Let's chat about CS2, trading, and community topics! 🎮",
-                color=COLORS['secondary']
-            )
-        elif 'market' in channel.name:
-            embed = create_embed(
-                "💸 Trading Market",
-                "Welcome to the CS2 trading market!\n\n"
-                "**Trading Guidelines:**\n"
-                "• Always use Steam trade offers\n"
-                "• Check prices before trading\n"
-                "• Beware of scammers\n"
-                "• Use middleman services for high-value trades\n"
-                "• Report suspicious activity\n\n"
-                "Happy trading! 📈",
-                color=COLORS['success']
-            )
-        else:
-            embed = create_embed(
-                f"Welcome to {channel.name}",
-                "This channel is part of the CSMarketCap community.\n"
-                "Please follow server rules and enjoy your stay!",
-                color=COLORS['info']
-            )
+        topic = 'general' if 'general' in channel.name else 'market' if 'market' in channel.name else 'channel'
     else:
-        if 'общий' in channel.name:
-            embed = create_embed(
-                "💬 Общий чат",
-                "Добро пожаловать в канал общих обсуждений!\n\n"
-                "**Правила канала:**\n"
-                "• Ведите дружелюбные и уважительные обсуждения\n"
-                "• Без спама и чрезмерного использования капса\n"
-                "• Используйте соответствующие каналы для конкретных тем\n"
-                "• Веселитесь и будьте частью сообщества!\n\n"
-                "Давайте общаться о CS2, торговле и темах сообщества! 🎮",
-                color=COLORS['secondary']
-            )
-        elif 'рынок' in channel.name:
-            embed = create_embed(
-                "💸 Торговый рынок",
-                "Добро пожаловать на торговый рынок CS2!\n\n"
-                "**Правила торговли:**\n"
-                "• Всегда используйте торговые предложения Steam\n"
-                "• Проверяйте цены перед торговлей\n"
-                "• Остерегайтесь мошенников\n"
-                "• Используйте услуги посредника для дорогих сделок\n"
-                "• Сообщайте о подозрительной активности\n\n"
-                "Удачной торговли! 📈",
-                color=COLORS['success']
-            )
-        else:
-            embed = create_embed(
-                f"Добро пожаловать в {channel.name}",
-                "Этот канал является частью сообщества CSMarketCap.\n"
-                "Пожалуйста, соблюдайте правила сервера и приятного пребывания!",
-                color=COLORS['info']
-            )
+        topic = 'general' if 'общий' in channel.name else 'market' if 'рынок' in channel.name else 'channel'
     
-    await channel.send(embed=embed)
+    key = f'{topic}:{language}'
+    message = await channel.send(embed=content.embed(key, channel=channel.name))
+    panels.track(message, key, channel=channel.name)
+
+def guild_panels(guild):
+    """Registry entries for the panels posted in a guild"""
+    return [entry for entry in panels.messages.values() if entry['guild_id'] == guild.id]
+
+async def post_panel(channel, key, values):
+    """Repost a panel from its content key, with the view it needs"""
+    if key == 'language_selection':
+        await setup_language_selection_channel(channel)
+    elif key.startswith('support:'):
+        await setup_support_channel(channel, key.split(':', 1)[1])
+    else:
+        message = await channel.send(embed=content.embed(key, **values))
+        panels.track(message, key, **values)
+
+async def rerender_panels(changed, names_changed):
+    """Apply reloaded content: drop cached guild configs and edit panels whose text changed"""
+    if names_changed:
+        guild_configs.invalidate()
+    
+    for message_id, entry in panels.for_keys(changed):
+        channel = bot.get_channel(entry['channel_id'])
+        if channel is None:
+            panels.forget(message_id)
+            continue
+        try:
+            # Editing only the embed keeps the message's buttons
+            await channel.get_partial_message(message_id).edit(embed=content.embed(entry['key'], **entry['values']))
+        except discord.NotFound:
+            panels.forget(message_id)
+        except discord.HTTPException as e:
+            logger.warning(f"Could not re-render panel {message_id}: {e}")
+    if changed:
+        logger.info(f"Re-rendered panels: {', '.join(changed)}")
+
+async def setup_hook():
+    """Prepare the slash command tree and sync it if it changed since the last start"""
+    # Hidden from members without Manage Server; is_admin still checks the Admin role
+    for command in bot.tree.get_commands():
+        command.default_permissions = discord.Permissions(manage_guild=True)
+    try:
+        await command_sync.sync(bot.tree, bot.application_id)
+    except discord.HTTPException as e:
+        logger.error(f"Could not sync application commands: {e}")
+
+bot.setup_hook = setup_hook
+
+# Re-render panels when the content file changes
+content.add_listener(rerender_panels)
+
+# Keep job progress messages up to date
+jobs.add_listener(render_job)
 
 # Run the bot
 if __name__ == "__main__":
@@ -1149,6 +2562,7 @@ if __name__ == "__main__":
         logger.error("Please create a .env file with your bot token.")
         exit(1)
     
+    runtime.install_event_loop()
     try:
         bot.run(DISCORD_TOKEN)
     except discord.LoginFailure:
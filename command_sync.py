@@ -0,0 +1,61 @@
+import hashlib
+import json
+import os
+import time
+from utils import logger
+from config import DATA_DIR
+
+
+class CommandTreeSync:
+    """Syncs application commands only when the command tree has changed
+
+    Global syncs are heavily rate limited, so syncing on every start is
+    wasteful. The tree's payload is hashed and compared with the hash stored
+    after the last successful sync (per application); the sync endpoint is
+    only called when they differ.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.state = self.load()
+
+    @staticmethod
+    def tree_hash(tree):
+        payload = sorted((command.to_dict() for command in tree.get_commands()), key=lambda command: command['name'])
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+
+    async def sync(self, tree, application_id, force=False):
+        """Sync if the tree changed (or ``force``); returns the number of commands synced, None if skipped"""
+        digest = self.tree_hash(tree)
+        if not force and self.state.get('hash') == digest and self.state.get('application_id') == application_id:
+            logger.info("Application commands unchanged - skipping sync")
+            return None
+        synced = await tree.sync()
+        self.state = {'hash': digest, 'application_id': application_id, 'synced_at': time.time(), 'commands': len(synced)}
+        self.save()
+        logger.info(f"Synced {len(synced)} application commands")
+        return len(synced)
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"Could not load command sync state from {self.path}: {e}")
+            return {}
+
+    def save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.state, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.error(f"Could not persist command sync state: {e}")
+
+
+# Shared sync state
+command_sync = CommandTreeSync(os.path.join(DATA_DIR, 'command_tree.json'))
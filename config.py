@@ -10,8 +10,116 @@ GUILD_ID = int(os.getenv('GUILD_ID')) if os.getenv('GUILD_ID') else None
 
 # Bot Settings
 BOT_PREFIX = os.getenv('BOT_PREFIX', '!')
+PREFIX_COMMANDS_ENABLED = os.getenv('PREFIX_COMMANDS_ENABLED', 'True').lower() == 'true'  # False: slash commands only
 DEBUG_MODE = os.getenv('DEBUG_MODE', 'False').lower() == 'true'
 
+RUNTIME_PROFILE = os.getenv('RUNTIME_PROFILE', 'default').lower()  # 'performance': uvloop, used intents only, no message cache
+
+# Local storage for persisted bot state
+DATA_DIR = os.getenv('DATA_DIR', 'data')
+
+# Ticket Settings
+TICKET_MAX_CONCURRENT_CREATIONS = int(os.getenv('TICKET_MAX_CONCURRENT_CREATIONS', '3'))
+TICKET_QUEUE_UPDATE_INTERVAL = float(os.getenv('TICKET_QUEUE_UPDATE_INTERVAL', '3'))
+TICKET_ARCHIVE_DELAY = int(os.getenv('TICKET_ARCHIVE_DELAY', '5'))  # seconds after close
+TICKET_REMINDER_HOURS = float(os.getenv('TICKET_REMINDER_HOURS', '24'))  # 0 disables
+TICKET_IDLE_CLOSE_HOURS = float(os.getenv('TICKET_IDLE_CLOSE_HOURS', '72'))  # 0 disables
+TICKET_CHANNEL_THREAD_LIMIT = int(os.getenv('TICKET_CHANNEL_THREAD_LIMIT', '200'))  # active tickets per support channel before overflow
+TICKET_OVERFLOW_HEADROOM = int(os.getenv('TICKET_OVERFLOW_HEADROOM', '20'))  # free slots left when the next overflow channel is created
+TICKET_GUILD_THREAD_SOFT_LIMIT = int(os.getenv('TICKET_GUILD_THREAD_SOFT_LIMIT', '900'))  # Discord allows 1000 active threads per server
+TICKET_ARCHIVE_IDLE_HOURS = float(os.getenv('TICKET_ARCHIVE_IDLE_HOURS', '12'))  # archive (not close) idle tickets; 0 disables
+SCHEDULER_RETRY_DELAY = float(os.getenv('SCHEDULER_RETRY_DELAY', '60'))  # seconds before retrying a failed ticket timer, times the attempt
+SCHEDULER_MAX_ATTEMPTS = int(os.getenv('SCHEDULER_MAX_ATTEMPTS', '5'))  # runs of a failing ticket timer before it is dropped
+TICKET_ARCHIVE_SWEEP_SECONDS = float(os.getenv('TICKET_ARCHIVE_SWEEP_SECONDS', '300'))
+
+# DM Delivery
+DM_QUEUE_SIZE = int(os.getenv('DM_QUEUE_SIZE', '1000'))
+DM_WORKERS = int(os.getenv('DM_WORKERS', '2'))
+DM_RATE_PER_SECOND = float(os.getenv('DM_RATE_PER_SECOND', '1'))
+DM_DEDUPE_WINDOW = int(os.getenv('DM_DEDUPE_WINDOW', '300'))  # seconds
+DM_CLOSED_TTL = int(os.getenv('DM_CLOSED_TTL', '86400'))  # seconds to remember closed DMs
+
+# Raid Detection
+RAID_WINDOW_SECONDS = int(os.getenv('RAID_WINDOW_SECONDS', '60'))
+RAID_JOIN_THRESHOLD = int(os.getenv('RAID_JOIN_THRESHOLD', '30'))  # joins per window
+RAID_YOUNG_ACCOUNT_DAYS = float(os.getenv('RAID_YOUNG_ACCOUNT_DAYS', '7'))
+RAID_YOUNG_THRESHOLD = int(os.getenv('RAID_YOUNG_THRESHOLD', '10'))  # young accounts per window
+RAID_SIMILAR_NAME_THRESHOLD = int(os.getenv('RAID_SIMILAR_NAME_THRESHOLD', '5'))  # same name skeleton per window
+RAID_LOCKDOWN_MINUTES = float(os.getenv('RAID_LOCKDOWN_MINUTES', '15'))
+RAID_ALERT_CHANNEL = os.getenv('RAID_ALERT_CHANNEL', 'staff-alerts')
+
+# Language Roles
+ROLE_JOB_CONCURRENCY = int(os.getenv('ROLE_JOB_CONCURRENCY', '5'))  # concurrent member edits
+ROLE_JOB_CHUNK_SIZE = int(os.getenv('ROLE_JOB_CHUNK_SIZE', '50'))  # members per checkpoint
+
+# Onboarding: 'panel' (members pick a language) or 'auto' (assign from detected locale, panel as fallback)
+ONBOARDING_MODE = os.getenv('ONBOARDING_MODE', 'panel').lower()
+ONBOARDING_NAME_HEURISTIC = os.getenv('ONBOARDING_NAME_HEURISTIC', 'True').lower() == 'true'  # Cyrillic names -> Russian
+ONBOARDING_BATCH_SECONDS = float(os.getenv('ONBOARDING_BATCH_SECONDS', '5'))
+
+# Discord client locale -> language role (full locale first, then language prefix)
+LOCALE_LANGUAGES = {
+    'en': 'english',
+    'ru': 'russian',
+    'uk': 'russian',
+    'be': 'russian',
+    'kk': 'russian'
+}
+
+ROLE_COUNT_RECONCILE_MINUTES = int(os.getenv('ROLE_COUNT_RECONCILE_MINUTES', '15'))  # Full role recount interval
+
+# Multi-guild
+GUILD_CONFIG_CACHE_SIZE = int(os.getenv('GUILD_CONFIG_CACHE_SIZE', '512'))  # guild configs kept in memory
+
+# Hot-reloadable names, colors and panel texts (see README)
+CONTENT_FILE = os.getenv('CONTENT_FILE', os.path.join(DATA_DIR, 'content.json'))
+CONTENT_WATCH_INTERVAL = float(os.getenv('CONTENT_WATCH_INTERVAL', '5'))  # seconds between file checks
+
+# Background jobs (!jobs)
+JOB_PROGRESS_SECONDS = float(os.getenv('JOB_PROGRESS_SECONDS', '3'))  # min seconds between progress message edits
+JOB_HISTORY_SIZE = int(os.getenv('JOB_HISTORY_SIZE', '500'))  # finished jobs kept in data/jobs.json
+
+# Periodic tasks (!tasks)
+STATS_UPDATE_INTERVAL = float(os.getenv('STATS_UPDATE_INTERVAL', '10'))  # seconds between stat channel updates per server
+PERIODIC_JITTER = float(os.getenv('PERIODIC_JITTER', '0.1'))  # +/- fraction of the interval added to each run
+PERIODIC_MAX_BACKOFF = float(os.getenv('PERIODIC_MAX_BACKOFF', '300'))  # max seconds between retries of a failing task
+PERIODIC_SUPERVISE_SECONDS = float(os.getenv('PERIODIC_SUPERVISE_SECONDS', '5'))  # how often dead or missing instances are restarted
+
+# Memory profiling (!memory)
+MEMORY_TRACE_AT_STARTUP = os.getenv('MEMORY_TRACE_AT_STARTUP', 'False').lower() == 'true'  # tracemalloc slows allocations down
+MEMORY_TRACE_FRAMES = int(os.getenv('MEMORY_TRACE_FRAMES', '10'))  # stack frames kept per allocation
+MEMORY_TOP_SITES = int(os.getenv('MEMORY_TOP_SITES', '25'))  # allocation sites per report
+
+# CPU profiling (!profile)
+PROFILE_SAMPLE_INTERVAL = float(os.getenv('PROFILE_SAMPLE_INTERVAL', '0.005'))  # CPU seconds between stack samples
+PROFILE_MAX_SECONDS = int(os.getenv('PROFILE_MAX_SECONDS', '120'))  # longest allowed profiling session
+
+# Permission audit (!audit_permissions)
+AUDIT_CONCURRENCY = int(os.getenv('AUDIT_CONCURRENCY', '5'))  # parallel overwrite edits when fixing
+
+# Guild snapshots
+RESTORE_CONCURRENCY = int(os.getenv('RESTORE_CONCURRENCY', '10'))  # parallel creates during !restore
+
+# Dry-run plans (!plan)
+PLAN_REQUEST_LATENCY = float(os.getenv('PLAN_REQUEST_LATENCY', '0.3'))  # assumed seconds per REST call
+
+# Status API (read-only HTTP health/stats endpoints)
+STATUS_API_ENABLED = os.getenv('STATUS_API_ENABLED', 'True').lower() == 'true'
+STATUS_API_HOST = os.getenv('STATUS_API_HOST', '0.0.0.0')
+STATUS_API_PORT = int(os.getenv('STATUS_API_PORT', '8080'))
+STATUS_STATS_STALE_SECONDS = float(os.getenv('STATUS_STATS_STALE_SECONDS', '60'))  # /health fails when no guild's stats were sampled for this long
+
+# Stats History (days each rollup resolution is kept)
+STATS_RETENTION_DAYS = {
+    '1m': int(os.getenv('STATS_RETENTION_1M_DAYS', '2')),
+    '1h': int(os.getenv('STATS_RETENTION_1H_DAYS', '90')),
+    '1d': int(os.getenv('STATS_RETENTION_1D_DAYS', '3650'))
+}
+
+# Ticket Transcripts
+TRANSCRIPT_BATCH_SIZE = int(os.getenv('TRANSCRIPT_BATCH_SIZE', '100'))  # messages per history page
+TRANSCRIPT_HTML = os.getenv('TRANSCRIPT_HTML', 'False').lower() == 'true'
+
 # Channel and Role Names
 ROLES = {
     'admin': 'Admin',
@@ -0,0 +1,370 @@
+import copy
+import json
+import os
+import traceback
+from utils import create_embed, logger
+from config import (
+    ROLES, CATEGORIES, CHANNELS, COLORS, DATA_DIR, CONTENT_FILE
+)
+
+# Panel texts; the content file may override any field of any panel
+DEFAULT_PANELS = {
+    'language_selection': {
+        'title': "🌐 Language Selection",
+        'description': "**Welcome to CSMarketCap!**\n"
+                       "Choose your preferred language to access the appropriate channels.\n\n"
+                       "🇺🇸 **English** - Access English channels\n"
+                       "🇷🇺 **Русский** - Доступ к русским каналам\n\n"
+                       "**После выбора языка вы получите:**\n"
+                       "• Доступ к каналам на выбранном языке\n"
+                       "• Руководство по каналам в ЛС\n"
+                       "• Возможность торговать и общаться\n\n"
+                       "**After selecting a language you will get:**\n"
+                       "• Access to channels in your chosen language\n"
+                       "• Channel guide via DM\n"
+                       "• Ability to trade and communicate",
+        'color': 'primary'
+    },
+    'support:english': {
+        'title': "🆘 Support Center",
+        'description': "**Need help?** Our support team is here to assist you!\n\n"
+                       "**How to get support:**\n"
+                       "• Click the button below to create a private ticket\n"
+                       "• Describe your issue in detail\n"
+                       "• Our staff will respond as soon as possible\n\n"
+                       "**What we help with:**\n"
+                       "🔹 Trading disputes and scam reports\n"
+                       "🔹 Technical issues with the server\n"
+                       "🔹 Account problems and verification\n"
+                       "🔹 General questions about CS2 trading\n"
+                       "🔹 Channel access and permission issues\n\n"
+                       "**Response time:** Usually within 24 hours\n"
+                       "**Language:** English support",
+        'color': 'info'
+    },
+    'support:russian': {
+        'title': "🆘 Центр поддержки",
+        'description': "**Нужна помощь?** Наша команда поддержки готова вам помочь!\n\n"
+                       "**Как получить поддержку:**\n"
+                       "• Нажмите кнопку ниже, чтобы создать приватный тикет\n"
+                       "• Подробно опишите вашу проблему\n"
+                       "• Наш персонал ответит как можно скорее\n\n"
+                       "**С чем мы помогаем:**\n"
+                       "🔹 Торговые споры и жалобы на мошенников\n"
+                       "🔹 Технические проблемы с сервером\n"
+                       "🔹 Проблемы с аккаунтом и верификацией\n"
+                       "🔹 Общие вопросы о торговле CS2\n"
+                       "🔹 Доступ к каналам и проблемы с правами\n\n"
+                       "**Время ответа:** Обычно в течение 24 часов\n"
+                       "**Язык:** Поддержка на русском языке",
+        'color': 'info'
+    },
+    'announcements:english': {
+        'title': "📢 Welcome to CSMarketCap Announcements",
+        'description': "**This channel is for important server announcements only.**\n\n"
+                       "Here you'll find:\n"
+                       "🔹 Server updates and changes\n"
+                       "🔹 New features and improvements\n"
+                       "🔹 Community events and tournaments\n"
+                       "🔹 Important policy changes\n"
+                       "🔹 Maintenance notifications\n\n"
+                       "*This is a read-only channel for regular members.*",
+        'color': 'primary'
+    },
+    'announcements:russian': {
+        'title': "📢 Добро пожаловать в объявления CSMarketCap",
+        'description': "**Этот канал только для важных объявлений сервера.**\n\n"
+                       "Здесь вы найдете:\n"
+                       "🔹 Обновления и изменения сервера\n"
+                       "🔹 Новые функции и улучшения\n"
+                       "🔹 События сообщества и турниры\n"
+                       "🔹 Важные изменения политики\n"
+                       "🔹 Уведомления о техническом обслуживании\n\n"
+                       "*Это канал только для чтения для обычных участников.*",
+        'color': 'primary'
+    },
+    'general:english': {
+        'title': "💬 General Chat",
+        'description': "Welcome to the general discussion channel!\n\n"
+                       "**Channel Rules:**\n"
+                       "• Keep discussions friendly and respectful\n"
+                       "• No spam or excessive caps\n"
+                       "• Use appropriate channels for specific topics\n"
+                       "• Have fun and be part of the community!\n\n"
+                       "Let's chat about CS2, trading, and community topics! 🎮",
+        'color': 'secondary'
+    },
+    'general:russian': {
+        'title': "💬 Общий чат",
+        'description': "Добро пожаловать в канал общих обсуждений!\n\n"
+                       "**Правила канала:**\n"
+                       "• Ведите дружелюбные и уважительные обсуждения\n"
+                       "• Без спама и чрезмерного использования капса\n"
+                       "• Используйте соответствующие каналы для конкретных тем\n"
+                       "• Веселитесь и будьте частью сообщества!\n\n"
+                       "Давайте общаться о CS2, торговле и темах сообщества! 🎮",
+        'color': 'secondary'
+    },
+    'market:english': {
+        'title': "💸 Trading Market",
+        'description': "Welcome to the CS2 trading market!\n\n"
+                       "**Trading Guidelines:**\n"
+                       "• Always use Steam trade offers\n"
+                       "• Check prices before trading\n"
+                       "• Beware of scammers\n"
+                       "• Use middleman services for high-value trades\n"
+                       "• Report suspicious activity\n\n"
+                       "Happy trading! 📈",
+        'color': 'success'
+    },
+    'market:russian': {
+        'title': "💸 Торговый рынок",
+        'description': "Добро пожаловать на торговый рынок CS2!\n\n"
+                       "**Правила торговли:**\n"
+                       "• Всегда используйте торговые предложения Steam\n"
+                       "• Проверяйте цены перед торговлей\n"
+                       "• Остерегайтесь мошенников\n"
+                       "• Используйте услуги посредника для дорогих сделок\n"
+                       "• Сообщайте о подозрительной активности\n\n"
+                       "Удачной торговли! 📈",
+        'color': 'success'
+    },
+    'channel:english': {
+        'title': "Welcome to {channel}",
+        'description': "This channel is part of the CSMarketCap community.\n"
+                       "Please follow server rules and enjoy your stay!",
+        'color': 'info'
+    },
+    'channel:russian': {
+        'title': "Добро пожаловать в {channel}",
+        'description': "Этот канал является частью сообщества CSMarketCap.\n"
+                       "Пожалуйста, соблюдайте правила сервера и приятного пребывания!",
+        'color': 'info'
+    }
+}
+
+# config.py dicts that the content file may override (updated in place so every importer sees changes)
+NAME_SECTIONS = {'roles': ROLES, 'categories': CATEGORIES, 'channels': CHANNELS}
+
+
+def name_problem(value, default):
+    """Why ``value`` cannot replace the name ``default``, None when it can"""
+    if not isinstance(value, str) or not value.strip():
+        return "must be a non-empty string"
+    if '{}' in default:
+        # Formatted with the count and split on '{}' to find the stat channels
+        try:
+            value.format(0)
+            placeholders = value.count('{}')
+        except (KeyError, IndexError, ValueError):
+            placeholders = None
+        if placeholders != 1:
+            return "must contain exactly one '{}' placeholder"
+    return None
+
+
+def validate_content(data):
+    """Check a parsed content file; returns a list of problems (empty when valid)"""
+    if not isinstance(data, dict):
+        return ["top level must be an object"]
+    problems = []
+    for key in data:
+        if key not in ('colors', 'panels', *NAME_SECTIONS):
+            problems.append(f"unknown section '{key}'")
+
+    sections = {}
+    for section in ('colors', 'panels', *NAME_SECTIONS):
+        sections[section] = data.get(section, {})
+        if not isinstance(sections[section], dict):
+            problems.append(f"{section}: must be an object")
+            sections[section] = {}
+
+    for section, defaults in NAME_SECTIONS.items():
+        for key, value in sections[section].items():
+            if key not in defaults:
+                problems.append(f"{section}.{key}: unknown key")
+            elif name_problem(value, defaults[key]):
+                problems.append(f"{section}.{key}: {name_problem(value, defaults[key])}")
+
+    colors = {**COLORS}
+    for key, value in sections['colors'].items():
+        try:
+            colors[key] = int(value, 16) if isinstance(value, str) else int(value)
+            if not 0 <= colors[key] <= 0xffffff:
+                raise ValueError
+        except (TypeError, ValueError):
+            problems.append(f"colors.{key}: must be a hex string like '00ff88' or an integer")
+
+    for key, panel in sections['panels'].items():
+        if key not in DEFAULT_PANELS:
+            problems.append(f"panels.{key}: unknown panel")
+            continue
+        if not isinstance(panel, dict):
+            problems.append(f"panels.{key}: must be an object")
+            continue
+        merged = {**DEFAULT_PANELS[key], **panel}
+        for field in ('title', 'description'):
+            if not isinstance(merged[field], str) or not merged[field].strip():
+                problems.append(f"panels.{key}.{field}: must be a non-empty string")
+            else:
+                try:
+                    merged[field].format(channel='channel')
+                except (KeyError, IndexError, ValueError) as e:
+                    problems.append(f"panels.{key}.{field}: bad placeholder {e}")
+        if not isinstance(merged['color'], str):
+            problems.append(f"panels.{key}.color: must be a color name")
+        elif merged['color'] not in colors:
+            problems.append(f"panels.{key}.color: unknown color '{merged['color']}'")
+    return problems
+
+
+class ContentStore:
+    """Names, colors and panel texts with hot reload from ``CONTENT_FILE``
+
+    The file is polled for changes (bot.py runs ``reload`` as a periodic task);
+    a new version is validated as a whole and then applied in one step (no awaits in between, so no handler ever sees a
+    half-applied config). Listeners are told which panels render differently
+    so only those messages are re-rendered.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.defaults = {
+            'colors': dict(COLORS),
+            **{section: dict(names) for section, names in NAME_SECTIONS.items()}
+        }
+        self.panels = copy.deepcopy(DEFAULT_PANELS)
+        self.mtime = None
+        self.listeners = []
+        self.last_error = None
+
+    def add_listener(self, callback):
+        """``callback(changed_panel_keys, names_changed)`` is awaited after each applied reload"""
+        self.listeners.append(callback)
+
+    def render_spec(self, key):
+        panel = self.panels[key]
+        return panel['title'], panel['description'], COLORS.get(panel['color'], COLORS['info'])
+
+    def embed(self, key, **values):
+        """Build a panel embed; ``values`` fill placeholders such as ``{channel}``"""
+        title, description, color = self.render_spec(key)
+        return create_embed(title.format(**values), description.format(**values), color=color)
+
+    # Loading
+
+    def load(self):
+        """Apply the content file if it changed; returns (changed panel keys, names changed) or None"""
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            mtime = None
+        if mtime == self.mtime:
+            return None
+
+        data = {}
+        if mtime is not None:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                self.last_error = [f"could not read file: {e}"]
+                self.mtime = mtime
+                logger.error(f"Content file {self.path} not applied: {e}")
+                return None
+            problems = validate_content(data)
+            if problems:
+                self.last_error = problems
+                self.mtime = mtime
+                logger.error(f"Content file {self.path} not applied: {'; '.join(problems)}")
+                return None
+
+        self.mtime = mtime
+        self.last_error = None
+        return self._apply(data)
+
+    def _apply(self, data):
+        before = {key: self.render_spec(key) for key in self.panels}
+        names_before = {section: dict(names) for section, names in NAME_SECTIONS.items()}
+
+        colors = dict(self.defaults['colors'])
+        for key, value in data.get('colors', {}).items():
+            colors[key] = int(value, 16) if isinstance(value, str) else int(value)
+        COLORS.clear()
+        COLORS.update(colors)
+        for section, names in NAME_SECTIONS.items():
+            names.clear()
+            names.update(self.defaults[section])
+            names.update(data.get(section, {}))
+        self.panels = {
+            key: {**panel, **data.get('panels', {}).get(key, {})}
+            for key, panel in DEFAULT_PANELS.items()
+        }
+
+        changed = [key for key in self.panels if self.render_spec(key) != before[key]]
+        names_changed = any(dict(names) != names_before[section] for section, names in NAME_SECTIONS.items())
+        return changed, names_changed
+
+    async def reload(self):
+        """Check the file now and notify listeners; returns the load result"""
+        result = self.load()
+        if result:
+            changed, names_changed = result
+            logger.info(f"Content reloaded: {len(changed)} panels changed, names changed: {names_changed}")
+            for callback in self.listeners:
+                try:
+                    await callback(changed, names_changed)
+                except Exception as e:
+                    logger.error(f"Content listener failed: {e}")
+                    traceback.print_exc()
+        return result
+
+
+class PanelRegistry:
+    """Where each panel message was posted, so edited content can be re-rendered in place"""
+
+    def __init__(self, path):
+        self.path = path
+        self.messages = {}  # message id -> {'guild_id', 'channel_id', 'key', 'values'}
+        self.load()
+
+    def track(self, message, key, **values):
+        self.messages[message.id] = {
+            'guild_id': message.guild.id if message.guild else None,
+            'channel_id': message.channel.id,
+            'key': key,
+            'values': values
+        }
+        self.save()
+
+    def forget(self, message_id):
+        if self.messages.pop(message_id, None) is not None:
+            self.save()
+
+    def for_keys(self, keys):
+        keys = set(keys)
+        return [(message_id, entry) for message_id, entry in self.messages.items() if entry['key'] in keys]
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.messages = {int(message_id): entry for message_id, entry in json.load(f).items()}
+        except (OSError, ValueError) as e:
+            logger.error(f"Could not load panel registry from {self.path}: {e}")
+
+    def save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.messages, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.error(f"Could not persist panel registry: {e}")
+
+
+# Shared content and panel registry
+content = ContentStore(CONTENT_FILE)
+panels = PanelRegistry(os.path.join(DATA_DIR, 'panels.json'))
@@ -0,0 +1,133 @@
+import asyncio
+import os
+import re
+import signal
+import threading
+import time
+from collections import Counter
+from utils import logger
+from config import DATA_DIR, PROFILE_SAMPLE_INTERVAL
+
+
+def frame_label(frame):
+    code = frame.f_code
+    filename = code.co_filename
+    _, marker, rest = filename.rpartition('site-packages' + os.sep)
+    filename = rest if marker else os.path.basename(filename)
+    return f"{getattr(code, 'co_qualname', code.co_name)} ({filename}:{code.co_firstlineno})"
+
+
+def task_label(task):
+    """Task name with guild/job ids folded, so instances of one task aggregate"""
+    if task is None:
+        return 'loop callbacks'
+    return re.sub(r'[:-]\d+', '', task.get_name())
+
+
+class Profile:
+    """Collapsed stacks from one profiling session"""
+
+    def __init__(self, stacks, interval, elapsed, cpu_seconds):
+        self.stacks = stacks  # Counter: 'task;frame;frame' -> samples
+        self.interval = interval
+        self.elapsed = elapsed
+        self.cpu_seconds = cpu_seconds
+        self.samples = sum(stacks.values())
+
+    @property
+    def cpu_share(self):
+        """CPU time used per second of wall time (1.0 = one core fully busy)"""
+        return self.cpu_seconds / self.elapsed if self.elapsed else 0.0
+
+    def top_self(self, limit=10):
+        """Functions that were running themselves (leaf frames), by samples"""
+        leaves = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(';', 1)[-1]] += count
+        return leaves.most_common(limit)
+
+    def top_total(self, limit=10):
+        """Functions anywhere on the stack (callees included), by samples"""
+        totals = Counter()
+        for stack, count in self.stacks.items():
+            for frame in set(stack.split(';')[1:]):
+                totals[frame] += count
+        return totals.most_common(limit)
+
+    def top_tasks(self, limit=10):
+        tasks = Counter()
+        for stack, count in self.stacks.items():
+            tasks[stack.split(';', 1)[0]] += count
+        return tasks.most_common(limit)
+
+    def write(self, path):
+        """Collapsed-stack file (``frame;frame count`` lines) for flamegraph.pl or speedscope"""
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in sorted(self.stacks.items()):
+                f.write(f"{stack} {count}\n")
+
+
+class CpuProfiler:
+    """Sampling profiler for the event loop thread
+
+    A CPU-time interval timer (``ITIMER_PROF``) interrupts the process every
+    ``interval`` seconds of CPU used, and the signal handler - which Python
+    runs in the main thread, where the event loop lives - counts the current
+    stack rooted at the asyncio task that was running. Samples are therefore
+    proportional to CPU time: waiting for events costs nothing and is not
+    sampled, and nothing is hooked into the profiled code. Sampling from a
+    second thread would be biased towards idle time, because that thread
+    mostly gets the GIL when the loop releases it to wait.
+    """
+
+    def __init__(self, directory, interval=PROFILE_SAMPLE_INTERVAL):
+        self.directory = directory
+        self.interval = interval
+        self.running = False
+
+    @staticmethod
+    def available():
+        return hasattr(signal, 'setitimer') and threading.current_thread() is threading.main_thread()
+
+    async def profile(self, seconds):
+        """Sample the running loop for ``seconds``; returns the Profile"""
+        if self.running:
+            raise RuntimeError("A profiling session is already running")
+        if not self.available():
+            raise RuntimeError("CPU profiling needs setitimer and the event loop in the main thread")
+        self.running = True
+        loop = asyncio.get_running_loop()
+        stacks = Counter()
+
+        def sample(signum, frame):
+            frames = []
+            while frame is not None:
+                # Everything above the handle being run is the loop itself
+                if frame.f_code.co_name == '_run' and os.path.basename(frame.f_code.co_filename) == 'events.py':
+                    break
+                frames.append(frame_label(frame))
+                frame = frame.f_back
+            frames.append(task_label(asyncio.current_task(loop)))
+            stacks[';'.join(reversed(frames))] += 1
+
+        previous = signal.signal(signal.SIGPROF, sample)
+        started = time.perf_counter()
+        cpu_started = time.process_time()
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            signal.setitimer(signal.ITIMER_PROF, 0)
+            signal.signal(signal.SIGPROF, previous)
+            self.running = False
+        profile = Profile(stacks, self.interval, time.perf_counter() - started, time.process_time() - cpu_started)
+        logger.info(f"CPU profile: {profile.samples} samples in {profile.elapsed:.1f}s, {profile.cpu_share:.0%} CPU")
+        return profile
+
+    def path_for(self, started_at):
+        os.makedirs(self.directory, exist_ok=True)
+        return os.path.join(self.directory, f"cpu-{time.strftime('%Y%m%d-%H%M%S', time.gmtime(started_at))}.collapsed")
+
+
+# Shared profiler for !profile
+cpu_profiler = CpuProfiler(os.path.join(DATA_DIR, 'profiles'))
@@ -0,0 +1,148 @@
+import discord
+import asyncio
+import time
+from collections import OrderedDict
+from utils import logger
+from config import DM_QUEUE_SIZE, DM_WORKERS, DM_RATE_PER_SECOND, DM_DEDUPE_WINDOW, DM_CLOSED_TTL
+
+
+class ExpiringSet:
+    """Keys that expire after a fixed TTL; insertion order equals expiry order, so pruning is O(1) amortized"""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self.entries = OrderedDict()  # key -> expires_at
+
+    def _prune(self, now):
+        while self.entries:
+            key, expires_at = next(iter(self.entries.items()))
+            if expires_at > now:
+                break
+            self.entries.popitem(last=False)
+
+    def add(self, key):
+        now = time.monotonic()
+        self._prune(now)
+        self.entries[key] = now + self.ttl
+        self.entries.move_to_end(key)
+
+    def __contains__(self, key):
+        self._prune(time.monotonic())
+        return key in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class DMOutbox:
+    """Bounded DM delivery queue with per-user dedupe, a global rate cap and a negative cache
+
+    Handlers call :meth:`send` which never blocks: the message is deduplicated,
+    skipped if the user is known to have DMs closed, or dropped if the queue is
+    full. A small worker pool drains the queue under a token-bucket rate limit.
+    """
+
+    def __init__(self, max_queue=DM_QUEUE_SIZE, workers=DM_WORKERS, rate=DM_RATE_PER_SECOND,
+                 dedupe_window=DM_DEDUPE_WINDOW, closed_ttl=DM_CLOSED_TTL):
+        self.max_queue = max_queue
+        self.worker_count = workers
+        self.rate = rate
+        self.burst = max(rate, 1)
+        self.tokens = self.burst
+        self.tokens_updated = time.monotonic()
+        self.recent = ExpiringSet(dedupe_window)  # (user id, kind) recently queued
+        self.closed = ExpiringSet(closed_ttl)  # user ids with DMs closed
+        self.queue = None
+        self.rate_lock = None
+        self.workers = []
+        self.max_depth = 0
+        self.metrics = {
+            'queued': 0,
+            'sent': 0,
+            'deduplicated': 0,
+            'dropped_full': 0,
+            'skipped_closed': 0,
+            'forbidden': 0,
+            'failed': 0
+        }
+
+    def start(self):
+        """Start the worker pool (safe to call on every reconnect)"""
+        if self.queue is None:
+            self.queue = asyncio.Queue(maxsize=self.max_queue)
+            self.rate_lock = asyncio.Lock()
+        self.workers = [worker for worker in self.workers if not worker.done()]
+        for index in range(len(self.workers), self.worker_count):
+            self.workers.append(asyncio.create_task(self._worker(), name=f"dm_outbox:{index}"))
+
+    def send(self, user, embed, kind):
+        """Queue a DM; returns False if it was deduplicated, suppressed or dropped"""
+        if self.queue is None:
+            self.start()
+
+        if user.id in self.closed:
+            self.metrics['skipped_closed'] += 1
+            return False
+
+        key = (user.id, kind)
+        if key in self.recent:
+            self.metrics['deduplicated'] += 1
+            return False
+
+        try:
+            self.queue.put_nowait((user, embed, kind))
+        except asyncio.QueueFull:
+            self.metrics['dropped_full'] += 1
+            logger.warning(f"DM outbox full - dropped {kind} DM to {user.name}")
+            return False
+
+        self.recent.add(key)
+        self.metrics['queued'] += 1
+        self.max_depth = max(self.max_depth, self.queue.qsize())
+        return True
+
+    async def _take_token(self):
+        async with self.rate_lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.tokens_updated) * self.rate)
+                self.tokens_updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    async def _worker(self):
+        while True:
+            user, embed, kind = await self.queue.get()
+            try:
+                if user.id in self.closed:
+                    self.metrics['skipped_closed'] += 1
+                    continue
+                await self._take_token()
+                await user.send(embed=embed)
+                self.metrics['sent'] += 1
+                logger.info(f"Sent {kind} DM to {user.name}")
+            except discord.Forbidden:
+                self.closed.add(user.id)
+                self.metrics['forbidden'] += 1
+                logger.warning(f"Could not send DM to {user.name} - DMs disabled")
+            except discord.HTTPException as e:
+                self.metrics['failed'] += 1
+                logger.error(f"Error sending {kind} DM to {user.name}: {e}")
+            finally:
+                self.queue.task_done()
+
+    def snapshot(self):
+        """Delivery counters and queue depth"""
+        return {
+            **self.metrics,
+            'depth': self.queue.qsize() if self.queue else 0,
+            'max_depth': self.max_depth,
+            'capacity': self.max_queue,
+            'closed_cached': len(self.closed)
+        }
+
+
+# Shared outbox for welcome and confirmation DMs
+outbox = DMOutbox()
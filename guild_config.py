@@ -0,0 +1,109 @@
+import json
+import os
+from collections import OrderedDict
+from utils import logger
+from config import DATA_DIR, ROLES, CATEGORIES, CHANNELS, GUILD_CONFIG_CACHE_SIZE
+from content import name_problem
+
+SECTIONS = ('roles', 'categories', 'channels')
+
+
+class GuildConfig:
+    """Role, category and channel names for one guild: defaults from config.py plus its overrides"""
+
+    def __init__(self, guild_id, overrides=None):
+        self.guild_id = guild_id
+        self.overrides = overrides or {}
+        self.roles = {**ROLES, **self.overrides.get('roles', {})}
+        self.categories = {**CATEGORIES, **self.overrides.get('categories', {})}
+        self.channels = {**CHANNELS, **self.overrides.get('channels', {})}
+
+    def section(self, name):
+        return getattr(self, name)
+
+
+class GuildConfigStore:
+    """Per-guild configuration, loaded lazily from ``<directory>/<guild id>.json``
+
+    Configs are cached in an LRU of ``cache_size`` guilds, so hundreds of
+    guilds cost one small file read each on first use and nothing afterwards.
+    Writing an override saves the file atomically and invalidates the entry.
+    """
+
+    def __init__(self, directory, cache_size=GUILD_CONFIG_CACHE_SIZE):
+        self.directory = directory
+        self.cache_size = cache_size
+        self.cache = OrderedDict()  # guild id -> GuildConfig
+
+    def path_for(self, guild_id):
+        return os.path.join(self.directory, f"{guild_id}.json")
+
+    def get(self, guild_id):
+        """Config for a guild (cached)"""
+        config = self.cache.get(guild_id)
+        if config is not None:
+            self.cache.move_to_end(guild_id)
+            return config
+
+        config = GuildConfig(guild_id, self._load(guild_id))
+        self.cache[guild_id] = config
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return config
+
+    def invalidate(self, guild_id=None):
+        """Drop one guild (or every guild) from the cache so the next read reloads it"""
+        if guild_id is None:
+            self.cache.clear()
+        else:
+            self.cache.pop(guild_id, None)
+
+    def _load(self, guild_id):
+        path = self.path_for(guild_id)
+        if not os.path.exists(path):
+            return {}
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                overrides = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"Could not load config for guild {guild_id}, using defaults: {e}")
+            return {}
+        return {section: overrides[section] for section in SECTIONS if isinstance(overrides.get(section), dict)}
+
+    def _save(self, guild_id, overrides):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path_for(guild_id)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(overrides, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+        self.invalidate(guild_id)
+
+    def set_override(self, guild_id, section, key, value):
+        """Override one name for a guild"""
+        if section not in SECTIONS:
+            raise ValueError(f"Unknown section: {section}")
+        defaults = GuildConfig(guild_id).section(section)
+        if key not in defaults:
+            raise KeyError(key)
+        problem = name_problem(value, defaults[key])
+        if problem:
+            raise ValueError(problem)
+        overrides = self._load(guild_id)
+        overrides.setdefault(section, {})[key] = value
+        self._save(guild_id, overrides)
+
+    def clear_override(self, guild_id, section, key):
+        """Return one name to its default; returns True if an override existed"""
+        overrides = self._load(guild_id)
+        if key not in overrides.get(section, {}):
+            return False
+        del overrides[section][key]
+        if not overrides[section]:
+            del overrides[section]
+        self._save(guild_id, overrides)
+        return True
+
+
+# Shared store used wherever role/channel names are looked up
+guild_configs = GuildConfigStore(os.path.join(DATA_DIR, 'guilds'))
@@ -0,0 +1,340 @@
+import asyncio
+import json
+import os
+import time
+import discord
+from utils import logger
+from config import DATA_DIR, RESTORE_CONCURRENCY
+
+SNAPSHOT_VERSION = 1
+
+
+def dump_overwrites(overwrites):
+    """Serialize a channel's overwrites, keyed by the (old) target id"""
+    result = []
+    for target, overwrite in overwrites.items():
+        allow, deny = overwrite.pair()
+        result.append({
+            'id': target.id,
+            'type': 'role' if isinstance(target, discord.Role) else 'member',
+            'allow': allow.value,
+            'deny': deny.value
+        })
+    return result
+
+
+def capture(guild, panel_entries=()):
+    """Serialize a guild's structure from the cache (no API calls)"""
+    roles = [
+        {
+            'id': role.id,
+            'name': role.name,
+            'permissions': role.permissions.value,
+            'color': role.color.value,
+            'hoist': role.hoist,
+            'mentionable': role.mentionable,
+            'position': role.position,
+            'managed': role.managed
+        }
+        for role in guild.roles if not role.is_default()
+    ]
+    categories = [
+        {
+            'id': category.id,
+            'name': category.name,
+            'position': category.position,
+            'overwrites': dump_overwrites(category.overwrites)
+        }
+        for category in guild.categories
+    ]
+    channels = []
+    for channel in guild.channels:
+        if isinstance(channel, discord.TextChannel):
+            entry = {'type': 'text', 'topic': channel.topic, 'slowmode_delay': channel.slowmode_delay, 'nsfw': channel.nsfw}
+        elif isinstance(channel, discord.VoiceChannel):
+            entry = {'type': 'voice', 'bitrate': channel.bitrate, 'user_limit': channel.user_limit}
+        else:
+            continue  # categories above; stage/forum channels are not part of our layout
+        entry.update({
+            'id': channel.id,
+            'name': channel.name,
+            'position': channel.position,
+            'category_id': channel.category_id,
+            'overwrites': dump_overwrites(channel.overwrites)
+        })
+        channels.append(entry)
+
+    return {
+        'version': SNAPSHOT_VERSION,
+        'guild_id': guild.id,
+        'guild_name': guild.name,
+        'created_at': time.time(),
+        'everyone_permissions': guild.default_role.permissions.value,
+        'everyone_id': guild.default_role.id,
+        'roles': roles,
+        'categories': categories,
+        'channels': channels,
+        'panels': [
+            {'channel_id': entry['channel_id'], 'key': entry['key'], 'values': entry['values']}
+            for entry in panel_entries
+        ]
+    }
+
+
+class RestoreResult:
+    """Counts and timing of one restore"""
+
+    def __init__(self):
+        self.created = {'roles': 0, 'categories': 0, 'channels': 0, 'panels': 0}
+        self.reused = {'roles': 0, 'categories': 0, 'channels': 0}
+        self.failed = 0
+        self.id_map = {}  # old id -> new id
+        # Restored objects by old id; objects returned by create calls only reach
+        # the guild cache when their gateway event arrives, so never look them up there
+        self.roles = {}
+        self.categories = {}
+        self.channels = {}
+        self.new_channels = set()  # ids of channels this restore created
+        self.elapsed = 0.0
+
+
+class SnapshotStore:
+    """Versioned guild structure snapshots and the engine that restores them
+
+    Snapshots are JSON files under ``<directory>/<guild id>/``. A restore
+    recreates the structure in three waves - roles, then categories, then
+    channels - each wave running its creates in parallel (bounded by
+    ``concurrency``; discord.py queues anything over a rate limit bucket).
+    Overwrites, topics and positions are passed in the create call itself,
+    so every channel costs one request instead of one per overwrite. Objects
+    that already exist by name are reused, which makes a restore safe to
+    repeat after a partial failure.
+    """
+
+    def __init__(self, directory, concurrency=RESTORE_CONCURRENCY):
+        self.directory = directory
+        self.concurrency = concurrency
+
+    def _guild_dir(self, guild_id):
+        return os.path.join(self.directory, str(guild_id))
+
+    # Files
+
+    async def save(self, guild, panel_entries=()):
+        """Snapshot a guild; returns (file name, snapshot)"""
+        snapshot = capture(guild, panel_entries)
+        name = time.strftime('%Y%m%d-%H%M%S', time.gmtime(snapshot['created_at'])) + '.json'
+        await asyncio.to_thread(self._write, self._guild_dir(guild.id), name, snapshot)
+        logger.info(
+            f"Snapshot {name} of {guild.name}: {len(snapshot['roles'])} roles, "
+            f"{len(snapshot['categories'])} categories, {len(snapshot['channels'])} channels"
+        )
+        return name, snapshot
+
+    @staticmethod
+    def _write(directory, name, snapshot):
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, name)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def list(self, guild_id):
+        """Snapshot file names for a guild, newest first"""
+        directory = self._guild_dir(guild_id)
+        if not os.path.isdir(directory):
+            return []
+        return sorted((name for name in os.listdir(directory) if name.endswith('.json')), reverse=True)
+
+    def load(self, guild_id, name=None):
+        """Read a snapshot (the newest if no name is given)"""
+        names = self.list(guild_id)
+        if name is None:
+            if not names:
+                raise FileNotFoundError(f"No snapshots for guild {guild_id}")
+            name = names[0]
+        elif name not in names:
+            raise FileNotFoundError(name)
+        with open(os.path.join(self._guild_dir(guild_id), name), 'r', encoding='utf-8') as f:
+            snapshot = json.load(f)
+        if snapshot.get('version') != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported snapshot version: {snapshot.get('version')}")
+        return name, snapshot
+
+    # Restore
+
+    async def restore(self, guild, snapshot, post_panel=None):
+        """Recreate a snapshot in ``guild``
+
+        ``post_panel(channel, key, values)`` reposts each recorded panel in its
+        restored channel (the caller owns the views).
+        """
+        started = time.monotonic()
+        result = RestoreResult()
+        result.id_map[snapshot['everyone_id']] = guild.default_role.id
+        result.roles[snapshot['everyone_id']] = guild.default_role
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def limited(coro):
+            async with semaphore:
+                return await coro
+
+        await self._restore_roles(guild, snapshot, result, limited)
+        await self._restore_categories(guild, snapshot, result, limited)
+        await self._restore_channels(guild, snapshot, result, limited)
+
+        if post_panel:
+            await asyncio.gather(*(
+                limited(self._restore_panel(guild, panel, result, post_panel)) for panel in snapshot['panels']
+            ))
+
+        result.elapsed = time.monotonic() - started
+        logger.info(
+            f"Restored snapshot into {guild.name} in {result.elapsed:.1f}s: created {result.created}, "
+            f"reused {result.reused}, {result.failed} failed"
+        )
+        return result
+
+    async def _restore_roles(self, guild, snapshot, result, limited):
+        if guild.default_role.permissions.value != snapshot['everyone_permissions']:
+            try:
+                await guild.default_role.edit(permissions=discord.Permissions(snapshot['everyone_permissions']))
+            except discord.HTTPException as e:
+                logger.error(f"Could not restore @everyone permissions: {e}")
+
+        existing = {role.name: role for role in guild.roles}
+
+        async def create(entry):
+            role = existing.get(entry['name'])
+            if role is not None:
+                result.reused['roles'] += 1
+            elif entry['managed']:
+                return None  # integration roles come back with their integration
+            else:
+                try:
+                    role = await guild.create_role(
+                        name=entry['name'],
+                        permissions=discord.Permissions(entry['permissions']),
+                        color=discord.Color(entry['color']),
+                        hoist=entry['hoist'],
+                        mentionable=entry['mentionable'],
+                        reason="Restore from snapshot"
+                    )
+                except discord.HTTPException as e:
+                    logger.error(f"Could not restore role {entry['name']}: {e}")
+                    result.failed += 1
+                    return None
+                result.created['roles'] += 1
+            result.id_map[entry['id']] = role.id
+            result.roles[entry['id']] = role
+            return role
+
+        entries = snapshot['roles']
+        roles = await asyncio.gather(*(limited(create(entry)) for entry in entries))
+
+        # One bulk request puts every restored role back in its snapshot order,
+        # limited to roles below the bot's own top role (the only ones it may move)
+        top = guild.me.top_role.position
+        ordered = sorted(
+            ((role, entry['position']) for role, entry in zip(roles, entries) if role and role.position < top),
+            key=lambda pair: pair[1]
+        )
+        positions = {role: index for index, (role, _) in enumerate(ordered, start=1) if index < top}
+        if positions:
+            try:
+                await guild.edit_role_positions(positions=positions, reason="Restore from snapshot")
+            except discord.HTTPException as e:
+                logger.warning(f"Could not restore role order: {e}")
+
+    def _overwrites(self, guild, entries, result):
+        """Rebuild overwrites against the restored roles; unknown targets are dropped"""
+        overwrites = {}
+        for entry in entries:
+            if entry['type'] == 'role':
+                target = result.roles.get(entry['id'])
+            else:
+                target = guild.get_member(entry['id'])
+            if target is None:
+                continue
+            overwrites[target] = discord.PermissionOverwrite.from_pair(
+                discord.Permissions(entry['allow']), discord.Permissions(entry['deny'])
+            )
+        return overwrites
+
+    async def _restore_categories(self, guild, snapshot, result, limited):
+        existing = {category.name: category for category in guild.categories}
+
+        async def create(entry):
+            category = existing.get(entry['name'])
+            if category is not None:
+                result.reused['categories'] += 1
+            else:
+                try:
+                    category = await guild.create_category(
+                        entry['name'],
+                        overwrites=self._overwrites(guild, entry['overwrites'], result),
+                        position=entry['position'],
+                        reason="Restore from snapshot"
+                    )
+                except discord.HTTPException as e:
+                    logger.error(f"Could not restore category {entry['name']}: {e}")
+                    result.failed += 1
+                    return
+                result.created['categories'] += 1
+            result.id_map[entry['id']] = category.id
+            result.categories[entry['id']] = category
+
+        await asyncio.gather(*(limited(create(entry)) for entry in snapshot['categories']))
+
+    async def _restore_channels(self, guild, snapshot, result, limited):
+        existing = {(channel.name, channel.category_id): channel for channel in guild.channels}
+
+        async def create(entry):
+            category = result.categories.get(entry['category_id']) if entry['category_id'] else None
+            channel = existing.get((entry['name'], category.id if category else None))
+            if channel is not None:
+                result.reused['channels'] += 1
+            else:
+                options = {
+                    'category': category,
+                    'position': entry['position'],
+                    'overwrites': self._overwrites(guild, entry['overwrites'], result),
+                    'reason': "Restore from snapshot"
+                }
+                try:
+                    if entry['type'] == 'voice':
+                        channel = await guild.create_voice_channel(
+                            entry['name'], bitrate=min(entry['bitrate'], int(guild.bitrate_limit)),
+                            user_limit=entry['user_limit'], **options
+                        )
+                    else:
+                        channel = await guild.create_text_channel(
+                            entry['name'], topic=entry['topic'], slowmode_delay=entry['slowmode_delay'],
+                            nsfw=entry['nsfw'], **options
+                        )
+                except discord.HTTPException as e:
+                    logger.error(f"Could not restore channel {entry['name']}: {e}")
+                    result.failed += 1
+                    return
+                result.created['channels'] += 1
+                result.new_channels.add(channel.id)
+            result.id_map[entry['id']] = channel.id
+            result.channels[entry['id']] = channel
+
+        await asyncio.gather(*(limited(create(entry)) for entry in snapshot['channels']))
+
+    async def _restore_panel(self, guild, panel, result, post_panel):
+        channel = result.channels.get(panel['channel_id'])
+        if channel is None or channel.id not in result.new_channels:
+            return  # reused channels still have their panels
+        try:
+            await post_panel(channel, panel['key'], panel['values'])
+            result.created['panels'] += 1
+        except discord.HTTPException as e:
+            logger.error(f"Could not repost panel {panel['key']} in {channel.name}: {e}")
+            result.failed += 1
+
+
+# Shared snapshot store
+snapshots = SnapshotStore(os.path.join(DATA_DIR, 'snapshots'))
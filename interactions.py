@@ -0,0 +1,146 @@
+import discord
+import asyncio
+from collections import deque
+from datetime import datetime, timezone
+from utils import create_embed, logger
+from config import COLORS
+import traceback
+
+
+class InteractionMetrics:
+    """Rolling ack and completion latency samples per interaction kind"""
+
+    def __init__(self, window=500):
+        self.window = window
+        self.samples = {}  # kind -> {'ack': deque, 'complete': deque}
+        self.failures = {}  # kind -> count of interactions we failed to acknowledge
+
+    def record(self, kind, stage, seconds):
+        """Record a latency sample (seconds) for an interaction stage"""
+        stages = self.samples.setdefault(kind, {
+            'ack': deque(maxlen=self.window),
+            'complete': deque(maxlen=self.window)
+        })
+        stages[stage].append(max(seconds, 0.0))
+
+    def record_failure(self, kind):
+        """Count an interaction that could not be acknowledged in time"""
+        self.failures[kind] = self.failures.get(kind, 0) + 1
+
+    @staticmethod
+    def _percentile(values, pct):
+        if not values:
+            return None
+        ordered = sorted(values)
+        index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def summary(self):
+        """Return p50/p95/max in milliseconds for ack and completion per kind"""
+        result = {}
+        # Kinds that only ever failed have no samples but must still be listed
+        for kind in {**self.samples, **self.failures}:
+            stages = self.samples.get(kind, {'ack': (), 'complete': ()})
+            kind_stats = {'failures': self.failures.get(kind, 0)}
+            for stage, values in stages.items():
+                kind_stats[f'{stage}_count'] = len(values)
+                for label, pct in (('p50', 50), ('p95', 95), ('max', 100)):
+                    value = self._percentile(values, pct)
+                    kind_stats[f'{stage}_{label}_ms'] = round(value * 1000, 1) if value is not None else None
+            result[kind] = kind_stats
+        return result
+
+
+class InteractionProgress:
+    """Edits the deferred original response as work progresses"""
+
+    def __init__(self, interaction):
+        self.interaction = interaction
+
+    async def update(self, embed):
+        """Replace the original response with a new embed"""
+        try:
+            await self.interaction.edit_original_response(embed=embed)
+        except discord.HTTPException as e:
+            logger.warning(f"Could not update interaction response: {e}")
+
+
+class InteractionPipeline:
+    """Ack-first interaction handling: defer immediately, finish the work in tracked background tasks"""
+
+    def __init__(self):
+        self.tasks = set()
+        self.metrics = InteractionMetrics()
+
+    @staticmethod
+    def _age(interaction):
+        """Seconds since Discord created the interaction (includes gateway and loop delay)"""
+        return (datetime.now(timezone.utc) - interaction.created_at).total_seconds()
+
+    def spawn(self, coro, name=None):
+        """Run a coroutine as a tracked background task"""
+        task = asyncio.create_task(coro, name=name)
+        self.tasks.add(task)
+        task.add_done_callback(self._task_done)
+        return task
+
+    def _task_done(self, task):
+        self.tasks.discard(task)
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error:
+            logger.error(f"Background task {task.get_name()} failed: {error}")
+            traceback.print_exception(type(error), error, error.__traceback__)
+
+    async def run(self, interaction, kind, work, ephemeral=True, error_embed=None):
+        """Defer the interaction, then run ``work(progress)`` in the background
+
+        ``work`` is an async callable receiving an :class:`InteractionProgress`.
+        Returns the background task, or None if the interaction could not be acknowledged.
+        """
+        try:
+            await interaction.response.defer(ephemeral=ephemeral, thinking=True)
+        except discord.HTTPException as e:
+            # Token already expired or interaction acknowledged elsewhere
+            logger.error(f"Failed to acknowledge {kind} interaction after {self._age(interaction):.2f}s: {e}")
+            self.metrics.record_failure(kind)
+            return None
+
+        ack_latency = self._age(interaction)
+        self.metrics.record(kind, 'ack', ack_latency)
+        if ack_latency > 2.0:
+            logger.warning(f"Slow ack for {kind} interaction: {ack_latency:.2f}s")
+
+        progress = InteractionProgress(interaction)
+        return self.spawn(
+            self._complete(interaction, kind, work, progress, error_embed),
+            name=f"interaction:{kind}:{interaction.id}"
+        )
+
+    async def _complete(self, interaction, kind, work, progress, error_embed):
+        try:
+            await work(progress)
+        except Exception as e:
+            logger.error(f"Error completing {kind} interaction: {e}")
+            traceback.print_exc()
+            embed = error_embed(e) if error_embed else create_embed(
+                "❌ Error",
+                "Something went wrong. Please try again or contact an administrator.",
+                color=COLORS['error']
+            )
+            await progress.update(embed)
+        finally:
+            self.metrics.record(kind, 'complete', self._age(interaction))
+
+    async def drain(self, timeout=10):
+        """Wait for outstanding background work, cancelling anything still running after timeout"""
+        if not self.tasks:
+            return
+        done, pending = await asyncio.wait(list(self.tasks), timeout=timeout)
+        for task in pending:
+            task.cancel()
+
+
+# Shared pipeline used by every view
+pipeline = InteractionPipeline()
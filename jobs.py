@@ -0,0 +1,183 @@
+import asyncio
+import json
+import os
+import time
+import traceback
+from collections import deque
+from utils import logger
+from config import DATA_DIR, JOB_PROGRESS_SECONDS, JOB_HISTORY_SIZE
+
+
+class JobBusy(Exception):
+    """Raised when a guild already has a job running"""
+
+    def __init__(self, job):
+        super().__init__(f"Job #{job.id} ({job.name}) is already running")
+        self.job = job
+
+
+class Job:
+    """One long-running admin operation and its progress"""
+
+    def __init__(self, job_id, guild_id, name, user_id=None):
+        self.id = job_id
+        self.guild_id = guild_id
+        self.name = name
+        self.user_id = user_id
+        self.status = 'queued'  # queued, running, done, failed, cancelled
+        self.phase = None
+        self.done = 0
+        self.total = None
+        self.version = 0  # bumped on every progress change
+        self.started_at = time.time()
+        self.finished_at = None
+        self.error = None
+        self.result = None  # whatever the work coroutine returned
+        self.message = None  # progress message, set by the caller
+        self.task = None
+
+    def set_phase(self, phase, total=None):
+        self.phase = phase
+        self.done = 0
+        self.total = total
+        self.version += 1
+
+    def advance(self, amount=1):
+        self.done += amount
+        self.version += 1
+
+    def duration(self):
+        return (self.finished_at or time.time()) - self.started_at
+
+    def to_record(self):
+        return {
+            'id': self.id,
+            'guild_id': self.guild_id,
+            'name': self.name,
+            'user_id': self.user_id,
+            'status': self.status,
+            'started_at': self.started_at,
+            'duration': round(self.duration(), 2),
+            'error': self.error
+        }
+
+
+class JobRunner:
+    """Background runner for admin operations, at most one job per guild
+
+    ``start`` refuses a second job while one is running in the same guild, so
+    two setup operations can never interleave. Listeners are awaited with the
+    job when its progress changes - at most once per ``progress_interval`` -
+    and once more when it finishes. Finished jobs are appended to a bounded
+    history file with their durations.
+    """
+
+    def __init__(self, path, history_size=JOB_HISTORY_SIZE, progress_interval=JOB_PROGRESS_SECONDS):
+        self.path = path
+        self.progress_interval = progress_interval
+        self.active = {}  # guild id -> running job (the per-guild lock)
+        self.history = deque(maxlen=history_size)
+        self.listeners = []
+        self.next_id = 1
+        self.load()
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def running(self, guild_id):
+        return self.active.get(guild_id)
+
+    def start(self, guild_id, name, work, user_id=None):
+        """Run ``work(job)`` in the background; raises JobBusy if the guild is busy"""
+        running = self.active.get(guild_id)
+        if running:
+            raise JobBusy(running)
+        job = Job(self.next_id, guild_id, name, user_id)
+        self.next_id += 1
+        self.active[guild_id] = job
+        job.task = asyncio.create_task(self._run(job, work), name=f"job:{job.id}:{name}")
+        return job
+
+    def cancel(self, guild_id, job_id=None):
+        """Cancel the guild's running job (optionally only if it has the given id)"""
+        job = self.active.get(guild_id)
+        if not job or (job_id is not None and job.id != job_id):
+            return None
+        job.task.cancel()
+        return job
+
+    async def _run(self, job, work):
+        job.status = 'running'
+        reporter = asyncio.create_task(self._report_loop(job), name=f"job:{job.id}:progress")
+        try:
+            job.result = await work(job)
+            job.status = 'done'
+        except asyncio.CancelledError:
+            job.status = 'cancelled'
+        except Exception as e:
+            job.status = 'failed'
+            job.error = str(e)
+            logger.error(f"Job #{job.id} ({job.name}) failed: {e}")
+            traceback.print_exc()
+        finally:
+            job.finished_at = time.time()
+            reporter.cancel()
+            self.active.pop(job.guild_id, None)
+            self.history.append(job.to_record())
+            self.save()
+            logger.info(f"Job #{job.id} ({job.name}) {job.status} after {job.duration():.1f}s")
+            await self._notify(job)
+
+    async def _report_loop(self, job):
+        shown = None
+        while True:
+            if job.version != shown:
+                shown = job.version
+                await self._notify(job)
+            await asyncio.sleep(self.progress_interval)
+
+    async def _notify(self, job):
+        for listener in self.listeners:
+            try:
+                await listener(job)
+            except Exception as e:
+                logger.warning(f"Job listener failed for #{job.id}: {e}")
+
+    # History
+
+    def recent(self, guild_id, limit=10):
+        """Newest finished jobs for a guild"""
+        return [record for record in reversed(self.history) if record['guild_id'] == guild_id][:limit]
+
+    def durations(self, guild_id=None):
+        """Operation name -> (runs, average seconds, max seconds) for completed jobs"""
+        runs = {}
+        for record in self.history:
+            if record['status'] == 'done' and (guild_id is None or record['guild_id'] == guild_id):
+                runs.setdefault(record['name'], []).append(record['duration'])
+        return {name: (len(values), sum(values) / len(values), max(values)) for name, values in runs.items()}
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.history.extend(json.load(f))
+        except (OSError, ValueError) as e:
+            logger.error(f"Could not load job history from {self.path}: {e}")
+        if self.history:
+            self.next_id = max(record['id'] for record in self.history) + 1
+
+    def save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(list(self.history), f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.error(f"Could not persist job history: {e}")
+
+
+# Shared runner for !fresh, !setup, !cleanup and the other long admin operations
+jobs = JobRunner(os.path.join(DATA_DIR, 'jobs.json'))
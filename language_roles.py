@@ -0,0 +1,356 @@
+import discord
+import asyncio
+import json
+import os
+import time
+from utils import logger
+from guild_config import guild_configs
+from raid_guard import raid_guard
+from config import (
+    DATA_DIR, LOCALE_LANGUAGES, ROLE_JOB_CONCURRENCY, ROLE_JOB_CHUNK_SIZE,
+    ONBOARDING_NAME_HEURISTIC, ONBOARDING_BATCH_SECONDS
+)
+import traceback
+
+LANGUAGE_KEYS = ('english', 'russian')
+
+
+def get_language_roles(guild):
+    """Map of language key -> role for the language roles that exist in a guild"""
+    names = guild_configs.get(guild.id).roles
+    roles = {}
+    for language in LANGUAGE_KEYS:
+        role = discord.utils.get(guild.roles, name=names[language])
+        if role:
+            roles[language] = role
+    return roles
+
+
+def language_for_locale(locale):
+    """Language key for a Discord locale (``ru``, ``en-US``, ...), None if unmapped"""
+    if not locale:
+        return None
+    locale = str(locale)
+    return LOCALE_LANGUAGES.get(locale) or LOCALE_LANGUAGES.get(locale.split('-')[0])
+
+
+def final_role_set(member, target_role, language_roles):
+    """The member's complete role list after switching to ``target_role``, computed locally"""
+    language_role_ids = {role.id for role in language_roles}
+    roles = [role for role in member.roles if not role.is_default() and role.id not in language_role_ids]
+    if target_role:
+        roles.append(target_role)
+    return roles
+
+
+async def switch_language_role(member, target_role, language_roles, reason=None):
+    """Switch a member to one language role with a single member edit
+
+    Removing the old role and adding the new one happen in the same API call,
+    so a crash can never leave the member without a language role.
+    Returns False when the member already has exactly the target language role.
+    """
+    language_role_ids = {role.id for role in language_roles}
+    current = [role for role in member.roles if role.id in language_role_ids]
+    if current == [target_role]:
+        return False
+    await member.edit(roles=final_role_set(member, target_role, language_roles), reason=reason)
+    return True
+
+
+async def apply_language_roles(changes, language_roles, concurrency, reason):
+    """Apply (member, target role) switches with bounded concurrency; returns (changed, unchanged, failed)"""
+    semaphore = asyncio.Semaphore(concurrency)
+    language_roles = list(language_roles)
+    results = {'changed': 0, 'unchanged': 0, 'failed': 0}
+
+    async def apply(member, target):
+        async with semaphore:
+            try:
+                if await switch_language_role(member, target, language_roles, reason=reason):
+                    results['changed'] += 1
+                else:
+                    results['unchanged'] += 1
+            except discord.HTTPException as e:
+                results['failed'] += 1
+                logger.warning(f"Could not update language role for {member.name}: {e}")
+
+    await asyncio.gather(*(apply(member, target) for member, target in changes))
+    return results['changed'], results['unchanged'], results['failed']
+
+
+def detect_member_language(member, locales):
+    """Best-effort language for a member who has never picked one
+
+    Uses the client locale recorded from the member's interactions first, then
+    (if enabled) Cyrillic script in their names. Returns (language, source) or (None, None).
+    """
+    language = language_for_locale(locales.get(member.id))
+    if language:
+        return language, 'locale'
+    if ONBOARDING_NAME_HEURISTIC:
+        names = ' '.join(filter(None, (member.name, getattr(member, 'global_name', None), member.display_name)))
+        if any('\u0400' <= char <= '\u04ff' for char in names):
+            return 'russian', 'name'
+    return None, None
+
+
+class LocaleStore:
+    """Last client locale seen for each user, persisted so bulk jobs can use it"""
+
+    def __init__(self, path, save_interval=60):
+        self.path = path
+        self.save_interval = save_interval
+        self.locales = {}  # user id -> locale string
+        self.dirty = False
+        self.last_save = 0.0
+        self.load()
+
+    def observe(self, user_id, locale):
+        """Record the locale from an interaction"""
+        locale = str(locale) if locale else None
+        if not locale or self.locales.get(user_id) == locale:
+            return
+        self.locales[user_id] = locale
+        self.dirty = True
+        if time.time() - self.last_save >= self.save_interval:
+            self.save()
+
+    def get(self, user_id):
+        return self.locales.get(user_id)
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.locales = {int(user_id): locale for user_id, locale in json.load(f).items()}
+        except (OSError, ValueError) as e:
+            logger.error(f"Could not load locales from {self.path}: {e}")
+
+    def save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.locales, f)
+            os.replace(tmp_path, self.path)
+            self.dirty = False
+            self.last_save = time.time()
+        except OSError as e:
+            logger.error(f"Could not persist locales: {e}")
+
+
+class LanguageRoleJob:
+    """Guild-wide language role assignment/migration with bounded concurrency and checkpoints
+
+    Modes:
+    - ``locale``: give members the role matching their last seen client locale
+    - ``missing:<language>``: give members without any language role the given language
+    - ``migrate:<from>:<to>``: move everyone with one language role to another
+
+    Members are processed in id order, one chunk at a time. After each chunk
+    the highest finished member id is checkpointed, so a restarted job skips
+    everything already done.
+    """
+
+    def __init__(self, guild, mode, checkpoint_dir, concurrency=ROLE_JOB_CONCURRENCY, chunk_size=ROLE_JOB_CHUNK_SIZE):
+        self.guild = guild
+        self.mode = mode
+        self.concurrency = concurrency
+        self.chunk_size = chunk_size
+        self.checkpoint_path = os.path.join(checkpoint_dir, f"{guild.id}.json")
+        self.state = {
+            'mode': mode,
+            'last_member_id': 0,
+            'processed': 0,
+            'changed': 0,
+            'skipped': 0,
+            'failed': 0,
+            'total': 0,
+            'started_at': time.time(),
+            'finished_at': None
+        }
+
+    @classmethod
+    def resume(cls, guild, checkpoint_dir):
+        """Rebuild an unfinished job from its checkpoint, None if there is nothing to resume"""
+        path = os.path.join(checkpoint_dir, f"{guild.id}.json")
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        if state.get('finished_at'):
+            return None
+        job = cls(guild, state['mode'], checkpoint_dir)
+        job.state = state
+        return job
+
+    def save_checkpoint(self):
+        os.makedirs(os.path.dirname(self.checkpoint_path), exist_ok=True)
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def target_for(self, member, language_roles, locales):
+        """Role the member should end up with, or None to leave them alone"""
+        held = [language for language, role in language_roles.items() if role in member.roles]
+        parts = self.mode.split(':')
+        if parts[0] == 'locale':
+            if held:
+                return None  # never undo a language picked in the panel; use migrate: for that
+            language = language_for_locale(locales.get(member.id))
+            return language_roles.get(language) if language else None
+        if parts[0] == 'missing':
+            return language_roles.get(parts[1]) if not held else None
+        if parts[0] == 'migrate':
+            return language_roles.get(parts[2]) if parts[1] in held else None
+        raise ValueError(f"Unknown language role job mode: {self.mode}")
+
+    async def run(self, locales, progress=None):
+        """Run (or continue) the job; ``progress`` is awaited with the state after each chunk"""
+        language_roles = get_language_roles(self.guild)
+        if not language_roles:
+            raise RuntimeError("Language roles not found")
+
+        members = sorted(
+            (member for member in self.guild.members if not member.bot and member.id > self.state['last_member_id']),
+            key=lambda member: member.id
+        )
+        self.state['total'] = self.state['processed'] + len(members)
+        self.save_checkpoint()
+        reason = f"Language role job ({self.mode})"
+
+        for start in range(0, len(members), self.chunk_size):
+            chunk = members[start:start + self.chunk_size]
+            changes = []
+            for member in chunk:
+                target = self.target_for(member, language_roles, locales)
+                if target is None:
+                    self.state['skipped'] += 1
+                else:
+                    changes.append((member, target))
+            changed, unchanged, failed = await apply_language_roles(
+                changes, language_roles.values(), self.concurrency, reason
+            )
+            self.state['changed'] += changed
+            self.state['skipped'] += unchanged
+            self.state['failed'] += failed
+            self.state['processed'] += len(chunk)
+            self.state['last_member_id'] = chunk[-1].id
+            self.save_checkpoint()
+            if progress:
+                await progress(self.state)
+
+        self.state['finished_at'] = time.time()
+        self.save_checkpoint()
+        logger.info(f"Language role job {self.mode} finished in {self.guild.name}: "
+                    f"{self.state['changed']} changed, {self.state['failed']} failed")
+        return self.state
+
+
+class LanguageRoleJobs:
+    """At most one running language role job per guild"""
+
+    def __init__(self, checkpoint_dir):
+        self.checkpoint_dir = checkpoint_dir
+        self.running = {}  # guild id -> (job, task)
+
+    def is_running(self, guild_id):
+        entry = self.running.get(guild_id)
+        return bool(entry and not entry[1].done())
+
+    def start(self, job, locales, progress=None):
+        """Run a job in the background; returns its task"""
+        async def runner():
+            try:
+                return await job.run(locales, progress)
+            except Exception as e:
+                logger.error(f"Language role job failed in {job.guild.name}: {e}")
+                traceback.print_exc()
+                raise
+
+        task = asyncio.create_task(runner(), name=f"language_roles:{job.guild.id}")
+        self.running[job.guild.id] = (job, task)
+        return task
+
+    def get(self, guild_id):
+        entry = self.running.get(guild_id)
+        return entry[0] if entry else None
+
+    def cancel(self, guild_id):
+        """Cancel the running job (its checkpoint stays, so it can be resumed)"""
+        entry = self.running.get(guild_id)
+        if entry and not entry[1].done():
+            entry[1].cancel()
+            return True
+        return False
+
+
+class OnboardingRoleBatcher:
+    """Collects language roles auto-assigned on join and applies them in batches
+
+    Joins only enqueue; a single flusher applies everything pending every
+    ``interval`` seconds through the same bounded-concurrency path as bulk jobs,
+    so a join wave turns into a steady trickle of member edits. Roles still
+    pending when a guild goes into raid lockdown are dropped, like the joins
+    the lockdown suppresses.
+    """
+
+    def __init__(self, interval=ONBOARDING_BATCH_SECONDS, concurrency=ROLE_JOB_CONCURRENCY):
+        self.interval = interval
+        self.concurrency = concurrency
+        self.pending = {}  # guild id -> {member id: (member, language)}
+        self.flusher = None
+        self.metrics = {'queued': 0, 'changed': 0, 'unchanged': 0, 'failed': 0, 'suppressed': 0, 'batches': 0}
+
+    def add(self, member, language):
+        """Queue a language role for a member"""
+        self.pending.setdefault(member.guild.id, {})[member.id] = (member, language)
+        self.metrics['queued'] += 1
+        if self.flusher is None or self.flusher.done():
+            self.flusher = asyncio.create_task(self._flush_loop(), name="onboarding_roles")
+
+    def depth(self):
+        return sum(len(members) for members in self.pending.values())
+
+    async def _flush_loop(self):
+        while self.pending:
+            await asyncio.sleep(self.interval)
+            batches, self.pending = self.pending, {}
+            for guild_id, members in batches.items():
+                try:
+                    await self._flush_guild(list(members.values()))
+                except Exception as e:
+                    logger.error(f"Error applying onboarding roles in guild {guild_id}: {e}")
+                    traceback.print_exc()
+
+    async def _flush_guild(self, entries):
+        guild = entries[0][0].guild
+        if raid_guard.is_locked(guild.id):
+            for _ in entries:
+                raid_guard.note_suppressed(guild.id)
+            self.metrics['suppressed'] += len(entries)
+            logger.info(f"Dropped {len(entries)} onboarding language roles in {guild.name} (lockdown)")
+            return
+        language_roles = get_language_roles(guild)
+        changes = [
+            (member, language_roles[language])
+            for member, language in entries
+            if language in language_roles and guild.get_member(member.id)
+        ]
+        changed, unchanged, failed = await apply_language_roles(
+            changes, language_roles.values(), self.concurrency, "Automatic language from locale"
+        )
+        self.metrics['batches'] += 1
+        self.metrics['changed'] += changed
+        self.metrics['unchanged'] += unchanged
+        self.metrics['failed'] += failed
+        logger.info(f"Applied onboarding language roles in {guild.name}: {changed} changed, {failed} failed")
+
+
+# Shared locale cache and job registry
+locales = LocaleStore(os.path.join(DATA_DIR, 'locales.json'))
+role_jobs = LanguageRoleJobs(os.path.join(DATA_DIR, 'role_jobs'))
+onboarding_roles = OnboardingRoleBatcher()
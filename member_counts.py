@@ -0,0 +1,126 @@
+import time
+from utils import logger
+from config import ROLE_COUNT_RECONCILE_MINUTES
+
+
+class GuildCounts:
+    """Cached counts for one guild"""
+
+    def __init__(self):
+        self.roles = {}  # role id -> member count
+        self.total = None
+        self.online = None
+        self.updated_at = None  # last change applied (event or reconcile)
+        self.reconciled_at = None
+        self.sampled_at = None  # last total/online sample
+
+
+class MemberCountCache:
+    """Role population and member counts kept current from gateway events
+
+    ``role.members`` scans every guild member, so counting several roles per
+    ``!stats`` call is O(members) each time. Here join/leave/update events adjust
+    per-role counters in O(roles changed), and a periodic reconcile recounts all
+    roles in a single pass to correct any drift (missed events, reconnects).
+    Total/online counts are the latest ``update_stats`` sample.
+    """
+
+    def __init__(self, reconcile_interval=ROLE_COUNT_RECONCILE_MINUTES * 60):
+        self.reconcile_interval = reconcile_interval
+        self.guilds = {}  # guild id -> GuildCounts
+
+    def _counts(self, guild_id):
+        counts = self.guilds.get(guild_id)
+        if counts is None:
+            counts = self.guilds[guild_id] = GuildCounts()
+        return counts
+
+    def _adjust(self, guild_id, role_ids, amount):
+        counts = self._counts(guild_id)
+        if counts.reconciled_at is None:
+            return  # nothing to adjust until the first full count
+        for role_id in role_ids:
+            counts.roles[role_id] = max(counts.roles.get(role_id, 0) + amount, 0)
+        counts.updated_at = time.time()
+
+    # Events
+
+    def member_joined(self, member):
+        self._adjust(member.guild.id, [role.id for role in member.roles if not role.is_default()], 1)
+
+    def member_left(self, member):
+        self._adjust(member.guild.id, [role.id for role in member.roles if not role.is_default()], -1)
+
+    def member_updated(self, before, after):
+        before_ids = {role.id for role in before.roles}
+        after_ids = {role.id for role in after.roles}
+        if before_ids == after_ids:
+            return
+        guild_id = after.guild.id
+        self._adjust(guild_id, after_ids - before_ids, 1)
+        self._adjust(guild_id, before_ids - after_ids, -1)
+
+    def role_deleted(self, role):
+        counts = self.guilds.get(role.guild.id)
+        if counts:
+            counts.roles.pop(role.id, None)
+
+    def sample(self, guild_id, total, online):
+        """Store the member/online counts computed by the stats loop"""
+        counts = self._counts(guild_id)
+        counts.total = total
+        counts.online = online
+        counts.sampled_at = time.time()
+
+    # Reconcile
+
+    def needs_reconcile(self, guild_id):
+        counts = self.guilds.get(guild_id)
+        return not counts or counts.reconciled_at is None or \
+            time.time() - counts.reconciled_at >= self.reconcile_interval
+
+    def reconcile(self, guild):
+        """Recount every role in one pass over the member list; returns the number of roles that drifted"""
+        fresh = {}
+        for member in guild.members:
+            for role in member.roles:
+                if not role.is_default():
+                    fresh[role.id] = fresh.get(role.id, 0) + 1
+
+        counts = self._counts(guild.id)
+        drifted = 0
+        if counts.reconciled_at is not None:
+            drifted = sum(
+                1 for role_id in set(fresh) | set(counts.roles)
+                if fresh.get(role_id, 0) != counts.roles.get(role_id, 0)
+            )
+            if drifted:
+                logger.info(f"Role counts for {guild.name} drifted on {drifted} roles - corrected")
+        counts.roles = fresh
+        counts.reconciled_at = counts.updated_at = time.time()
+        return drifted
+
+    # Queries
+
+    def role_count(self, guild_id, role):
+        """Cached member count for a role (0 for a missing role)"""
+        counts = self.guilds.get(guild_id)
+        return counts.roles.get(role.id, 0) if counts and role else 0
+
+    def snapshot(self, guild_id):
+        """Counts plus their as-of timestamps, None until the guild has been counted"""
+        counts = self.guilds.get(guild_id)
+        if not counts or counts.reconciled_at is None:
+            return None
+        return {
+            'total': counts.total,
+            'online': counts.online,
+            'roles': dict(counts.roles),
+            'as_of': counts.updated_at,
+            'reconciled_at': counts.reconciled_at,
+            'sampled_at': counts.sampled_at
+        }
+
+
+# Shared counts read by !stats and !info
+member_counts = MemberCountCache()
@@ -0,0 +1,166 @@
+import gc
+import json
+import os
+import resource
+import time
+import tracemalloc
+from utils import logger
+from config import MEMORY_TRACE_FRAMES, MEMORY_TOP_SITES
+
+# Allocations made by the profiler itself are left out of the reports
+IGNORED_FILES = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<unknown>')
+)
+
+
+def rss_bytes():
+    """Current resident set size (peak RSS where /proc is not available)"""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def short_path(filename):
+    """Path relative to site-packages or the working directory"""
+    _, marker, rest = filename.rpartition('site-packages' + os.sep)
+    return rest if marker else os.path.relpath(filename)
+
+
+def live_objects(types):
+    """Number of live objects per class name (instances of subclasses included)"""
+    counts = dict.fromkeys(types, 0)
+    for obj in gc.get_objects():
+        for name, cls in types.items():
+            if isinstance(obj, cls):
+                counts[name] += 1
+    return counts
+
+
+class MemoryProfiler:
+    """On-demand tracemalloc snapshots, each diffed against the previous one
+
+    Tracing is off until ``start`` (it slows allocations down). Each
+    ``capture`` takes a snapshot and reports the allocation sites that grew
+    most since the last capture, together with RSS and the sizes of the
+    registered caches, so a steady climb can be pinned to a line of code or
+    a cache. Cache sizes are plain callables registered with ``counter``;
+    classes registered with ``count_type`` have their live instances counted
+    on the heap.
+    """
+
+    def __init__(self, frames=MEMORY_TRACE_FRAMES, top=MEMORY_TOP_SITES):
+        self.frames = frames
+        self.top = top
+        self.counters = {}  # name -> callable returning a count
+        self.types = {}  # name -> class whose live instances are counted
+        self.snapshot = None
+        self.counts = None
+        self.captured_at = None
+        self.started_at = None
+        self.last_report = None
+
+    def counter(self, name):
+        """Decorator registering a cache size function"""
+        def decorator(func):
+            self.counters[name] = func
+            return func
+        return decorator
+
+    def count_type(self, name, cls):
+        self.types[name] = cls
+
+    @property
+    def tracing(self):
+        return tracemalloc.is_tracing()
+
+    def start(self):
+        if not self.tracing:
+            tracemalloc.start(self.frames)
+            self.started_at = time.time()
+            self.snapshot = None
+            logger.info(f"Memory tracing started ({self.frames} frames)")
+
+    def stop(self):
+        if self.tracing:
+            tracemalloc.stop()
+            self.snapshot = None
+            logger.info("Memory tracing stopped")
+
+    def object_counts(self):
+        counts = {}
+        for name, func in self.counters.items():
+            try:
+                counts[name] = func()
+            except Exception as e:
+                logger.warning(f"Memory counter {name} failed: {e}")
+        counts.update(live_objects(self.types))
+        return counts
+
+    def capture(self):
+        """Build a report; with tracing on, also snapshot and diff allocation sites"""
+        now = time.time()
+        counts = self.object_counts()
+        report = {
+            'captured_at': now,
+            'since_previous_seconds': round(now - self.captured_at, 1) if self.captured_at else None,
+            'rss_mb': round(rss_bytes() / 2 ** 20, 1),
+            'tracing': self.tracing,
+            'counts': counts,
+            'count_changes': {
+                name: count - self.counts[name]
+                for name, count in counts.items()
+                if self.counts and name in self.counts and count != self.counts[name]
+            },
+            'sites': []
+        }
+        if self.tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            report['traced_mb'] = round(current / 2 ** 20, 1)
+            report['traced_peak_mb'] = round(peak / 2 ** 20, 1)
+            snapshot = tracemalloc.take_snapshot().filter_traces(IGNORED_FILES)
+            if self.snapshot is not None:
+                stats = snapshot.compare_to(self.snapshot, 'lineno')
+            else:
+                stats = snapshot.statistics('lineno')
+            report['diffed'] = self.snapshot is not None
+            report['sites'] = [self._site(stat) for stat in stats[:self.top]]
+            self.snapshot = snapshot
+        self.counts = counts
+        self.captured_at = now
+        self.last_report = report
+        return report
+
+    def status(self):
+        """Current RSS and traced memory plus the last captured report; leaves the diff baseline alone"""
+        status = {
+            'rss_mb': round(rss_bytes() / 2 ** 20, 1),
+            'tracing': self.tracing,
+            'last_report': self.last_report
+        }
+        if self.tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            status['traced_mb'] = round(current / 2 ** 20, 1)
+            status['traced_peak_mb'] = round(peak / 2 ** 20, 1)
+        return status
+
+    def _site(self, stat):
+        frame = stat.traceback[0]
+        return {
+            'site': f"{short_path(frame.filename)}:{frame.lineno}",
+            'size_kb': round(stat.size / 1024, 1),
+            'size_diff_kb': round(getattr(stat, 'size_diff', stat.size) / 1024, 1),
+            'count': stat.count,
+            'count_diff': getattr(stat, 'count_diff', stat.count)
+        }
+
+    def write(self, report, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+# Shared profiler; bot.py registers the cache counters
+memory = MemoryProfiler()
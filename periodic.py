@@ -0,0 +1,197 @@
+import asyncio
+import random
+import time
+import traceback
+from utils import logger
+from config import PERIODIC_JITTER, PERIODIC_MAX_BACKOFF, PERIODIC_SUPERVISE_SECONDS
+
+
+class PeriodicTask:
+    """A registered periodic job: ``func()``, or ``func(guild)`` for every guild when ``per_guild``"""
+
+    def __init__(self, name, interval, func, per_guild=False):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self.per_guild = per_guild
+
+
+class TaskStats:
+    """Runtime counters for one task instance"""
+
+    def __init__(self):
+        self.runs = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.overruns = 0  # ticks skipped because a run outlasted the interval
+        self.restarts = 0
+        self.total_duration = 0.0
+        self.max_duration = 0.0
+        self.last_duration = None
+        self.last_run = None
+        self.last_error = None
+
+    def record(self, duration, error=None):
+        self.runs += 1
+        self.total_duration += duration
+        self.max_duration = max(self.max_duration, duration)
+        self.last_duration = duration
+        self.last_run = time.time()
+        if error is None:
+            self.consecutive_failures = 0
+        else:
+            self.failures += 1
+            self.consecutive_failures += 1
+            self.last_error = str(error)
+
+    def to_dict(self):
+        return {
+            'runs': self.runs,
+            'failures': self.failures,
+            'overruns': self.overruns,
+            'restarts': self.restarts,
+            'avg_ms': round(self.total_duration / self.runs * 1000, 1) if self.runs else None,
+            'max_ms': round(self.max_duration * 1000, 1),
+            'last_ms': round(self.last_duration * 1000, 1) if self.last_duration is not None else None,
+            'last_run': self.last_run,
+            'last_error': self.last_error
+        }
+
+
+class TaskSupervisor:
+    """Runs every periodic job of the bot
+
+    Global jobs get one instance; per-guild jobs get one instance per guild,
+    so a slow or failing guild never delays the others. Instances start at a
+    random point of their interval and each run is jittered by
+    ``jitter`` x interval, which spreads API calls instead of bursting them.
+    Runs of one instance never overlap: a run that outlasts the interval
+    skips the ticks it missed (counted as overruns) rather than queueing
+    them. A run that raises is retried after an exponential backoff capped
+    at ``max_backoff``. The supervise loop restarts instances that died and
+    adds or drops per-guild instances as guilds come and go.
+    """
+
+    def __init__(self, jitter=PERIODIC_JITTER, max_backoff=PERIODIC_MAX_BACKOFF, check_interval=PERIODIC_SUPERVISE_SECONDS):
+        self.jitter = jitter
+        self.max_backoff = max_backoff
+        self.check_interval = check_interval
+        self.tasks = {}  # name -> PeriodicTask
+        self.instances = {}  # (name, guild id or None) -> asyncio.Task
+        self.stats = {}  # (name, guild id or None) -> TaskStats
+        self.bot = None
+        self.supervisor = None
+
+    def register(self, name, interval, per_guild=False):
+        """Decorator registering a coroutine function as a periodic job"""
+        def decorator(func):
+            self.tasks[name] = PeriodicTask(name, interval, func, per_guild)
+            return func
+        return decorator
+
+    def start(self, bot):
+        """Start supervising (safe to call on every reconnect)"""
+        self.bot = bot
+        if self.supervisor is None or self.supervisor.done():
+            self.supervisor = asyncio.create_task(self._supervise(), name="periodic_supervisor")
+
+    async def _supervise(self):
+        while True:
+            try:
+                self.reconcile()
+            except Exception as e:
+                logger.error(f"Periodic task supervisor failed: {e}")
+                traceback.print_exc()
+            await asyncio.sleep(self.check_interval)
+
+    def reconcile(self):
+        """Start missing or dead instances and stop those of guilds the bot left"""
+        guild_ids = [guild.id for guild in self.bot.guilds]
+        wanted = set()
+        for task in self.tasks.values():
+            for guild_id in (guild_ids if task.per_guild else [None]):
+                key = (task.name, guild_id)
+                wanted.add(key)
+                instance = self.instances.get(key)
+                if instance is not None and not instance.done():
+                    continue
+                if instance is not None:
+                    self.stats[key].restarts += 1
+                    error = None if instance.cancelled() else instance.exception()
+                    logger.warning(f"Restarting periodic task {self._label(key)} (stopped: {error!r})")
+                self.instances[key] = asyncio.create_task(self._run(task, guild_id), name=f"periodic:{self._label(key)}")
+        for key in [key for key in self.instances if key not in wanted]:
+            self.instances.pop(key).cancel()
+            self.stats.pop(key, None)
+
+    async def _run(self, task, guild_id):
+        key = (task.name, guild_id)
+        stats = self.stats.setdefault(key, TaskStats())
+        loop = asyncio.get_running_loop()
+        scheduled = loop.time() + random.uniform(0, task.interval)
+        due = scheduled
+        while True:
+            await asyncio.sleep(max(due - loop.time(), 0))
+            args = ()
+            if guild_id is not None:
+                guild = self.bot.get_guild(guild_id)
+                if guild is None:
+                    return  # left the guild; the next reconcile drops this instance
+                args = (guild,)
+
+            started = loop.time()
+            try:
+                await task.func(*args)
+            except Exception as e:
+                stats.record(loop.time() - started, e)
+                backoff = min(task.interval * 2 ** stats.consecutive_failures, self.max_backoff)
+                logger.error(f"Periodic task {self._label(key)} failed ({stats.consecutive_failures} in a row), retrying in {backoff:.0f}s: {e}")
+                traceback.print_exc()
+                scheduled = due = loop.time() + backoff
+                continue
+            stats.record(loop.time() - started)
+
+            # Skip ticks that passed during the run instead of running them back to back
+            scheduled += task.interval
+            now = loop.time()
+            if scheduled <= now:
+                missed = int((now - scheduled) // task.interval) + 1
+                scheduled += missed * task.interval
+                stats.overruns += missed
+                logger.warning(f"Periodic task {self._label(key)} took {stats.last_duration:.1f}s, skipped {missed} run(s)")
+            due = scheduled + random.uniform(-self.jitter, self.jitter) * task.interval
+
+    def _label(self, key):
+        name, guild_id = key
+        return name if guild_id is None else f"{name}:{guild_id}"
+
+    # Metrics
+
+    def instance_stats(self, name):
+        """guild id (None for global jobs) -> counters for every instance of a job"""
+        return {guild_id: stats.to_dict() for (task_name, guild_id), stats in self.stats.items() if task_name == name}
+
+    def summary(self):
+        """Job name -> counters summed over its instances"""
+        result = {}
+        for name, task in self.tasks.items():
+            instances = [stats for (task_name, _), stats in self.stats.items() if task_name == name]
+            runs = sum(stats.runs for stats in instances)
+            total = sum(stats.total_duration for stats in instances)
+            result[name] = {
+                'interval': task.interval,
+                'per_guild': task.per_guild,
+                'instances': len(instances),
+                'runs': runs,
+                'failures': sum(stats.failures for stats in instances),
+                'overruns': sum(stats.overruns for stats in instances),
+                'restarts': sum(stats.restarts for stats in instances),
+                'avg_ms': round(total / runs * 1000, 1) if runs else None,
+                'max_ms': round(max((stats.max_duration for stats in instances), default=0.0) * 1000, 1),
+                'failing': sum(1 for stats in instances if stats.consecutive_failures)
+            }
+        return result
+
+
+# Shared supervisor; every periodic job registers here
+periodic = TaskSupervisor()
@@ -0,0 +1,163 @@
+import asyncio
+import time
+from functools import lru_cache
+import discord
+from utils import logger
+from config import AUDIT_CONCURRENCY
+
+ALL_PERMISSIONS = discord.Permissions.all().value
+ADMINISTRATOR = discord.Permissions(administrator=True).value
+VIEW_CHANNEL = discord.Permissions(view_channel=True).value
+
+
+@lru_cache(maxsize=None)
+def flag_mask(flag):
+    return discord.Permissions(**{flag: True}).value
+
+
+@lru_cache(maxsize=None)
+def canonical(flag):
+    """Canonical name of a permission flag, so aliases like ``view_channel``/``read_messages`` compare equal"""
+    return next(name for name, value in discord.Permissions(flag_mask(flag)) if value)
+
+
+def overwrite_masks(flags):
+    """(allow, deny) bitmasks for a ``{flag: True/False}`` overwrite dict (None flags are neutral)"""
+    allow = deny = 0
+    for flag, value in flags.items():
+        if value is True:
+            allow |= flag_mask(flag)
+        elif value is False:
+            deny |= flag_mask(flag)
+    return allow, deny
+
+
+def overwrite_flags(overwrite):
+    """``{flag: True/False}`` for the explicitly set flags of a PermissionOverwrite"""
+    return {flag: value for flag, value in overwrite if value is not None}
+
+
+def effective(base, everyone_masks, role_masks):
+    """Effective channel permissions for a role, following Discord's overwrite order"""
+    if base & ADMINISTRATOR:
+        return ALL_PERMISSIONS
+    allow, deny = everyone_masks
+    perms = (base & ~deny) | allow
+    allow, deny = role_masks
+    perms = (perms & ~deny) | allow
+    if not perms & VIEW_CHANNEL:
+        return 0  # a hidden channel grants nothing else
+    return perms
+
+
+class Finding:
+    """One (channel, target) pair whose effective permissions differ from the rules"""
+
+    def __init__(self, channel, target, diffs, overwrite):
+        self.channel = channel
+        self.target = target
+        self.diffs = diffs  # flag -> (actual, expected)
+        self.overwrite = overwrite  # corrected overwrite to write
+
+    def describe(self):
+        changes = ', '.join(f"{flag} {'✓' if expected else '✗'}" for flag, (_, expected) in sorted(self.diffs.items()))
+        return f"#{self.channel.name} / {self.target.name}: {changes}"
+
+
+class PermissionAudit:
+    """Role x channel permission check computed entirely from the cache
+
+    ``rules`` lists ``(channel, {target: {flag: True/False}})``: the overwrites
+    a channel should carry, per role. For every rule target the effective
+    permissions are computed twice - with the channel's actual overwrites and
+    with the expected ones - and compared on the flags the rules mention.
+    ``requirements`` lists ``(channel, member, role, flags)``: flags the member
+    must end up with (e.g. what the bot needs to open ticket threads), fixed
+    by allowing them on ``role``.
+
+    A mismatch becomes one overwrite edit per (channel, target) that changes
+    only the differing flags and keeps everything else staff have set.
+    """
+
+    def __init__(self, guild, rules, requirements=()):
+        self.guild = guild
+        self.rules = rules
+        self.requirements = requirements
+        self.findings = []
+        self.checked = 0  # (channel, target) pairs compared
+        self.cpu_seconds = 0.0
+
+    def _base(self, target):
+        everyone = self.guild.default_role.permissions.value
+        if target.is_default():
+            return everyone
+        return everyone | target.permissions.value
+
+    def run(self):
+        """Compute all findings (no API calls)"""
+        started = time.process_time()
+        everyone = self.guild.default_role
+        findings = {}  # (channel id, target id) -> Finding
+
+        for channel, expected in self.rules:
+            expected = {
+                target: {canonical(flag): value for flag, value in flags.items()}
+                for target, flags in expected.items()
+            }
+            actual = {target: overwrite_flags(overwrite) for target, overwrite in channel.overwrites.items()}
+            actual_everyone = overwrite_masks(actual.get(everyone, {}))
+            expected_everyone = overwrite_masks(expected.get(everyone, {}))
+            for target, flags in expected.items():
+                base = self._base(target)
+                if target.is_default():
+                    have = effective(base, actual_everyone, (0, 0))
+                    want = effective(base, expected_everyone, (0, 0))
+                else:
+                    have = effective(base, actual_everyone, overwrite_masks(actual.get(target, {})))
+                    want = effective(base, expected_everyone, overwrite_masks(flags))
+                self.checked += 1
+                diffs = {}
+                for flag in flags:
+                    mask = flag_mask(flag)
+                    if bool(have & mask) != bool(want & mask):
+                        diffs[flag] = (bool(have & mask), bool(want & mask))
+                if diffs:
+                    corrected = dict(actual.get(target, {}))
+                    corrected.update({flag: flags[flag] for flag in diffs})
+                    findings[(channel.id, target.id)] = Finding(channel, target, diffs, corrected)
+
+        for channel, member, role, flags in self.requirements:
+            perms = channel.permissions_for(member).value
+            missing = {canonical(flag): (False, True) for flag in flags if not perms & flag_mask(flag)}
+            self.checked += 1
+            if not missing:
+                continue
+            finding = findings.get((channel.id, role.id))
+            if finding is None:
+                corrected = overwrite_flags(channel.overwrites_for(role))
+                finding = findings[(channel.id, role.id)] = Finding(channel, role, {}, corrected)
+            finding.diffs.update(missing)
+            finding.overwrite.update({flag: True for flag in missing})
+
+        self.findings = list(findings.values())
+        self.cpu_seconds = time.process_time() - started
+        return self.findings
+
+    async def apply(self, concurrency=AUDIT_CONCURRENCY, reason="Permission audit"):
+        """Write the corrected overwrites concurrently; returns (fixed, failed)"""
+        semaphore = asyncio.Semaphore(concurrency)
+        results = {'fixed': 0, 'failed': 0}
+
+        async def fix(finding):
+            async with semaphore:
+                try:
+                    await finding.channel.set_permissions(
+                        finding.target, overwrite=discord.PermissionOverwrite(**finding.overwrite), reason=reason
+                    )
+                    results['fixed'] += 1
+                except discord.HTTPException as e:
+                    results['failed'] += 1
+                    logger.warning(f"Could not fix permissions for {finding.describe()}: {e}")
+
+        await asyncio.gather(*(fix(finding) for finding in self.findings))
+        return results['fixed'], results['failed']
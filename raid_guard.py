@@ -0,0 +1,221 @@
+import time
+import unicodedata
+from datetime import datetime, timezone
+from utils import logger
+from config import (
+    RAID_WINDOW_SECONDS, RAID_JOIN_THRESHOLD, RAID_YOUNG_ACCOUNT_DAYS,
+    RAID_YOUNG_THRESHOLD, RAID_SIMILAR_NAME_THRESHOLD, RAID_LOCKDOWN_MINUTES
+)
+
+
+class SlidingWindowCounter:
+    """Event count over the last ``window`` seconds using a ring of per-second buckets
+
+    Adding and reading are O(1): expired buckets are cleared as the clock
+    advances and a running total is kept alongside the ring.
+    """
+
+    def __init__(self, window):
+        self.size = max(int(window), 1)
+        self.buckets = [0] * self.size
+        self.total = 0
+        self.current = None  # absolute second of the newest bucket
+
+    def _advance(self, now):
+        second = int(now)
+        if self.current is None:
+            self.current = second
+            return
+        steps = second - self.current
+        if steps <= 0:
+            return
+        for offset in range(1, min(steps, self.size) + 1):
+            index = (self.current + offset) % self.size
+            self.total -= self.buckets[index]
+            self.buckets[index] = 0
+        self.current = second
+
+    def add(self, now, amount=1):
+        self._advance(now)
+        self.buckets[self.current % self.size] += amount
+        self.total += amount
+        return self.total
+
+    def count(self, now):
+        self._advance(now)
+        return self.total
+
+
+class SlidingWindowKeyCounter:
+    """Per-key counts over the last ``window`` seconds (keys expire with their bucket)"""
+
+    def __init__(self, window):
+        self.size = max(int(window), 1)
+        self.buckets = [[] for _ in range(self.size)]
+        self.counts = {}  # key -> count within window
+        self.current = None
+
+    def _advance(self, now):
+        second = int(now)
+        if self.current is None:
+            self.current = second
+            return
+        steps = second - self.current
+        if steps <= 0:
+            return
+        for offset in range(1, min(steps, self.size) + 1):
+            index = (self.current + offset) % self.size
+            for key in self.buckets[index]:
+                remaining = self.counts[key] - 1
+                if remaining:
+                    self.counts[key] = remaining
+                else:
+                    del self.counts[key]
+            self.buckets[index] = []
+        self.current = second
+
+    def add(self, now, key):
+        """Count a key; returns its count within the window"""
+        self._advance(now)
+        self.buckets[self.current % self.size].append(key)
+        self.counts[key] = self.counts.get(key, 0) + 1
+        return self.counts[key]
+
+
+def name_skeleton(name):
+    """Reduce a username to letters only, lowercased and with repeats collapsed
+
+    ``CS2_Trader_123``, ``cs2trader77`` and ``ℭ𝔰𝔗𝔯𝔞𝔡𝔢𝔯`` all map to similar skeletons.
+    """
+    normalized = unicodedata.normalize('NFKC', name).casefold()
+    letters = []
+    for char in normalized:
+        if char.isalpha() and (not letters or letters[-1] != char):
+            letters.append(char)
+    return ''.join(letters)[:32]
+
+
+class GuildJoinMonitor:
+    """Sliding-window join statistics for one guild"""
+
+    def __init__(self, window):
+        self.joins = SlidingWindowCounter(window)
+        self.young_joins = SlidingWindowCounter(window)
+        self.names = SlidingWindowKeyCounter(window)
+
+
+class RaidGuard:
+    """Join-burst detector that switches guilds into lockdown
+
+    Each join updates three O(1) sliding-window signals: overall join rate,
+    joins from young accounts, and joins whose name skeleton repeats. Crossing
+    any threshold locks the guild down for ``RAID_LOCKDOWN_MINUTES``; further
+    suspicious joins extend the lockdown.
+    """
+
+    def __init__(self, window=RAID_WINDOW_SECONDS, join_threshold=RAID_JOIN_THRESHOLD,
+                 young_days=RAID_YOUNG_ACCOUNT_DAYS, young_threshold=RAID_YOUNG_THRESHOLD,
+                 similar_threshold=RAID_SIMILAR_NAME_THRESHOLD, lockdown_minutes=RAID_LOCKDOWN_MINUTES):
+        self.window = window
+        self.join_threshold = join_threshold
+        self.young_seconds = young_days * 86400
+        self.young_threshold = young_threshold
+        self.similar_threshold = similar_threshold
+        self.lockdown_seconds = lockdown_minutes * 60
+        self.monitors = {}  # guild id -> GuildJoinMonitor
+        self.lockdowns = {}  # guild id -> {'since', 'until', 'reason', 'manual', 'suppressed'}
+
+    def check_join(self, member):
+        """Record a join; returns the trip reason if this join started a new lockdown"""
+        now = time.time()
+        guild_id = member.guild.id
+        monitor = self.monitors.get(guild_id)
+        if monitor is None:
+            monitor = self.monitors[guild_id] = GuildJoinMonitor(self.window)
+
+        reasons = []
+        joins = monitor.joins.add(now)
+        if joins >= self.join_threshold:
+            reasons.append(f"{joins} joins in {self.window}s")
+
+        account_age = (datetime.now(timezone.utc) - member.created_at).total_seconds()
+        if account_age < self.young_seconds:
+            young = monitor.young_joins.add(now)
+            if young >= self.young_threshold:
+                reasons.append(f"{young} new accounts in {self.window}s")
+
+        skeleton = name_skeleton(member.name)
+        if len(skeleton) >= 4:  # short skeletons collide too often to mean anything
+            similar = monitor.names.add(now, skeleton)
+            if similar >= self.similar_threshold:
+                reasons.append(f"{similar} joins named like '{skeleton}'")
+
+        lockdown = self.lockdowns.get(guild_id)
+        if lockdown and lockdown['until'] and lockdown['until'] <= now:
+            self.lockdowns.pop(guild_id)
+            logger.info(f"Lockdown expired for guild {guild_id}")
+            lockdown = None
+
+        if not reasons:
+            return None
+
+        if lockdown:
+            if not lockdown['manual']:
+                lockdown['until'] = now + self.lockdown_seconds
+            return None
+
+        reason = ', '.join(reasons)
+        self.lockdowns[guild_id] = {
+            'since': now,
+            'until': now + self.lockdown_seconds,
+            'reason': reason,
+            'manual': False,
+            'suppressed': 0
+        }
+        logger.warning(f"Raid detected in guild {guild_id}: {reason} - lockdown enabled")
+        return reason
+
+    def is_locked(self, guild_id):
+        """Whether onboarding (DMs, language roles) is paused for a guild"""
+        lockdown = self.lockdowns.get(guild_id)
+        if not lockdown:
+            return False
+        if lockdown['until'] and lockdown['until'] <= time.time():
+            self.lockdowns.pop(guild_id)
+            logger.info(f"Lockdown expired for guild {guild_id}")
+            return False
+        return True
+
+    def note_suppressed(self, guild_id):
+        """Count an onboarding action skipped because of lockdown"""
+        lockdown = self.lockdowns.get(guild_id)
+        if lockdown:
+            lockdown['suppressed'] += 1
+
+    def lock(self, guild_id, reason="Manual lockdown"):
+        """Enable lockdown until lifted manually"""
+        self.lockdowns[guild_id] = {
+            'since': time.time(),
+            'until': None,
+            'reason': reason,
+            'manual': True,
+            'suppressed': 0
+        }
+
+    def unlock(self, guild_id):
+        """Lift lockdown; returns True if the guild was locked"""
+        return self.lockdowns.pop(guild_id, None) is not None
+
+    def status(self, guild_id):
+        """Current lockdown (or None) and join counts within the window"""
+        now = time.time()
+        monitor = self.monitors.get(guild_id)
+        counts = {
+            'joins': monitor.joins.count(now) if monitor else 0,
+            'young_joins': monitor.young_joins.count(now) if monitor else 0
+        }
+        return (self.lockdowns.get(guild_id) if self.is_locked(guild_id) else None), counts
+
+
+# Shared detector for all guilds
+raid_guard = RaidGuard()
@@ -0,0 +1,76 @@
+import asyncio
+import discord
+from utils import logger
+from config import RUNTIME_PROFILE
+
+# Gateway events the bot actually handles: members and presences for the stat
+# channels and language roles, guild messages and their content for tickets.
+# Typing, reactions, voice states, invites, webhooks and the like are never
+# used but would still be sent, decompressed and parsed on every event.
+PERFORMANCE_INTENTS = discord.Intents(
+    guilds=True,
+    members=True,
+    presences=True,
+    guild_messages=True,
+    dm_messages=True,
+    message_content=True
+)
+
+
+class RuntimeProfile:
+    """Event loop, JSON and gateway settings for ``RUNTIME_PROFILE``
+
+    ``default`` keeps the stock asyncio loop, all intents and discord.py's
+    1000-message cache. ``performance`` installs uvloop when it is
+    importable, subscribes only to the intents the bot uses and turns the
+    message cache off (transcripts and cleanups read channel history, never
+    the cache). Fast JSON needs no switch: discord.py decodes gateway
+    payloads with orjson whenever it is installed (requirements-performance.txt).
+    Gateway transport compression (zlib-stream) is always on in discord.py.
+    """
+
+    def __init__(self, name=RUNTIME_PROFILE):
+        if name not in ('default', 'performance'):
+            logger.warning(f"Unknown RUNTIME_PROFILE {name!r} - using 'default'")
+            name = 'default'
+        self.name = name
+        self.event_loop = 'asyncio'
+
+    @property
+    def performance(self):
+        return self.name == 'performance'
+
+    def install_event_loop(self):
+        """Make asyncio.run (and so bot.run) use uvloop; call before the loop starts"""
+        if not self.performance:
+            return
+        try:
+            import uvloop
+        except ImportError:
+            logger.warning("uvloop is not installed - keeping the asyncio event loop")
+            return
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        self.event_loop = f"uvloop {uvloop.__version__}"
+
+    def client_options(self):
+        """Keyword arguments for the discord.py client"""
+        if not self.performance:
+            return {'intents': discord.Intents.all()}
+        return {'intents': PERFORMANCE_INTENTS, 'max_messages': None}
+
+    def describe(self, client):
+        """Which optimizations are active, for the startup log and !info"""
+        max_messages = self.client_options().get('max_messages', 1000)  # 1000 is discord.py's default
+        intents = client.intents
+        return {
+            'profile': self.name,
+            'event_loop': self.event_loop,
+            'json': 'orjson' if discord.utils.HAS_ORJSON else 'json (stdlib)',
+            'gateway_compression': 'zlib-stream',
+            'message_cache': max_messages if max_messages is not None else 'off',
+            'intents': 'all' if intents == discord.Intents.all() else ', '.join(name for name, enabled in intents if enabled)
+        }
+
+
+# Shared profile, chosen by RUNTIME_PROFILE
+runtime = RuntimeProfile()
@@ -0,0 +1,172 @@
+import asyncio
+import heapq
+import itertools
+import json
+import os
+import time
+import uuid
+from utils import logger
+from config import DATA_DIR, SCHEDULER_RETRY_DELAY, SCHEDULER_MAX_ATTEMPTS
+import traceback
+
+
+class ActionScheduler:
+    """Durable delayed actions kept on a min-heap and run by a single worker
+
+    Actions are persisted to a JSON file on every change and re-armed when the
+    worker starts, so timers survive restarts. Overdue actions run immediately.
+    An action stays persisted until its handler has finished, and a failed
+    run is retried ``retry_delay`` seconds later (longer each attempt) up to
+    ``max_attempts`` times - handlers run at least once and must be
+    idempotent.
+    """
+
+    def __init__(self, path, retry_delay=SCHEDULER_RETRY_DELAY, max_attempts=SCHEDULER_MAX_ATTEMPTS):
+        self.path = path
+        self.retry_delay = retry_delay
+        self.max_attempts = max_attempts
+        self.heap = []  # (due, seq, action_id) - cancelled entries are skipped lazily
+        self.actions = {}  # action_id -> {'id', 'kind', 'due', 'payload', 'key'}
+        self.keys = {}  # dedupe key -> action_id
+        self.handlers = {}  # kind -> async handler(payload)
+        self.seq = itertools.count()
+        self.wakeup = None
+        self.worker = None
+
+    def register(self, kind, handler):
+        """Register the coroutine function that runs actions of a kind"""
+        self.handlers[kind] = handler
+
+    def schedule(self, kind, delay, payload, key=None):
+        """Schedule an action ``delay`` seconds from now; a matching ``key`` replaces the previous action"""
+        if key is not None:
+            self.cancel(key)
+        action = {
+            'id': uuid.uuid4().hex,
+            'kind': kind,
+            'due': time.time() + delay,
+            'payload': payload,
+            'key': key
+        }
+        self._push(action)
+        self.save()
+        logger.info(f"Scheduled {kind} in {delay:.0f}s ({key or action['id']})")
+        return action['id']
+
+    def cancel(self, key_or_id):
+        """Cancel an action by dedupe key or id; returns True if one was pending"""
+        action_id = self.keys.pop(key_or_id, key_or_id)
+        action = self.actions.pop(action_id, None)
+        if not action:
+            return False
+        if action['key'] is not None:
+            self.keys.pop(action['key'], None)
+        self.save()
+        return True
+
+    def pending(self, kind=None):
+        """Pending actions ordered by due time"""
+        actions = sorted(self.actions.values(), key=lambda action: action['due'])
+        return [action for action in actions if kind is None or action['kind'] == kind]
+
+    def _push(self, action):
+        self.actions[action['id']] = action
+        if action['key'] is not None:
+            self.keys[action['key']] = action['id']
+        heapq.heappush(self.heap, (action['due'], next(self.seq), action['id']))
+        if self.wakeup:
+            self.wakeup.set()
+
+    def load(self):
+        """Load persisted actions from disk"""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                actions = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"Could not load scheduled actions from {self.path}: {e}")
+            return
+        for action in actions:
+            if action['id'] not in self.actions:
+                self._push(action)
+        logger.info(f"Loaded {len(actions)} scheduled actions")
+
+    def save(self):
+        """Atomically persist pending actions to disk"""
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(list(self.actions.values()), f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.error(f"Could not persist scheduled actions: {e}")
+
+    def start(self):
+        """Load persisted actions and start the worker (safe to call on every reconnect)"""
+        if self.worker and not self.worker.done():
+            return
+        self.wakeup = asyncio.Event()
+        self.load()
+        self.worker = asyncio.create_task(self._run(), name="action_scheduler")
+
+    async def _run(self):
+        while True:
+            self.wakeup.clear()
+            # Drop cancelled entries from the top of the heap
+            while self.heap and self.heap[0][2] not in self.actions:
+                heapq.heappop(self.heap)
+
+            if not self.heap:
+                await self.wakeup.wait()
+                continue
+
+            delay = self.heap[0][0] - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            _, _, action_id = heapq.heappop(self.heap)
+            action = self.actions.get(action_id)
+            if not action:
+                continue
+            succeeded = await self._execute(action)
+            # The handler may have cancelled or rescheduled its own key
+            if self.actions.get(action_id) is not action:
+                continue
+            attempts = action.get('attempts', 0) + 1
+            if succeeded or attempts >= self.max_attempts:
+                self._remove(action)
+            else:
+                action['attempts'] = attempts
+                action['due'] = time.time() + self.retry_delay * attempts
+                self._push(action)
+                logger.info(f"Retrying {action['kind']} in {self.retry_delay * attempts:.0f}s (attempt {attempts + 1})")
+            self.save()
+
+    def _remove(self, action):
+        del self.actions[action['id']]
+        if action['key'] is not None and self.keys.get(action['key']) == action['id']:
+            del self.keys[action['key']]
+
+    async def _execute(self, action):
+        """Run an action's handler; returns False when it should be retried"""
+        handler = self.handlers.get(action['kind'])
+        if not handler:
+            logger.error(f"No handler registered for scheduled action {action['kind']}")
+            return True
+        try:
+            await handler(action['payload'])
+        except Exception as e:
+            logger.error(f"Scheduled action {action['kind']} failed: {e}")
+            traceback.print_exc()
+            return False
+        return True
+
+
+# Shared scheduler for ticket timers
+scheduler = ActionScheduler(os.path.join(DATA_DIR, 'scheduled_actions.json'))
@@ -0,0 +1,239 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from utils import logger
+from config import DATA_DIR
+from transcripts import read_transcript
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tickets (
+    thread_id INTEGER PRIMARY KEY,
+    guild_id INTEGER NOT NULL,
+    owner_id INTEGER,
+    language TEXT,
+    name TEXT,
+    created_at REAL,
+    closed_at REAL,
+    message_count INTEGER
+);
+CREATE INDEX IF NOT EXISTS tickets_guild_closed ON tickets (guild_id, closed_at);
+CREATE INDEX IF NOT EXISTS tickets_owner ON tickets (owner_id);
+
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY,
+    thread_id INTEGER NOT NULL,
+    author_id INTEGER,
+    author_name TEXT,
+    created_at REAL
+);
+CREATE INDEX IF NOT EXISTS messages_thread ON messages (thread_id);
+CREATE INDEX IF NOT EXISTS messages_author ON messages (author_id, created_at);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+    content,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+INGEST_CHUNK = 500
+
+
+def to_timestamp(value):
+    """ISO-8601 string to epoch seconds"""
+    return datetime.fromisoformat(value).timestamp() if value else None
+
+
+def fts_query(text):
+    """Turn free text into an FTS5 query matching all terms (quoted, so punctuation is literal)"""
+    terms = [term.replace('"', '""') for term in text.split()]
+    return ' '.join(f'"{term}"' for term in terms)
+
+
+class TicketSearchIndex:
+    """SQLite FTS5 index over closed ticket transcripts
+
+    Message text lives in an FTS5 table keyed by message id; metadata used for
+    filtering (ticket owner, language, dates) lives in ordinary indexed tables.
+    All database work runs in a worker thread behind a lock.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.db = None
+
+    def _connect(self):
+        if self.db is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            self.db = sqlite3.connect(self.path, check_same_thread=False)
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("PRAGMA synchronous=NORMAL")
+            self.db.executescript(SCHEMA)
+        return self.db
+
+    # Ingestion
+
+    async def ingest_transcript(self, path, header=None):
+        """Index a transcript file, replacing any previous copy of the same ticket"""
+        return await asyncio.to_thread(self._ingest, path)
+
+    def _ingest(self, path):
+        started = time.perf_counter()
+        records = read_transcript(path)
+        header = next(records, None)
+        if not header or header.get('type') != 'ticket':
+            logger.warning(f"Skipping transcript without header: {path}")
+            return 0
+
+        thread_id = header['thread_id']
+        count = 0
+        with self.lock:
+            db = self._connect()
+            with db:
+                db.execute(
+                    "DELETE FROM messages_fts WHERE rowid IN (SELECT id FROM messages WHERE thread_id = ?)",
+                    (thread_id,)
+                )
+                db.execute("DELETE FROM messages WHERE thread_id = ?", (thread_id,))
+
+                chunk = []
+                for record in records:
+                    chunk.append(record)
+                    if len(chunk) >= INGEST_CHUNK:
+                        count += self._insert_messages(db, thread_id, chunk)
+                        chunk = []
+                if chunk:
+                    count += self._insert_messages(db, thread_id, chunk)
+
+                db.execute(
+                    "INSERT OR REPLACE INTO tickets VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        thread_id, header['guild_id'], header.get('owner_id'), header.get('language'),
+                        header.get('name'), to_timestamp(header.get('created_at')),
+                        to_timestamp(header.get('closed_at')), count
+                    )
+                )
+        logger.info(f"Indexed {count} messages from ticket {thread_id} in {time.perf_counter() - started:.2f}s")
+        return count
+
+    @staticmethod
+    def _insert_messages(db, thread_id, records):
+        rows = []
+        texts = []
+        for record in records:
+            text = '\n'.join(
+                [record['content'] or '']
+                + [f"{embed['title'] or ''}\n{embed['description'] or ''}" for embed in record['embeds']]
+            ).strip()
+            rows.append((record['id'], thread_id, record['author_id'], record['author_name'],
+                         to_timestamp(record['created_at'])))
+            texts.append((record['id'], text))
+        db.executemany("INSERT OR REPLACE INTO messages VALUES (?, ?, ?, ?, ?)", rows)
+        db.executemany("INSERT INTO messages_fts (rowid, content) VALUES (?, ?)", texts)
+        return len(rows)
+
+    async def reindex_directory(self, directory):
+        """Index every transcript under a directory that is not indexed yet; returns tickets added"""
+        return await asyncio.to_thread(self._reindex_directory, directory)
+
+    def _reindex_directory(self, directory):
+        with self.lock:
+            indexed = {row[0] for row in self._connect().execute("SELECT thread_id FROM tickets")}
+        added = 0
+        for root, _, files in os.walk(directory):
+            for name in files:
+                if not name.endswith('.jsonl.gz'):
+                    continue
+                try:
+                    thread_id = int(name.split('.')[0])
+                except ValueError:
+                    continue
+                if thread_id in indexed:
+                    continue
+                try:
+                    self._ingest(os.path.join(root, name))
+                    added += 1
+                except Exception as e:
+                    logger.error(f"Could not index transcript {name}: {e}")
+        return added
+
+    # Queries
+
+    async def search(self, guild_id, text=None, user_id=None, language=None,
+                     since=None, until=None, page=1, per_page=10):
+        """Ranked, paginated message search; returns (results, elapsed_ms)"""
+        return await asyncio.to_thread(
+            self._search, guild_id, text, user_id, language, since, until, page, per_page
+        )
+
+    def _search(self, guild_id, text, user_id, language, since, until, page, per_page):
+        started = time.perf_counter()
+        conditions = ["t.guild_id = ?"]
+        params = [guild_id]
+        if user_id:
+            conditions.append("(m.author_id = ? OR t.owner_id = ?)")
+            params += [user_id, user_id]
+        if language:
+            conditions.append("t.language = ?")
+            params.append(language)
+        if since:
+            conditions.append("m.created_at >= ?")
+            params.append(since)
+        if until:
+            conditions.append("m.created_at < ?")
+            params.append(until)
+
+        if text:
+            sql = (
+                "SELECT m.id, m.thread_id, m.author_id, m.author_name, m.created_at, t.language, t.name, "
+                "snippet(messages_fts, 0, '**', '**', '…', 16) "
+                "FROM messages_fts JOIN messages m ON m.id = messages_fts.rowid "
+                "JOIN tickets t ON t.thread_id = m.thread_id "
+                f"WHERE messages_fts MATCH ? AND {' AND '.join(conditions)} "
+                "ORDER BY bm25(messages_fts) LIMIT ? OFFSET ?"
+            )
+            params = [fts_query(text)] + params
+        else:
+            # No text: newest matching messages first
+            sql = (
+                "SELECT m.id, m.thread_id, m.author_id, m.author_name, m.created_at, t.language, t.name, "
+                "substr(f.content, 1, 120) "
+                "FROM messages m JOIN tickets t ON t.thread_id = m.thread_id "
+                "JOIN messages_fts f ON f.rowid = m.id "
+                f"WHERE {' AND '.join(conditions)} "
+                "ORDER BY m.created_at DESC LIMIT ? OFFSET ?"
+            )
+        params += [per_page, (page - 1) * per_page]
+
+        with self.lock:
+            rows = self._connect().execute(sql, params).fetchall()
+
+        results = [
+            {
+                'message_id': row[0],
+                'thread_id': row[1],
+                'author_id': row[2],
+                'author_name': row[3],
+                'created_at': row[4],
+                'language': row[5],
+                'ticket_name': row[6],
+                'snippet': row[7]
+            }
+            for row in rows
+        ]
+        return results, (time.perf_counter() - started) * 1000
+
+    def stats(self):
+        """Number of indexed tickets and messages"""
+        with self.lock:
+            db = self._connect()
+            tickets = db.execute("SELECT COUNT(*) FROM tickets").fetchone()[0]
+            messages = db.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+        return tickets, messages
+
+
+# Shared index fed by the transcript exporter
+search_index = TicketSearchIndex(os.path.join(DATA_DIR, 'ticket_search.sqlite3'))
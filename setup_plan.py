@@ -0,0 +1,103 @@
+import json
+import time
+from collections import Counter
+from config import PLAN_REQUEST_LATENCY
+
+# REST routes used by the setup functions
+CREATE_ROLE = 'POST /guilds/{guild_id}/roles'
+DELETE_ROLE = 'DELETE /guilds/{guild_id}/roles/{role_id}'
+CREATE_CHANNEL = 'POST /guilds/{guild_id}/channels'
+DELETE_CHANNEL = 'DELETE /channels/{channel_id}'
+EDIT_OVERWRITE = 'PUT /channels/{channel_id}/permissions/{overwrite_id}'
+SEND_MESSAGE = 'POST /channels/{channel_id}/messages'
+
+# Route -> (requests, window seconds) per bucket. Typical X-RateLimit values;
+# Discord may change them at any time, so these only drive estimates.
+RATE_LIMITS = {
+    CREATE_ROLE: (10, 10),
+    DELETE_ROLE: (10, 10),
+    CREATE_CHANNEL: (5, 5),
+    DELETE_CHANNEL: (5, 5),
+    EDIT_OVERWRITE: (10, 10),
+    SEND_MESSAGE: (5, 5)
+}
+GLOBAL_LIMIT = 50  # requests per second across all routes
+
+
+class Plan:
+    """The REST calls an admin operation will make, built from cached guild state
+
+    Each step names the route it hits and the bucket's major parameter (the
+    guild or channel it applies to). ``estimate`` replays the steps in order
+    against per-bucket rate limits, adding the request latency and any fixed
+    sleeps the real code performs, to project the wall-clock time.
+    """
+
+    def __init__(self, operation, guild, latency=PLAN_REQUEST_LATENCY):
+        self.operation = operation
+        self.guild_id = guild.id
+        self.guild_name = guild.name
+        self.latency = latency
+        self.steps = []
+        self.warnings = []
+
+    def add(self, action, kind, name, route, major, sleep=0.0, note=None):
+        self.steps.append({
+            'action': action,
+            'kind': kind,
+            'name': name,
+            'route': route,
+            'major': str(major),
+            'sleep': sleep,
+            'note': note
+        })
+        if note and note not in self.warnings:
+            self.warnings.append(note)
+
+    def actions(self):
+        return Counter(step['action'] for step in self.steps)
+
+    def requests(self):
+        """Request count per route"""
+        return Counter(step['route'] for step in self.steps)
+
+    def estimate(self):
+        """Projected seconds to run the steps sequentially"""
+        clock = 0.0
+        buckets = {}  # (route, major) -> [window start, requests used]
+        global_window = [0.0, 0]
+        for step in self.steps:
+            limit, window = RATE_LIMITS[step['route']]
+            bucket = buckets.setdefault((step['route'], step['major']), [clock, 0])
+            if clock >= bucket[0] + window:
+                bucket[:] = [clock, 0]
+            elif bucket[1] >= limit:
+                clock = bucket[0] + window
+                bucket[:] = [clock, 0]
+            if clock >= global_window[0] + 1:
+                global_window[:] = [clock, 0]
+            elif global_window[1] >= GLOBAL_LIMIT:
+                clock = global_window[0] + 1
+                global_window[:] = [clock, 0]
+            bucket[1] += 1
+            global_window[1] += 1
+            clock += self.latency + step['sleep']
+        return clock
+
+    def to_dict(self):
+        return {
+            'operation': self.operation,
+            'guild_id': self.guild_id,
+            'guild_name': self.guild_name,
+            'generated_at': time.time(),
+            'request_latency': self.latency,
+            'eta_seconds': round(self.estimate(), 1),
+            'actions': dict(self.actions()),
+            'requests': dict(self.requests()),
+            'warnings': self.warnings,
+            'steps': self.steps
+        }
+
+    def write(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
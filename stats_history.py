@@ -0,0 +1,168 @@
+import asyncio
+import csv
+import io
+import os
+import sqlite3
+import threading
+import time
+from utils import logger
+from config import DATA_DIR, STATS_RETENTION_DAYS
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS member_stats (
+    guild_id INTEGER NOT NULL,
+    resolution TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    samples INTEGER NOT NULL,
+    total_sum INTEGER NOT NULL,
+    total_max INTEGER NOT NULL,
+    total_last INTEGER NOT NULL,
+    online_sum INTEGER NOT NULL,
+    online_min INTEGER NOT NULL,
+    online_max INTEGER NOT NULL,
+    online_last INTEGER NOT NULL,
+    PRIMARY KEY (guild_id, resolution, bucket)
+) WITHOUT ROWID;
+"""
+
+UPSERT = """
+INSERT INTO member_stats VALUES (?, ?, ?, 1, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (guild_id, resolution, bucket) DO UPDATE SET
+    samples = samples + 1,
+    total_sum = total_sum + excluded.total_sum,
+    total_max = max(total_max, excluded.total_max),
+    total_last = excluded.total_last,
+    online_sum = online_sum + excluded.online_sum,
+    online_min = min(online_min, excluded.online_min),
+    online_max = max(online_max, excluded.online_max),
+    online_last = excluded.online_last
+"""
+
+# Resolution -> bucket width in seconds
+RESOLUTIONS = {'1m': 60, '1h': 3600, '1d': 86400}
+
+
+class StatsHistory:
+    """Member and online counts stored as 1m/1h/1d rollups in SQLite
+
+    Every sample is folded into one row per resolution (count, sum, min, max,
+    last), so nothing but rollups is ever written. Each resolution is pruned to
+    its retention in ``STATS_RETENTION_DAYS``, keeping the file size bounded
+    (with the defaults a guild holds at most ~2.9k 1m rows, ~2.2k 1h rows and
+    365 1d rows per year of history).
+    """
+
+    def __init__(self, path, retention_days=STATS_RETENTION_DAYS, prune_interval=3600):
+        self.path = path
+        self.retention_days = retention_days
+        self.prune_interval = prune_interval
+        self.last_prune = 0.0
+        self.lock = threading.Lock()
+        self.db = None
+
+    def _connect(self):
+        if self.db is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            self.db = sqlite3.connect(self.path, check_same_thread=False)
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("PRAGMA synchronous=NORMAL")
+            self.db.executescript(SCHEMA)
+        return self.db
+
+    # Recording
+
+    async def record(self, guild_id, total, online, now=None):
+        """Fold one sample into every rollup"""
+        await asyncio.to_thread(self._record, guild_id, total, online, time.time() if now is None else now)
+
+    def _record(self, guild_id, total, online, now):
+        rows = [
+            (guild_id, resolution, int(now // width) * width, total, total, total, online, online, online, online)
+            for resolution, width in RESOLUTIONS.items()
+        ]
+        with self.lock:
+            db = self._connect()
+            with db:
+                db.executemany(UPSERT, rows)
+                if now - self.last_prune >= self.prune_interval:
+                    self._prune(db, now)
+
+    def _prune(self, db, now):
+        removed = 0
+        for resolution, days in self.retention_days.items():
+            cursor = db.execute(
+                "DELETE FROM member_stats WHERE resolution = ? AND bucket < ?",
+                (resolution, now - days * 86400)
+            )
+            removed += cursor.rowcount
+        self.last_prune = now
+        if removed:
+            logger.info(f"Pruned {removed} expired stats rollups")
+
+    # Queries
+
+    async def trends(self, guild_id, now=None):
+        """Member deltas over 24h/7d and peak online counts"""
+        return await asyncio.to_thread(self._trends, guild_id, time.time() if now is None else now)
+
+    def _trends(self, guild_id, now):
+        with self.lock:
+            db = self._connect()
+
+            def value_at(resolution, timestamp):
+                row = db.execute(
+                    "SELECT total_last FROM member_stats WHERE guild_id = ? AND resolution = ? AND bucket <= ? "
+                    "ORDER BY bucket DESC LIMIT 1",
+                    (guild_id, resolution, timestamp)
+                ).fetchone()
+                return row[0] if row else None
+
+            def peak_since(resolution, timestamp):
+                row = db.execute(
+                    "SELECT max(online_max) FROM member_stats "
+                    "WHERE guild_id = ? AND resolution = ? AND bucket >= ?",
+                    (guild_id, resolution, timestamp)
+                ).fetchone()
+                return row[0]
+
+            current = value_at('1m', now)
+            day_ago = value_at('1m', now - 86400)
+            week_ago = value_at('1h', now - 7 * 86400)
+            return {
+                'total': current,
+                'delta_24h': current - day_ago if current is not None and day_ago is not None else None,
+                'delta_7d': current - week_ago if current is not None and week_ago is not None else None,
+                'peak_online_24h': peak_since('1h', now - 86400),
+                'peak_online_7d': peak_since('1h', now - 7 * 86400),
+                'peak_online_all': peak_since('1d', 0)
+            }
+
+    async def export_csv(self, guild_id, resolution='1h', since=None):
+        """CSV of one resolution's rollups (oldest first)"""
+        return await asyncio.to_thread(self._export_csv, guild_id, resolution, since or 0)
+
+    def _export_csv(self, guild_id, resolution, since):
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"Unknown resolution: {resolution}")
+        with self.lock:
+            rows = self._connect().execute(
+                "SELECT bucket, samples, total_sum, total_max, total_last, online_sum, online_min, online_max "
+                "FROM member_stats WHERE guild_id = ? AND resolution = ? AND bucket >= ? ORDER BY bucket",
+                (guild_id, resolution, since)
+            ).fetchall()
+
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(['timestamp', 'samples', 'total_avg', 'total_max', 'total_last',
+                         'online_avg', 'online_min', 'online_max'])
+        for bucket, samples, total_sum, total_max, total_last, online_sum, online_min, online_max in rows:
+            writer.writerow([
+                time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(bucket)), samples,
+                round(total_sum / samples, 1), total_max, total_last,
+                round(online_sum / samples, 1), online_min, online_max
+            ])
+        return output.getvalue(), len(rows)
+
+
+# Shared history fed by update_stats
+stats_history = StatsHistory(os.path.join(DATA_DIR, 'stats_history.sqlite3'))
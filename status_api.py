@@ -0,0 +1,108 @@
+import asyncio
+import time
+from aiohttp import web
+from utils import logger
+from config import STATUS_API_HOST, STATUS_API_PORT
+
+
+class LoopLagMonitor:
+    """Measures event loop lag as the overshoot of a periodic sleep"""
+
+    def __init__(self, interval=1.0):
+        self.interval = interval
+        self.lag = 0.0
+        self.max_lag = 0.0  # worst lag since the last status read
+        self.task = None
+
+    def start(self):
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._run(), name="loop_lag_monitor")
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            self.lag = max(loop.time() - started - self.interval, 0.0)
+            self.max_lag = max(self.max_lag, self.lag)
+
+    def read(self):
+        """Current and worst lag (ms), resetting the worst"""
+        result = {'lag_ms': round(self.lag * 1000, 1), 'max_lag_ms': round(self.max_lag * 1000, 1)}
+        self.max_lag = self.lag
+        return result
+
+
+class StatusServer:
+    """Read-only JSON status endpoints served from in-memory state
+
+    Endpoints are plain functions returning a dict (or a ``(status, dict)``
+    tuple); they must only read local caches, never call Discord, so the API
+    is safe to poll as often as monitoring likes.
+    """
+
+    def __init__(self, host=STATUS_API_HOST, port=STATUS_API_PORT):
+        self.host = host
+        self.port = port
+        self.endpoints = {}  # path -> provider
+        self.heartbeats = {}  # name -> last success timestamp
+        self.gateway_connected = False
+        self.gateway_changed_at = None
+        self.started_at = time.time()
+        self.loop_lag = LoopLagMonitor()
+        self.runner = None
+
+    def endpoint(self, path):
+        """Decorator registering a provider for ``GET path``"""
+        def decorator(provider):
+            self.endpoints[path] = provider
+            return provider
+        return decorator
+
+    def set_gateway(self, connected):
+        """Track gateway connect/disconnect events"""
+        if connected != self.gateway_connected:
+            self.gateway_connected = connected
+            self.gateway_changed_at = time.time()
+
+    def beat(self, name):
+        """Record a successful run of a periodic task"""
+        self.heartbeats[name] = time.time()
+
+    def since_beat(self, name):
+        """Seconds since a task last succeeded, None if it never has"""
+        last = self.heartbeats.get(name)
+        return time.time() - last if last else None
+
+    async def _handle(self, request):
+        provider = self.endpoints[request.path]
+        try:
+            result = provider()
+        except Exception as e:
+            logger.error(f"Status endpoint {request.path} failed: {e}")
+            return web.json_response({'error': str(e)}, status=500)
+        status, body = result if isinstance(result, tuple) else (200, result)
+        return web.json_response(body, status=status)
+
+    async def start(self):
+        """Start listening (safe to call on every reconnect)"""
+        self.loop_lag.start()
+        if self.runner is not None:
+            return
+        app = web.Application()
+        for path in self.endpoints:
+            app.router.add_get(path, self._handle)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        try:
+            await web.TCPSite(self.runner, self.host, self.port).start()
+        except OSError as e:
+            logger.error(f"Could not start status API on {self.host}:{self.port}: {e}")
+            await self.runner.cleanup()
+            self.runner = None
+            return
+        logger.info(f"Status API listening on {self.host}:{self.port}")
+
+
+# Shared server; bot.py registers the endpoints
+status_api = StatusServer()
@@ -0,0 +1,119 @@
+import asyncio
+import re
+from datetime import datetime, timezone
+import discord
+from utils import logger
+from config import TICKET_CHANNEL_THREAD_LIMIT, TICKET_OVERFLOW_HEADROOM, TICKET_GUILD_THREAD_SOFT_LIMIT
+
+
+def overflow_name(base_name, index):
+    return f"{base_name}-{index}"
+
+
+def overflow_index(name, base_name):
+    """Index of an overflow channel of ``base_name`` (``<base>-2`` -> 2), None for other names"""
+    match = re.fullmatch(re.escape(base_name) + r'-(\d+)', name)
+    return int(match.group(1)) if match else None
+
+
+def last_activity(thread):
+    """Time of the last message in a thread, from the cached thread only"""
+    return discord.utils.snowflake_time(thread.last_message_id or thread.id)
+
+
+class TicketPlacement:
+    """Chooses the support channel each new ticket thread goes into
+
+    Every active thread of a channel is listed and synced to clients with it,
+    so a support channel with hundreds of unarchived tickets gets slow to
+    open and search. Each support channel therefore holds at most
+    ``channel_limit`` active threads; further tickets spill into overflow
+    channels - clones of the support channel (same category and overwrites)
+    named ``<name>-2``, ``<name>-3``, ... When a channel family has fewer
+    than ``headroom`` free slots left, the next overflow channel is created
+    in the background, so a ticket never waits for a channel to be created.
+    Counts come from the cached active threads; no API calls are made to
+    choose a channel.
+
+    Discord's hard cap on active threads is per guild, which overflow
+    channels cannot raise: ``idle_tickets`` picks open tickets to archive,
+    and more of them as the guild gets close to ``guild_soft_limit``.
+    Archived tickets stay open - a new message unarchives them.
+    """
+
+    def __init__(self, channel_limit=TICKET_CHANNEL_THREAD_LIMIT, headroom=TICKET_OVERFLOW_HEADROOM,
+                 guild_soft_limit=TICKET_GUILD_THREAD_SOFT_LIMIT):
+        self.channel_limit = channel_limit
+        self.headroom = headroom
+        self.guild_soft_limit = guild_soft_limit
+        self.creating = {}  # base channel id -> task creating the next overflow channel
+
+    def family(self, base):
+        """The support channel followed by its overflow channels, in order"""
+        overflow = []
+        for channel in base.guild.text_channels:
+            index = overflow_index(channel.name, base.name)
+            if index is not None:
+                overflow.append((index, channel))
+        return [base] + [channel for _, channel in sorted(overflow, key=lambda item: item[0])]
+
+    def active_threads(self, channel):
+        return sum(1 for thread in channel.threads if not thread.archived)
+
+    def usage(self, base):
+        """(channel, active threads) for every channel of a support channel's family"""
+        return [(channel, self.active_threads(channel)) for channel in self.family(base)]
+
+    async def place(self, base):
+        """Channel for the next ticket opened from ``base``'s panel"""
+        usage = self.usage(base)
+        free = sum(max(self.channel_limit - count, 0) for _, count in usage)
+        if free <= self.headroom:
+            self._prepare(base, usage)
+        for channel, count in usage:
+            if count < self.channel_limit:
+                return channel
+        # Every channel is full and the next one is still being created
+        channel = await self._prepare(base, usage)
+        return channel or base
+
+    def _prepare(self, base, usage):
+        """Task creating the next overflow channel (shared by concurrent callers)"""
+        task = self.creating.get(base.id)
+        if task is not None and task.done() and not task.cancelled():
+            channel = task.result()
+            if channel is not None and channel not in self.family(base):
+                return task  # created, but the channel is not in the cache yet
+        if task is None or task.done():
+            index = max((overflow_index(channel.name, base.name) or 1) for channel, _ in usage) + 1
+            task = asyncio.create_task(self._create(base, index), name=f"ticket_overflow:{base.id}")
+            self.creating[base.id] = task
+        return task
+
+    async def _create(self, base, index):
+        name = overflow_name(base.name, index)
+        try:
+            channel = await base.clone(name=name, reason="Support ticket overflow channel")
+        except Exception as e:
+            # Any failure means "no channel yet"; the next placement retries
+            logger.error(f"Could not create overflow channel {name}: {e}")
+            return None
+        logger.info(f"Created ticket overflow channel {name} in {base.guild.name}")
+        return channel
+
+    def idle_tickets(self, guild, open_ticket_ids, idle_seconds):
+        """Active ticket threads to archive: idle ones, plus the least recently used above the soft limit"""
+        now = datetime.now(timezone.utc)
+        tickets = sorted(
+            (thread for thread in guild.threads if thread.id in open_ticket_ids and not thread.archived),
+            key=last_activity
+        )
+        over_limit = max(sum(1 for thread in guild.threads if not thread.archived) - self.guild_soft_limit, 0)
+        return [
+            thread for position, thread in enumerate(tickets)
+            if position < over_limit or (now - last_activity(thread)).total_seconds() >= idle_seconds
+        ]
+
+
+# Shared placement for all support panels
+placement = TicketPlacement()
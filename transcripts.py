@@ -0,0 +1,189 @@
+import discord
+import asyncio
+import gzip
+import html
+import json
+import os
+from datetime import datetime, timezone
+from utils import logger
+from config import DATA_DIR, TRANSCRIPT_BATCH_SIZE, TRANSCRIPT_HTML
+import traceback
+
+
+def message_record(message):
+    """Flatten a message into a JSON-serializable transcript record"""
+    return {
+        'type': 'message',
+        'id': message.id,
+        'author_id': message.author.id,
+        'author_name': str(message.author),
+        'author_bot': message.author.bot,
+        'created_at': message.created_at.isoformat(),
+        'edited_at': message.edited_at.isoformat() if message.edited_at else None,
+        'content': message.content,
+        'attachments': [attachment.url for attachment in message.attachments],
+        'embeds': [
+            {'title': embed.title, 'description': embed.description}
+            for embed in message.embeds
+        ]
+    }
+
+
+def render_html_row(record):
+    """Render one transcript record as an HTML row"""
+    parts = [html.escape(record['content'] or '')]
+    for embed in record['embeds']:
+        parts.append(f"<div class=\"embed\"><b>{html.escape(embed['title'] or '')}</b><br>"
+                     f"{html.escape(embed['description'] or '')}</div>")
+    for url in record['attachments']:
+        parts.append(f"<a href=\"{html.escape(url)}\">{html.escape(url)}</a>")
+    return (
+        f"<div class=\"msg{' bot' if record['author_bot'] else ''}\">"
+        f"<span class=\"time\">{html.escape(record['created_at'])}</span> "
+        f"<span class=\"author\">{html.escape(record['author_name'])}</span>"
+        f"<div class=\"content\">{'<br>'.join(parts).replace(chr(10), '<br>')}</div></div>\n"
+    )
+
+
+class TranscriptExporter:
+    """Streams closed ticket threads to gzip-compressed JSONL from a background worker
+
+    History is paged in batches and each batch is written before the next one
+    is fetched, so memory use does not grow with the length of the ticket.
+    """
+
+    def __init__(self, directory, batch_size=TRANSCRIPT_BATCH_SIZE, render_html=TRANSCRIPT_HTML):
+        self.directory = directory
+        self.batch_size = batch_size
+        self.render_html = render_html
+        self.queue = None
+        self.worker = None
+        self.listeners = []  # async callbacks(path, header) run after each export
+
+    def path_for(self, guild_id, thread_id, extension='jsonl.gz'):
+        """Where the transcript for a thread is stored"""
+        return os.path.join(self.directory, str(guild_id), f"{thread_id}.{extension}")
+
+    def add_listener(self, callback):
+        """Register an async callback run with (path, header) after each export"""
+        self.listeners.append(callback)
+
+    def start(self):
+        """Start the export worker (safe to call on every reconnect)"""
+        if self.worker and not self.worker.done():
+            return
+        if self.queue is None:
+            self.queue = asyncio.Queue()
+        self.worker = asyncio.create_task(self._run(), name="transcript_exporter")
+
+    def enqueue(self, thread, owner_id, language, closed_by=None):
+        """Queue a ticket thread for export; returns immediately"""
+        if self.queue is None:
+            self.queue = asyncio.Queue()
+        header = {
+            'type': 'ticket',
+            'guild_id': thread.guild.id,
+            'thread_id': thread.id,
+            'parent_id': thread.parent_id,
+            'name': thread.name,
+            'owner_id': owner_id,
+            'language': language,
+            'closed_by': closed_by,
+            'created_at': (thread.created_at or discord.utils.snowflake_time(thread.id)).isoformat(),
+            'closed_at': datetime.now(timezone.utc).isoformat()
+        }
+        self.queue.put_nowait((thread, header))
+        logger.info(f"Queued transcript export for {thread.name} ({self.queue.qsize()} pending)")
+
+    async def _run(self):
+        while True:
+            thread, header = await self.queue.get()
+            try:
+                path = await self.export(thread, header)
+                for callback in self.listeners:
+                    try:
+                        await callback(path, header)
+                    except Exception as e:
+                        logger.error(f"Transcript listener failed for {thread.name}: {e}")
+                        traceback.print_exc()
+            except Exception as e:
+                logger.error(f"Error exporting transcript for {thread.name}: {e}")
+                traceback.print_exc()
+            finally:
+                self.queue.task_done()
+
+    async def export(self, thread, header):
+        """Page through a thread's history and stream it to disk"""
+        path = self.path_for(header['guild_id'], header['thread_id'])
+        html_path = self.path_for(header['guild_id'], header['thread_id'], 'html')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        json_out = gzip.open(f"{path}.tmp", 'wt', encoding='utf-8')
+        html_out = open(f"{html_path}.tmp", 'w', encoding='utf-8') if self.render_html else None
+        count = 0
+        try:
+            await asyncio.to_thread(self._write_header, json_out, html_out, header)
+
+            after = discord.Object(id=thread.id - 1)
+            while True:
+                batch = [
+                    message_record(message)
+                    async for message in thread.history(limit=self.batch_size, after=after, oldest_first=True)
+                ]
+                if not batch:
+                    break
+                await asyncio.to_thread(self._write_batch, json_out, html_out, batch)
+                count += len(batch)
+                after = discord.Object(id=batch[-1]['id'])
+                if len(batch) < self.batch_size:
+                    break
+
+            await asyncio.to_thread(self._write_footer, html_out)
+        finally:
+            json_out.close()
+            if html_out:
+                html_out.close()
+
+        os.replace(f"{path}.tmp", path)
+        if html_out:
+            os.replace(f"{html_path}.tmp", html_path)
+        header['message_count'] = count
+        logger.info(f"Exported {count} messages from {thread.name} to {path}")
+        return path
+
+    @staticmethod
+    def _write_header(json_out, html_out, header):
+        json_out.write(json.dumps(header, ensure_ascii=False) + '\n')
+        if html_out:
+            html_out.write(
+                "<!DOCTYPE html><html><head><meta charset=\"utf-8\">"
+                f"<title>{html.escape(header['name'])}</title>"
+                "<style>body{font-family:sans-serif;background:#313338;color:#dbdee1}"
+                ".msg{padding:4px 8px}.bot .author{color:#5865f2}.time{color:#949ba4;font-size:12px}"
+                ".author{font-weight:bold}.embed{border-left:4px solid #00ff88;padding:4px 8px;margin:4px 0}"
+                "</style></head><body>\n"
+                f"<h2>{html.escape(header['name'])}</h2>"
+                f"<p>Language: {html.escape(header['language'] or '')} • Closed: {html.escape(header['closed_at'])}</p>\n"
+            )
+
+    @staticmethod
+    def _write_batch(json_out, html_out, batch):
+        json_out.write(''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in batch))
+        if html_out:
+            html_out.write(''.join(render_html_row(record) for record in batch))
+
+    @staticmethod
+    def _write_footer(html_out):
+        if html_out:
+            html_out.write("</body></html>\n")
+
+
+def read_transcript(path):
+    """Yield the records of a transcript file one at a time"""
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            yield json.loads(line)
+
+
+# Shared exporter for closed tickets
+exporter = TranscriptExporter(os.path.join(DATA_DIR, 'transcripts'))
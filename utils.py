@@ -2,7 +2,7 @@ import discord
 from discord.ext import commands
 from datetime import datetime, timezone
 import asyncio
-from config import ROLES, COLORS
+from config import COLORS
 import logging
 
 # Setup logging
@@ -15,7 +15,8 @@ def is_admin():
         if not ctx.guild:
             return False
         
-        admin_role = discord.utils.get(ctx.guild.roles, name=ROLES['admin'])
+        from guild_config import guild_configs
+        admin_role = discord.utils.get(ctx.guild.roles, name=guild_configs.get(ctx.guild.id).roles['admin'])
         if not admin_role:
             await ctx.send("❌ Admin role not found in this server.")
             return False
@@ -28,12 +29,16 @@ def is_admin():
     
     return commands.check(predicate)
 
-def create_embed(title, description, color=COLORS['primary'], thumbnail=None, fields=None):
+def snowflake(argument):
+    """Discord ID command argument (taken as text by slash commands, whose integers stop at 2^53)"""
+    return int(argument)
+
+def create_embed(title, description, color=None, thumbnail=None, fields=None):
     """Create a standardized embed"""
     embed = discord.Embed(
         title=title,
         description=description,
-        color=color,
+        color=COLORS['primary'] if color is None else color,
         timestamp=datetime.now(timezone.utc)
     )
     
@@ -167,6 +172,10 @@ def get_moderator_permissions():
         move_members=True
     )
 
+def get_language_permissions():
+    """Get language role permissions (minimal)"""
+    return discord.Permissions(read_messages=True, add_reactions=True)
+
 def get_admin_permissions():
     """Get admin permissions"""
     return discord.Permissions.all()
@@ -192,18 +201,38 @@ def get_bot_permissions():
         speak=True
     )
 
+# Overwrites the setup functions apply, by role key; also the expected state for !audit_permissions
+BASIC_OVERWRITES = {
+    # Default: deny access to @everyone
+    'everyone': dict(read_messages=False),
+    # Admin and Bot: full access
+    'admin': dict(read_messages=True, send_messages=True, manage_messages=True),
+    'bot': dict(read_messages=True, send_messages=True, manage_messages=True),
+    # Moderator: manage access but can't use bot commands
+    'moderator': dict(read_messages=True, send_messages=True, manage_messages=True)
+}
+
+# Language role: read-only access
+WELCOME_LANGUAGE_OVERWRITE = dict(read_messages=True, send_messages=False, add_reactions=True, read_message_history=True)
+
+# Language role: read-write access
+COMMUNITY_LANGUAGE_OVERWRITE = dict(
+    read_messages=True,
+    send_messages=True,
+    add_reactions=True,
+    read_message_history=True,
+    embed_links=False,  # Restrictive
+    attach_files=False  # Restrictive
+)
+
+# Language role: read-only but can interact with buttons
+SUPPORT_LANGUAGE_OVERWRITE = dict(read_messages=True, send_messages=False, add_reactions=True, read_message_history=True)
+
 async def setup_channel_permissions(channel, guild_roles):
     """Setup permissions for a channel based on its type"""
     try:
-        # Default: deny access to @everyone
-        await channel.set_permissions(guild_roles['everyone'], read_messages=False)
-        
-        # Admin and Bot: full access
-        await channel.set_permissions(guild_roles['admin'], read_messages=True, send_messages=True, manage_messages=True)
-        await channel.set_permissions(guild_roles['bot'], read_messages=True, send_messages=True, manage_messages=True)
-        
-        # Moderator: manage access but can't use bot commands
-        await channel.set_permissions(guild_roles['moderator'], read_messages=True, send_messages=True, manage_messages=True)
+        for role_key, overwrite in BASIC_OVERWRITES.items():
+            await channel.set_permissions(guild_roles[role_key], **overwrite)
         
         logger.info(f"Set up basic permissions for channel: {channel.name}")
         
@@ -215,14 +244,7 @@ async def setup_welcome_channel_permissions(channel, guild_roles, language_role)
     try:
         await setup_channel_permissions(channel, guild_roles)
         
-        # Language role: read-only access
-        await channel.set_permissions(
-            language_role, 
-            read_messages=True, 
-            send_messages=False, 
-            add_reactions=True,
-            read_message_history=True
-        )
+        await channel.set_permissions(language_role, **WELCOME_LANGUAGE_OVERWRITE)
         
         logger.info(f"Set up welcome permissions for channel: {channel.name}")
         
@@ -234,16 +256,7 @@ async def setup_community_channel_permissions(channel, guild_roles, language_rol
     try:
         await setup_channel_permissions(channel, guild_roles)
         
-        # Language role: read-write access
-        await channel.set_permissions(
-            language_role, 
-            read_messages=True, 
-            send_messages=True, 
-            add_reactions=True,
-            read_message_history=True,
-            embed_links=False,  # Restrictive
-            attach_files=False  # Restrictive
-        )
+        await channel.set_permissions(language_role, **COMMUNITY_LANGUAGE_OVERWRITE)
         
         logger.info(f"Set up community permissions for channel: {channel.name}")
         
@@ -255,14 +268,7 @@ async def setup_support_channel_permissions(channel, guild_roles, language_role)
     try:
         await setup_channel_permissions(channel, guild_roles)
         
-        # Language role: read-only but can interact with buttons
-        await channel.set_permissions(
-            language_role, 
-            read_messages=True, 
-            send_messages=False, 
-            add_reactions=True,
-            read_message_history=True
-        )
+        await channel.set_permissions(language_role, **SUPPORT_LANGUAGE_OVERWRITE)
         
         logger.info(f"Set up support permissions for channel: {channel.name}")
         
@@ -3,7 +3,17 @@ from discord.ext import commands
 from datetime import datetime, timezone, timedelta
 import asyncio
 from utils import create_embed, logger
-from config import COLORS, ROLES
+from config import COLORS, TICKET_ARCHIVE_DELAY, TICKET_REMINDER_HOURS, TICKET_IDLE_CLOSE_HOURS
+from interactions import pipeline
+from admission import admission
+from scheduler import scheduler
+from transcripts import exporter
+from analytics import analytics
+from dm_outbox import outbox
+from raid_guard import raid_guard
+from language_roles import switch_language_role
+from guild_config import guild_configs
+from ticket_placement import placement
 import traceback
 
 class LanguageSelectionView(discord.ui.View):
@@ -11,29 +21,31 @@ class LanguageSelectionView(discord.ui.View):
     
     def __init__(self):
         super().__init__(timeout=None)
-        self.cooldowns = {}  # Track user cooldowns
+        self.cooldowns = {}  # Track user cooldowns: (guild id, user id) -> expiry
         
-    def is_on_cooldown(self, user_id):
-        """Check if user is on cooldown"""
-        if user_id in self.cooldowns:
-            time_left = self.cooldowns[user_id] - datetime.now(timezone.utc)
+    def is_on_cooldown(self, guild_id, user_id):
+        """Check if user is on cooldown in a guild"""
+        expires = self.cooldowns.get((guild_id, user_id))
+        if expires:
+            time_left = expires - datetime.now(timezone.utc)
             if time_left.total_seconds() > 0:
                 return True, time_left.total_seconds()
         return False, 0
     
-    def set_cooldown(self, user_id, seconds=5):
-        """Set cooldown for user"""
-        self.cooldowns[user_id] = datetime.now(timezone.utc) + timedelta(seconds=seconds)
+    def set_cooldown(self, guild_id, user_id, seconds=5):
+        """Set cooldown for user in a guild"""
+        self.cooldowns[(guild_id, user_id)] = datetime.now(timezone.utc) + timedelta(seconds=seconds)
     
-    async def assign_language_role(self, interaction, language):
+    async def assign_language_role(self, interaction, language, progress):
         """Assign language role and remove other language roles"""
         try:
             guild = interaction.guild
             user = interaction.user
             
             # Get roles
-            english_role = discord.utils.get(guild.roles, name=ROLES['english'])
-            russian_role = discord.utils.get(guild.roles, name=ROLES['russian'])
+            roles = guild_configs.get(guild.id).roles
+            english_role = discord.utils.get(guild.roles, name=roles['english'])
+            russian_role = discord.utils.get(guild.roles, name=roles['russian'])
             
             if not english_role or not russian_role:
                 embed = create_embed(
@@ -41,22 +53,15 @@ class LanguageSelectionView(discord.ui.View):
                     "Language roles not found. Please contact an administrator.",
                     color=COLORS['error']
                 )
-                await interaction.response.send_message(embed=embed, ephemeral=True)
+                await progress.update(embed)
                 return
             
-            # Remove existing language roles
-            roles_to_remove = []
-            if english_role in user.roles:
-                roles_to_remove.append(english_role)
-            if russian_role in user.roles:
-                roles_to_remove.append(russian_role)
-            
-            if roles_to_remove:
-                await user.remove_roles(*roles_to_remove)
-            
-            # Add new language role
+            # Swap language roles in a single member edit
             new_role = english_role if language == 'english' else russian_role
-            await user.add_roles(new_role)
+            await switch_language_role(
+                user, new_role, [english_role, russian_role],
+                reason=f"Selected {language} language"
+            )
             
             # Create success embed
             if language == 'english':
@@ -114,13 +119,10 @@ class LanguageSelectionView(discord.ui.View):
                     color=COLORS['info']
                 )
             
-            await interaction.response.send_message(embed=embed, ephemeral=True)
+            await progress.update(embed)
             
-            # Send DM with channel guide
-            try:
-                await user.send(embed=dm_embed)
-            except discord.Forbidden:
-                logger.warning(f"Could not send DM to {user.name} - DMs disabled")
+            # Send DM with channel guide through the rate-limited outbox
+            outbox.send(user, dm_embed, f'language_guide:{language}')
             
             logger.info(f"User {user.name} selected {language} language")
             
@@ -133,47 +135,59 @@ class LanguageSelectionView(discord.ui.View):
                 "An error occurred while assigning your language role. Please try again or contact an administrator.",
                 color=COLORS['error']
             )
-            
-            if not interaction.response.is_done():
-                await interaction.response.send_message(embed=embed, ephemeral=True)
-            else:
-                await interaction.followup.send(embed=embed, ephemeral=True)
-
-    @discord.ui.button(label='🇺🇸 English', style=discord.ButtonStyle.primary, custom_id='language_english')
-    async def english_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-        """Handle English language selection"""
+            await progress.update(embed)
+    
+    async def select_language(self, interaction, language, progress):
+        """Cooldown check and role assignment, run after the interaction is deferred"""
         user_id = interaction.user.id
-        on_cooldown, time_left = self.is_on_cooldown(user_id)
         
-        if on_cooldown:
+        # Language role assignment is paused while the guild is in raid lockdown
+        if raid_guard.is_locked(interaction.guild.id):
+            raid_guard.note_suppressed(interaction.guild.id)
             embed = create_embed(
-                "⏰ Cooldown",
-                f"Please wait {time_left:.1f} seconds before selecting a language again.",
+                "⏸️ Temporarily Paused",
+                "Language selection is temporarily paused. Please try again in a few minutes.\n"
+                "Выбор языка временно приостановлен. Пожалуйста, попробуйте через несколько минут.",
                 color=COLORS['warning']
             )
-            await interaction.response.send_message(embed=embed, ephemeral=True)
+            await progress.update(embed)
             return
+        on_cooldown, time_left = self.is_on_cooldown(interaction.guild.id, user_id)
         
-        self.set_cooldown(user_id)
-        await self.assign_language_role(interaction, 'english')
+        if on_cooldown:
+            if language == 'english':
+                embed = create_embed(
+                    "⏰ Cooldown",
+                    f"Please wait {time_left:.1f} seconds before selecting a language again.",
+                    color=COLORS['warning']
+                )
+            else:
+                embed = create_embed(
+                    "⏰ Кулдаун",
+                    f"Пожалуйста, подождите {time_left:.1f} секунд перед повторным выбором языка.",
+                    color=COLORS['warning']
+                )
+            await progress.update(embed)
+            return
+        
+        self.set_cooldown(interaction.guild.id, user_id)
+        await self.assign_language_role(interaction, language, progress)
+
+    @discord.ui.button(label='🇺🇸 English', style=discord.ButtonStyle.primary, custom_id='language_english')
+    async def english_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        """Handle English language selection"""
+        await pipeline.run(
+            interaction, 'language_select',
+            lambda progress: self.select_language(interaction, 'english', progress)
+        )
 
     @discord.ui.button(label='🇷🇺 Русский', style=discord.ButtonStyle.primary, custom_id='language_russian')
     async def russian_button(self, interaction: discord.Interaction, button: discord.ui.Button):
         """Handle Russian language selection"""
-        user_id = interaction.user.id
-        on_cooldown, time_left = self.is_on_cooldown(user_id)
-        
-        if on_cooldown:
-            embed = create_embed(
-                "⏰ Кулдаун",
-                f"Пожалуйста, подождите {time_left:.1f} секунд перед повторным выбором языка.",
-                color=COLORS['warning']
-            )
-            await interaction.response.send_message(embed=embed, ephemeral=True)
-            return
-        
-        self.set_cooldown(user_id)
-        await self.assign_language_role(interaction, 'russian')
+        await pipeline.run(
+            interaction, 'language_select',
+            lambda progress: self.select_language(interaction, 'russian', progress)
+        )
 
 
 class SimpleTicketView(discord.ui.View):
@@ -182,8 +196,7 @@ class SimpleTicketView(discord.ui.View):
     def __init__(self, language):
         super().__init__(timeout=None)
         self.language = language
-        self.cooldowns = {}
-        self.active_tickets = set()
+        self.cooldowns = {}  # (guild id, user id) -> expiry
         
         # Add language-specific button
         if language == 'english':
@@ -191,29 +204,34 @@ class SimpleTicketView(discord.ui.View):
         else:
             self.add_item(SimpleTicketButton('russian'))
         
-    def is_on_cooldown(self, user_id):
-        """Check if user is on cooldown"""
-        if user_id in self.cooldowns:
-            time_left = self.cooldowns[user_id] - datetime.now(timezone.utc)
+    def is_on_cooldown(self, guild_id, user_id):
+        """Check if user is on cooldown in a guild"""
+        expires = self.cooldowns.get((guild_id, user_id))
+        if expires:
+            time_left = expires - datetime.now(timezone.utc)
             if time_left.total_seconds() > 0:
                 return True, time_left.total_seconds()
         return False, 0
     
-    def set_cooldown(self, user_id, seconds=5):
-        """Set cooldown for user"""
-        self.cooldowns[user_id] = datetime.now(timezone.utc) + timedelta(seconds=seconds)
+    def set_cooldown(self, guild_id, user_id, seconds=5):
+        """Set cooldown for user in a guild"""
+        self.cooldowns[(guild_id, user_id)] = datetime.now(timezone.utc) + timedelta(seconds=seconds)
     
-    def has_active_ticket(self, user_id):
-        """Check if user has an active ticket"""
-        return user_id in self.active_tickets
+    def active_tickets(self, guild_id):
+        """User ids with an active ticket in this view's language in a guild"""
+        return admission.guild(guild_id).tickets_for(self.language)
     
-    def add_active_ticket(self, user_id):
+    def has_active_ticket(self, guild_id, user_id):
+        """Check if user has an active ticket in any language in a guild"""
+        return admission.guild(guild_id).has_active_ticket(user_id)
+    
+    def add_active_ticket(self, guild_id, user_id):
         """Add user to active tickets"""
-        self.active_tickets.add(user_id)
+        admission.guild(guild_id).add_active_ticket(user_id, self.language)
     
-    def remove_active_ticket(self, user_id):
+    def remove_active_ticket(self, guild_id, user_id):
         """Remove user from active tickets"""
-        self.active_tickets.discard(user_id)
+        admission.guild(guild_id).remove_active_ticket(user_id)
 
 
 class SimpleTicketButton(discord.ui.Button):
@@ -235,13 +253,20 @@ class SimpleTicketButton(discord.ui.Button):
             )
     
     async def callback(self, interaction: discord.Interaction):
-        """Create a support ticket"""
+        """Acknowledge immediately, then create the ticket in the background"""
         # Get the view that contains this button
         view = self.view
         if not isinstance(view, SimpleTicketView):
             logger.error(f"Ticket button view is not SimpleTicketView: {type(view)}")
             return
-            
+        
+        await pipeline.run(
+            interaction, 'ticket_create',
+            lambda progress: self.create_ticket(interaction, view, progress)
+        )
+    
+    async def create_ticket(self, interaction, view, progress):
+        """Create a support ticket"""
         try:
             user = interaction.user
             user_id = user.id
@@ -250,27 +275,8 @@ class SimpleTicketButton(discord.ui.Button):
             
             logger.info(f"Ticket creation attempt by {user.name} ({user_id}) in {channel.name}")
             
-            # Check bot permissions first
-            bot_member = guild.me
-            bot_permissions = channel.permissions_for(bot_member)
-            
-            logger.info(f"Bot permissions in {channel.name}: "
-                       f"create_private_threads={bot_permissions.create_private_threads}, "
-                       f"manage_threads={bot_permissions.manage_threads}, "
-                       f"send_messages={bot_permissions.send_messages}")
-            
-            if not bot_permissions.create_private_threads:
-                logger.error(f"Bot missing create_private_threads permission in {channel.name}")
-                embed = create_embed(
-                    "❌ Permission Error",
-                    "Bot doesn't have permission to create threads in this channel. Please contact an administrator.",
-                    color=COLORS['error']
-                )
-                await interaction.response.send_message(embed=embed, ephemeral=True)
-                return
-            
             # Check cooldown
-            on_cooldown, time_left = view.is_on_cooldown(user_id)
+            on_cooldown, time_left = view.is_on_cooldown(guild.id, user_id)
             if on_cooldown:
                 logger.info(f"User {user.name} on cooldown: {time_left:.1f}s remaining")
                 if self.language == 'english':
@@ -285,167 +291,268 @@ class SimpleTicketButton(discord.ui.Button):
                         f"Пожалуйста, подождите {time_left:.1f} секунд перед созданием нового тикета.",
                         color=COLORS['warning']
                     )
-                await interaction.response.send_message(embed=embed, ephemeral=True)
+                await progress.update(embed)
                 return
             
-            # Check for existing ticket
-            if view.has_active_ticket(user_id):
-                logger.info(f"User {user.name} already has active ticket")
+            # Single-flight guard shared by every ticket panel in this guild
+            guild_admission = admission.guild(guild.id)
+            if not guild_admission.begin(user_id):
+                logger.info(f"User {user.name} already has a ticket creation in progress")
                 if self.language == 'english':
                     embed = create_embed(
-                        "❌ Existing Ticket",
-                        "You already have an active support ticket. Please use your existing ticket or close it first.",
-                        color=COLORS['error']
+                        "⏳ Already In Progress",
+                        "Your ticket is already being created. Please wait a moment.",
+                        color=COLORS['warning']
                     )
                 else:
                     embed = create_embed(
-                        "❌ Существующий тикет",
-                        "У вас уже есть активный тикет поддержки. Пожалуйста, используйте существующий тикет или закройте его сначала.",
-                        color=COLORS['error']
+                        "⏳ Уже создается",
+                        "Ваш тикет уже создается. Пожалуйста, подождите.",
+                        color=COLORS['warning']
                     )
-                await interaction.response.send_message(embed=embed, ephemeral=True)
+                await progress.update(embed)
                 return
             
-            # Create immediate response
-            logger.info(f"Creating ticket for {user.name} in {self.language}")
-            if self.language == 'english':
-                embed = create_embed(
-                    "🔄 Creating Ticket",
-                    "Creating your support ticket...",
-                    color=COLORS['info']
-                )
-            else:
-                embed = create_embed(
-                    "🔄 Создание тикета",
-                    "Создаем ваш тикет поддержки...",
-                    color=COLORS['info']
-                )
-            
-            await interaction.response.send_message(embed=embed, ephemeral=True)
-            logger.info(f"Sent initial response for {user.name}")
-            
-            # Set cooldown and add to active
-            view.set_cooldown(user_id)
-            view.add_active_ticket(user_id)
-            logger.info(f"Set cooldown and added {user.name} to active tickets")
-            
-            # Create thread
-            thread_name = f"🎫 {user.display_name}"
-            logger.info(f"Attempting to create thread '{thread_name}' in {channel.name}")
-            
             try:
-                thread = await channel.create_thread(
-                    name=thread_name,
-                    type=discord.ChannelType.public_thread,
-                    reason=f"Support ticket created by {user.name}"
-                )
-                logger.info(f"Successfully created thread {thread.name} ({thread.id})")
+                # Check for existing ticket
+                if view.has_active_ticket(guild.id, user_id):
+                    logger.info(f"User {user.name} already has active ticket")
+                    if self.language == 'english':
+                        embed = create_embed(
+                            "❌ Existing Ticket",
+                            "You already have an active support ticket. Please use your existing ticket or close it first.",
+                            color=COLORS['error']
+                        )
+                    else:
+                        embed = create_embed(
+                            "❌ Существующий тикет",
+                            "У вас уже есть активный тикет поддержки. Пожалуйста, используйте существующий тикет или закройте его сначала.",
+                            color=COLORS['error']
+                        )
+                    await progress.update(embed)
+                    return
+            
+                # Set cooldown and add to active
+                view.set_cooldown(guild.id, user_id)
+                view.add_active_ticket(guild.id, user_id)
+                logger.info(f"Set cooldown and added {user.name} to active tickets")
+            
+                # Progress update
+                logger.info(f"Creating ticket for {user.name} in {self.language}")
+                if self.language == 'english':
+                    embed = create_embed(
+                        "🔄 Creating Ticket",
+                        "Creating your support ticket...",
+                        color=COLORS['info']
+                    )
+                else:
+                    embed = create_embed(
+                        "🔄 Создание тикета",
+                        "Создаем ваш тикет поддержки...",
+                        color=COLORS['info']
+                    )
+                await progress.update(embed)
+            
+                # Wait for one of the guild's creation slots, showing queue position meanwhile
+                async def show_queue_position(position):
+                    logger.info(f"Ticket creation for {user.name} queued at position {position}")
+                    if self.language == 'english':
+                        embed = create_embed(
+                            "⏳ In Queue",
+                            f"Many tickets are being created right now.\n"
+                            f"Your position in the queue: **{position}**",
+                            color=COLORS['info']
+                        )
+                    else:
+                        embed = create_embed(
+                            "⏳ В очереди",
+                            f"Сейчас создается много тикетов.\n"
+                            f"Ваша позиция в очереди: **{position}**",
+                            color=COLORS['info']
+                        )
+                    await progress.update(embed)
                 
-                # For public threads, the creator is automatically added
-                # But let's ensure they have access
-                try:
-                    await thread.add_user(user)
-                    logger.info(f"Added ticket creator {user.name} to thread")
-                except Exception as e:
-                    logger.info(f"User {user.name} already has access to public thread: {e}")
+                async with guild_admission.slot(on_position=show_queue_position):
+                    # Create thread, in an overflow channel once this one holds too many tickets
+                    thread_name = f"🎫 {user.display_name}"
+                    target = await placement.place(channel)
                     
-            except discord.Forbidden as e:
-                logger.error(f"Forbidden to create thread: {e}")
-                error_embed = create_embed(
-                    "❌ Permission Error",
-                    "Bot doesn't have permission to create threads. Please contact an administrator.",
-                    color=COLORS['error']
-                )
-                await interaction.edit_original_response(embed=error_embed)
-                view.remove_active_ticket(user_id)
-                return
-            except Exception as e:
-                logger.error(f"Error creating thread: {e}")
-                raise
-            
-            # Add staff to thread
-            admin_role = discord.utils.get(guild.roles, name=ROLES['admin'])
-            moderator_role = discord.utils.get(guild.roles, name=ROLES['moderator'])
-            
-            staff_added = 0
-            if admin_role:
-                logger.info(f"Adding {len(admin_role.members)} admins to thread")
-                for member in admin_role.members:
-                    try:
-                        await thread.add_user(member)
-                        staff_added += 1
-                        await asyncio.sleep(0.1)
-                    except Exception as e:
-                        logger.warning(f"Could not add admin {member.name} to thread: {e}")
+                    # Check bot permissions in the channel the thread goes into (overflow clones may differ)
+                    bot_member = guild.me
+                    bot_permissions = target.permissions_for(bot_member)
+                    
+                    logger.info(f"Bot permissions in {target.name}: "
+                               f"create_private_threads={bot_permissions.create_private_threads}, "
+                               f"manage_threads={bot_permissions.manage_threads}, "
+                               f"send_messages={bot_permissions.send_messages}")
+                    
+                    if not bot_permissions.create_private_threads:
+                        logger.error(f"Bot missing create_private_threads permission in {target.name}")
+                        embed = create_embed(
+                            "❌ Permission Error",
+                            "Bot doesn't have permission to create threads in this channel. Please contact an administrator.",
+                            color=COLORS['error']
+                        )
+                        await progress.update(embed)
+                        view.remove_active_ticket(guild.id, user_id)
+                        return
+                    
+                    logger.info(f"Attempting to create thread '{thread_name}' in {target.name}")
             
-            if moderator_role:
-                logger.info(f"Adding {len(moderator_role.members)} moderators to thread")
-                for member in moderator_role.members:
                     try:
-                        await thread.add_user(member)
-                        staff_added += 1
-                        await asyncio.sleep(0.1)
+                        thread = await target.create_thread(
+                            name=thread_name,
+                            type=discord.ChannelType.public_thread,
+                            reason=f"Support ticket created by {user.name}"
+                        )
+                        logger.info(f"Successfully created thread {thread.name} ({thread.id})")
+                        analytics.ticket_opened(thread.id, user_id, self.language, guild_id=guild.id)
+                
+                        # For public threads, the creator is automatically added
+                        # But let's ensure they have access
+                        try:
+                            await thread.add_user(user)
+                            logger.info(f"Added ticket creator {user.name} to thread")
+                        except Exception as e:
+                            logger.info(f"User {user.name} already has access to public thread: {e}")
+                    
+                    except discord.Forbidden as e:
+                        logger.error(f"Forbidden to create thread: {e}")
+                        error_embed = create_embed(
+                            "❌ Permission Error",
+                            "Bot doesn't have permission to create threads. Please contact an administrator.",
+                            color=COLORS['error']
+                        )
+                        await progress.update(error_embed)
+                        view.remove_active_ticket(guild.id, user_id)
+                        return
                     except Exception as e:
-                        logger.warning(f"Could not add moderator {member.name} to thread: {e}")
-            
-            logger.info(f"Added {staff_added} staff members to thread")
-            
-            # Send welcome message in thread
-            if self.language == 'english':
-                ticket_embed = create_embed(
-                    "🎫 Support Ticket Created",
-                    f"Hello {user.mention}! Welcome to your support ticket.\n\n"
-                    "Please describe your issue and our team will help you.",
-                    color=COLORS['success']
-                )
-                success_embed = create_embed(
-                    "✅ Ticket Created",
-                    f"Your ticket has been created: {thread.mention}",
-                    color=COLORS['success']
-                )
-            else:
-                ticket_embed = create_embed(
-                    "🎫 Тикет поддержки создан",
-                    f"Привет {user.mention}! Добро пожаловать в ваш тикет поддержки.\n\n"
-                    "Пожалуйста, опишите вашу проблему и наша команда поможет вам.",
-                    color=COLORS['success']
-                )
-                success_embed = create_embed(
-                    "✅ Тикет создан",
-                    f"Ваш тикет был создан: {thread.mention}",
-                    color=COLORS['success']
-                )
-            
-            # Send messages
-            close_view = TicketCloseView(user_id, self.language)
-            logger.info(f"Sending welcome message to thread")
-            await thread.send(embed=ticket_embed, view=close_view)
-            logger.info(f"Editing original response with success message")
-            await interaction.edit_original_response(embed=success_embed)
-            
-            logger.info(f"Successfully completed ticket creation for {user.name}")
+                        logger.error(f"Error creating thread: {e}")
+                        raise
+            
+                    # Send welcome message in thread
+                    if self.language == 'english':
+                        ticket_embed = create_embed(
+                            "🎫 Support Ticket Created",
+                            f"Hello {user.mention}! Welcome to your support ticket.\n\n"
+                            "Please describe your issue and our team will help you.",
+                            color=COLORS['success']
+                        )
+                        success_embed = create_embed(
+                            "✅ Ticket Created",
+                            f"Your ticket has been created: {thread.mention}",
+                            color=COLORS['success']
+                        )
+                    else:
+                        ticket_embed = create_embed(
+                            "🎫 Тикет поддержки создан",
+                            f"Привет {user.mention}! Добро пожаловать в ваш тикет поддержки.\n\n"
+                            "Пожалуйста, опишите вашу проблему и наша команда поможет вам.",
+                            color=COLORS['success']
+                        )
+                        success_embed = create_embed(
+                            "✅ Тикет создан",
+                            f"Ваш тикет был создан: {thread.mention}",
+                            color=COLORS['success']
+                        )
+            
+                    # Send messages
+                    close_view = TicketCloseView(user_id, self.language)
+                    logger.info("Sending welcome message to thread")
+                    await thread.send(embed=ticket_embed, view=close_view)
+                    logger.info("Editing original response with success message")
+                    await progress.update(success_embed)
+            
+                    # Add staff to thread in the background
+                    pipeline.spawn(add_staff_to_thread(thread, guild), name=f"ticket_staff:{thread.id}")
+                    schedule_ticket_timers(thread.id, user_id, self.language, guild.id)
+            
+                logger.info(f"Successfully completed ticket creation for {user.name}")
+            finally:
+                guild_admission.end(user_id)
             
         except Exception as e:
             logger.error(f"Error creating ticket: {e}")
             traceback.print_exc()
             
             # Remove from active tickets on error
-            if 'view' in locals() and 'user_id' in locals():
-                view.remove_active_ticket(user_id)
+            view.remove_active_ticket(interaction.guild.id, interaction.user.id)
             
+            if self.language == 'english':
+                error_embed = create_embed("❌ Error", f"Failed to create ticket: {str(e)}", color=COLORS['error'])
+            else:
+                error_embed = create_embed("❌ Ошибка", f"Не удалось создать тикет: {str(e)}", color=COLORS['error'])
+            await progress.update(error_embed)
+
+
+def schedule_ticket_timers(thread_id, owner_id, language, guild_id=None):
+    """Arm the idle reminder and auto-close timers for a new ticket"""
+    payload = {'thread_id': thread_id, 'owner_id': owner_id, 'language': language, 'guild_id': guild_id}
+    if TICKET_REMINDER_HOURS > 0:
+        scheduler.schedule('ticket_reminder', TICKET_REMINDER_HOURS * 3600, payload, key=f'reminder:{thread_id}')
+    if TICKET_IDLE_CLOSE_HOURS > 0:
+        scheduler.schedule('ticket_idle_close', TICKET_IDLE_CLOSE_HOURS * 3600, payload, key=f'idle_close:{thread_id}')
+
+
+def cancel_ticket_timers(thread_id):
+    """Disarm the idle timers of a ticket that is being closed"""
+    scheduler.cancel(f'reminder:{thread_id}')
+    scheduler.cancel(f'idle_close:{thread_id}')
+
+
+async def add_staff_to_thread(thread, guild):
+    """Add all admins and moderators to a ticket thread"""
+    roles = guild_configs.get(guild.id).roles
+    admin_role = discord.utils.get(guild.roles, name=roles['admin'])
+    moderator_role = discord.utils.get(guild.roles, name=roles['moderator'])
+    
+    staff_added = 0
+    if admin_role:
+        logger.info(f"Adding {len(admin_role.members)} admins to thread")
+        for member in admin_role.members:
             try:
-                if self.language == 'english':
-                    error_embed = create_embed("❌ Error", f"Failed to create ticket: {str(e)}", color=COLORS['error'])
-                else:
-                    error_embed = create_embed("❌ Ошибка", f"Не удалось создать тикет: {str(e)}", color=COLORS['error'])
-                
-                if not interaction.response.is_done():
-                    await interaction.response.send_message(embed=error_embed, ephemeral=True)
-                else:
-                    await interaction.edit_original_response(embed=error_embed)
-            except Exception as edit_error:
-                logger.error(f"Failed to send error message: {edit_error}")
+                await thread.add_user(member)
+                staff_added += 1
+                await asyncio.sleep(0.1)
+            except Exception as e:
+                logger.warning(f"Could not add admin {member.name} to thread: {e}")
+    
+    if moderator_role:
+        logger.info(f"Adding {len(moderator_role.members)} moderators to thread")
+        for member in moderator_role.members:
+            try:
+                await thread.add_user(member)
+                staff_added += 1
+                await asyncio.sleep(0.1)
+            except Exception as e:
+                logger.warning(f"Could not add moderator {member.name} to thread: {e}")
+    
+    logger.info(f"Added {staff_added} staff members to thread")
 
+class ConfirmView(discord.ui.View):
+    """Confirm/Cancel buttons for a dangerous admin command, usable only by the admin who ran it"""
+    
+    def __init__(self, author_id, timeout=30.0):
+        super().__init__(timeout=timeout)
+        self.author_id = author_id
+        self.confirmed = False
+    
+    async def interaction_check(self, interaction: discord.Interaction):
+        if interaction.user.id != self.author_id:
+            await interaction.response.send_message("❌ Only the admin who ran the command can confirm it.", ephemeral=True)
+            return False
+        return True
+    
+    @discord.ui.button(label='Confirm', style=discord.ButtonStyle.danger)
+    async def confirm_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.confirmed = True
+        await interaction.response.edit_message(view=None)
+        self.stop()
+    
+    @discord.ui.button(label='Cancel', style=discord.ButtonStyle.secondary)
+    async def cancel_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await interaction.response.edit_message(view=None)
+        self.stop()
 
 class TicketCloseView(discord.ui.View):
     """View for closing support tickets"""
@@ -468,8 +575,9 @@ class TicketCloseView(discord.ui.View):
             guild = interaction.guild
             
             # Check permissions - only ticket owner, admins, or moderators can close
-            admin_role = discord.utils.get(guild.roles, name=ROLES['admin'])
-            moderator_role = discord.utils.get(guild.roles, name=ROLES['moderator'])
+            roles = guild_configs.get(guild.id).roles
+            admin_role = discord.utils.get(guild.roles, name=roles['admin'])
+            moderator_role = discord.utils.get(guild.roles, name=roles['moderator'])
             
             can_close = (
                 user.id == self.ticket_owner_id or
@@ -492,7 +600,7 @@ class TicketCloseView(discord.ui.View):
                 embed = create_embed(
                     "🔒 Ticket Closing",
                     f"This ticket is being closed by {user.mention}.\n"
-                    "The thread will be archived in 5 seconds.\n\n"
+                    f"The thread will be archived in {TICKET_ARCHIVE_DELAY} seconds.\n\n"
                     "Thank you for using CSMarketCap support!",
                     color=COLORS['info']
                 )
@@ -500,67 +608,29 @@ class TicketCloseView(discord.ui.View):
                 embed = create_embed(
                     "🔒 Закрытие тикета",
                     f"Этот тикет закрывается пользователем {user.mention}.\n"
-                    "Тред будет заархивирован через 5 секунд.\n\n"
+                    f"Тред будет заархивирован через {TICKET_ARCHIVE_DELAY} секунд.\n\n"
                     "Спасибо за использование поддержки CSMarketCap!",
                     color=COLORS['info']
                 )
             
             await interaction.response.send_message(embed=embed)
             
-            # Remove from active tickets in all views - CRITICAL FIX
-            logger.info(f"Removing user {self.ticket_owner_id} from all active ticket lists")
-            
-            # Remove from the current thread's view if we can find it
-            # First try to find the view that created this ticket
-            channel = interaction.channel
-            if hasattr(channel, 'parent') and channel.parent:
-                # This is a thread, get the parent channel
-                parent_channel = channel.parent
-                
-                # Try to find the message with the ticket view in the parent channel
-                try:
-                    async for message in parent_channel.history(limit=50):
-                        if message.author.bot and message.components:
-                            for component in message.components:
-                                if hasattr(component, 'children'):
-                                    for child in component.children:
-                                        if hasattr(child, 'custom_id') and 'ticket' in str(child.custom_id):
-                                            # This message has a ticket button, get its view
-                                            view = discord.ui.View.from_message(message)
-                                            if hasattr(view, 'remove_active_ticket'):
-                                                view.remove_active_ticket(self.ticket_owner_id)
-                                                logger.info(f"Removed from ticket view in {parent_channel.name}")
-                                            break
-                except Exception as e:
-                    logger.warning(f"Could not clean up view in parent channel: {e}")
-            
-            # Also try to access global ticket views
-            try:
-                from bot import english_ticket_view, russian_ticket_view
-                removed_count = 0
-                if english_ticket_view and hasattr(english_ticket_view, 'remove_active_ticket'):
-                    if self.ticket_owner_id in english_ticket_view.active_tickets:
-                        english_ticket_view.remove_active_ticket(self.ticket_owner_id)
-                        removed_count += 1
-                        logger.info("Removed from english_ticket_view")
-                if russian_ticket_view and hasattr(russian_ticket_view, 'remove_active_ticket'):
-                    if self.ticket_owner_id in russian_ticket_view.active_tickets:
-                        russian_ticket_view.remove_active_ticket(self.ticket_owner_id)
-                        removed_count += 1
-                        logger.info("Removed from russian_ticket_view")
-                
-                logger.info(f"Removed user from {removed_count} global ticket views")
-            except ImportError:
-                logger.warning("Could not access global ticket views for cleanup")
-            except Exception as e:
-                logger.warning(f"Error cleaning up global ticket views: {e}")
-            
-            # Wait and then archive
-            await asyncio.sleep(5)
+            # Remove from active tickets - shared by every ticket view in the guild
+            if admission.guild(guild.id).remove_active_ticket(self.ticket_owner_id):
+                logger.info(f"Removed user {self.ticket_owner_id} from active tickets")
             
+            # Archive through the persistent scheduler so a restart can't skip it
             thread = interaction.channel
             if isinstance(thread, discord.Thread):
-                await thread.edit(archived=True, reason=f"Ticket closed by {user.name}")
+                cancel_ticket_timers(thread.id)
+                exporter.enqueue(thread, self.ticket_owner_id, self.language, closed_by=user.id)
+                analytics.ticket_closed(thread.id)
+                scheduler.schedule(
+                    'archive_ticket',
+                    TICKET_ARCHIVE_DELAY,
+                    {'thread_id': thread.id, 'reason': f"Ticket closed by {user.name}"},
+                    key=f'archive:{thread.id}'
+                )
                 logger.info(f"Ticket closed by {user.name}")
             
         except Exception as e: